@@ -1,15 +1,26 @@
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, Response, request, jsonify, render_template
 import threading
-from gitbook_downloader import GitbookDownloader
+from gitbook_downloader import CRAWL_PHASES, CrawlMetrics, GitbookDownloader, HttpCache, RateLimiter, make_parse_pool
+from job_store import JobStore
+from scheduler import DownloadScheduler
+import argparse
+import asyncio
+import json
 import logging
 import os
+import queue
 from datetime import datetime
-import asyncio
-import concurrent.futures
 import sys
+import time
+import zlib
 from urllib.parse import quote, unquote
 from urllib.parse import urlparse
 
+try:
+    import brotli
+except ImportError:  # Optional, only needed to serve brotli-compressed results
+    brotli = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -23,9 +34,28 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Store active downloads
+# Queued and running downloads; finished ones move to the job store
 active_downloads = {}
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+# Finished jobs (status, pages and markdown), kept on disk with TTL and LRU eviction;
+# configured with --job-db, --job-ttl-hours and --max-jobs
+job_store = JobStore(os.path.join("downloads", "jobs.sqlite3"))
+# Every download runs on the scheduler's one event loop; limits are set with
+# --max-downloads and --max-per-host
+scheduler = DownloadScheduler()
+# Per-host request pacing shared by all downloads, so concurrent crawls of one site stay polite
+rate_limiter = RateLimiter()
+# A completed job younger than this is returned for a new request with the same
+# result_key instead of re-crawling; set with --result-ttl-minutes
+result_ttl = 3600
+# Shared on-disk HTTP cache, enabled with --cache-dir
+http_cache = None
+# HTML parsing processes shared by every download instead of a pool per download,
+# created with the first one; None on a single core, where downloads parse on the loop
+parse_pool = None
+parse_pool_lock = threading.Lock()
+# Phase histograms of finished downloads; /metrics adds the running ones on each scrape
+finished_metrics = CrawlMetrics()
+metrics_lock = threading.Lock()
 
 @app.errorhandler(404)
 def not_found_error(error):
@@ -42,42 +72,72 @@ def handle_exception(error):
     logger.error(f"Error: {str(error)}")
     return jsonify({"error": str(error)}), 500
 
-def download_task(url, task_id):
-    """Background task to download content"""
+async def download_task(task_id, downloader):
+    """Scheduled job: run the download on the scheduler's loop and save the markdown"""
+    content = None
     try:
-        logger.info(f"Starting download task for {url}")
-        downloader = GitbookDownloader(url, native_md=False)
-        active_downloads[task_id] = downloader
-        
-        # Create new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            # Run the download
-            content = loop.run_until_complete(downloader.download())
-        finally:
-            loop.close()
-            
-        # Save content to file
+        logger.info(f"Starting download task for {downloader.base_url}")
         output_dir = "downloads"
         os.makedirs(output_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{output_dir}/gitbook_{timestamp}.md"
-        
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(content)
+
+        # Saved before the downloader reports "completed", so the event carries the file
+        content = await downloader.download(filename)
         logger.info(f"Content saved to {filename}")
-            
-        downloader.status.status = "completed"
         downloader.status.current_url = filename
-        downloader.status.output_file = filename
         
     except Exception as e:
         logger.error(f"Error in download task: {str(e)}")
-        if task_id in active_downloads:
-            active_downloads[task_id].status.status = 'error'
-            active_downloads[task_id].status.error = str(e)
+        if downloader.status.status != "error":  # The downloader reports its own failures
+            downloader.status.set_status('error', str(e))
+    finally:
+        with metrics_lock:
+            finished_metrics.merge(downloader.status.phases)
+            downloader.metrics_recorded = True
+        # SQLite writes would block every other download on the shared loop
+        await asyncio.get_running_loop().run_in_executor(None, store_job, task_id, downloader, content)
+
+def store_job(task_id, downloader, content=None):
+    """Move a finished download into the job store, freeing its pages from memory"""
+    try:
+        if content is None:
+            content = downloader.markdown_snapshot()  # Pages an interrupted download got so far
+        pages = sorted(downloader.pages.values(), key=lambda page: page["index"])
+        job_store.save(task_id, downloader.base_url, downloader.status.to_dict(), pages, content)
+    except Exception as e:
+        logger.error(f"Error storing job {task_id}: {str(e)}")
+        return  # Keep serving it from memory
+    if active_downloads.get(task_id) is downloader:  # Not replaced by a newer download
+        del active_downloads[task_id]
+
+def get_parse_pool():
+    """The shared parse pool, created on first use"""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is None and (os.cpu_count() or 1) > 1:
+            parse_pool = make_parse_pool(os.cpu_count())
+        return parse_pool
+
+def result_key(url, native_md=False, section_only=False):
+    """Task id for a download: the canonical base URL plus any options that change the output.
+
+    Scheme and host are lowercased and a leading "www." and trailing slash dropped,
+    so variants of one site share a task, e.g. "https://docs.example.com/guides;section_only".
+    """
+    key = HttpCache.cache_key(url if "://" in url else f"https://{url}")
+    scheme, _, rest = key.partition("://")
+    if rest.startswith("www."):
+        rest = rest[len("www."):]
+    options = [name for name, enabled in (("native_md", native_md), ("section_only", section_only)) if enabled]
+    return ";".join([f"{scheme}://{rest}"] + options)
+
+def fresh_result(task_id):
+    """The stored job for task_id if it completed within result_ttl, else None"""
+    job = job_store.get(task_id)
+    if job is None or job.status["status"] != "completed" or time.time() - job.finished_at > result_ttl:
+        return None
+    return job
 
 @app.route('/')
 def index():
@@ -100,31 +160,48 @@ def start_download():
             return jsonify({"error": "Please provide a URL"}), 400
             
         url = data['url']
+        native_md = bool(data.get('native_md', False))
+        section_only = bool(data.get('section_only', False))
         logger.info(f"Starting download for URL: {url}")
         
-        # Use the URL directly as the task ID
-        task_id = url
+        # Requests for the same site and options share one task
+        task_id = result_key(url, native_md, section_only)
         
         if task_id in active_downloads:
-            if active_downloads[task_id].status.status in ['running', 'generating_markdown']:
+            if active_downloads[task_id].status.status not in ['completed', 'error']:
                 return jsonify({
                     "task_id": task_id,
                     "message": "Download already in progress",
-                    "status": active_downloads[task_id].status.status
+                    "status": active_downloads[task_id].status.status,
+                    "queue_position": scheduler.queue_position(task_id)
+                })
+        
+        if not data.get('force_refresh'):
+            job = fresh_result(task_id)
+            if job is not None:
+                logger.info(f"Serving cached result for {task_id}")
+                return jsonify({
+                    "task_id": task_id,
+                    "message": "Cached result",
+                    "status": job.status["status"],
+                    "queue_position": None,
+                    "cached": True,
+                    "finished_at": datetime.fromtimestamp(job.finished_at).isoformat()
                 })
         
-        # Start new download in background
-        thread = threading.Thread(
-            target=download_task,
-            args=(url, task_id)
-        )
-        thread.daemon = True
-        thread.start()
+        # Queue the download; it starts when the scheduler has a free slot for its host
+        downloader = GitbookDownloader(url, native_md=native_md, section_only=section_only,
+                                       http_cache=http_cache, rate_limiter=rate_limiter,
+                                       parse_pool=get_parse_pool())
+        downloader.status.set_status("queued")
+        active_downloads[task_id] = downloader
+        scheduler.submit(task_id, url, lambda: download_task(task_id, downloader))
         
         return jsonify({
             "task_id": task_id,
-            "message": "Download started",
-            "status": "running"
+            "message": "Download queued",
+            "status": downloader.status.status,
+            "queue_position": scheduler.queue_position(task_id)
         })
         
     except Exception as e:
@@ -137,44 +214,110 @@ def get_status(task_id):
     try:
         logger.info(f"Status check for task: {task_id}")
         
-        if task_id not in active_downloads:
-            return jsonify({"error": "Task not found"}), 404
+        downloader = active_downloads.get(task_id)
+        if downloader is not None:
+            status_data = downloader.status.to_dict()
+        else:
+            job = job_store.get(task_id)
+            if job is None:
+                return jsonify({"error": "Task not found"}), 404
+            status_data = job.status
             
-        downloader = active_downloads[task_id]
-        status_data = {
-            "status": downloader.status.status,
-            "current_page": downloader.status.current_page,
-            "total_pages": downloader.status.total_pages,
-            "current_url": downloader.status.current_url,
-            "pages_scraped": downloader.status.pages_scraped,
-            "error": getattr(downloader.status, "error", None),
-            "output_file": getattr(downloader.status, "output_file", None)
-        }
-        
-        if hasattr(downloader.status, "rate_limit_reset"):
-            status_data["rate_limit_reset"] = downloader.status.rate_limit_reset
+        status_data.pop("phases", None)  # Served by /metrics
+        status_data["total_pages"] = status_data["top_level_pages"]
+        status_data["queue_position"] = scheduler.queue_position(task_id)
             
         return jsonify(status_data)
     except Exception as e:
         logger.error(f"Error in get_status: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/events/<path:task_id>')
+def stream_events(task_id):
+    """Push a download's status changes and finished pages as Server-Sent Events.
+
+    The stream opens with a snapshot (status, pages so far, queue position) and
+    ends after the download completes or fails.
+    """
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    downloader = active_downloads.get(task_id)
+    if downloader is None:
+        job = job_store.get(task_id)
+        if job is None:
+            return jsonify({"error": "Task not found"}), 404
+        # Finished: the snapshot is the whole stream
+        snapshot = sse("snapshot", {"status": job.status["status"], "error": job.status["error"],
+                                    "pages": job.status["pages_scraped"], "total": job.status["top_level_pages"],
+                                    "queue_position": None})
+        return Response([snapshot], mimetype="text/event-stream", headers=headers)
+
+    status = downloader.status
+    events = queue.Queue()
+
+    def listener(event, data):
+        events.put((event, data))
+
+    # Subscribe before taking the snapshot so no event falls between the two
+    status.listeners.append(listener)
+
+    def stream():
+        try:
+            pages = list(status.pages_scraped)
+            position = scheduler.queue_position(task_id)
+            state = status.status
+            yield sse("snapshot", {"status": state, "error": status.error, "pages": pages,
+                                   "total": status.top_level_pages, "queue_position": position})
+            seen_pages = len(pages)
+            while state not in ("completed", "error"):
+                try:
+                    # Queue positions aren't pushed, so re-check them every second while queued
+                    event, data = events.get(timeout=1 if state == "queued" else 15)
+                except queue.Empty:
+                    if state != "queued":
+                        yield ": keepalive\n\n"  # Also notices closed connections
+                    elif scheduler.queue_position(task_id) != position:
+                        position = scheduler.queue_position(task_id)
+                        yield sse("queue", {"queue_position": position})
+                    continue
+                if event == "page":
+                    if data["count"] <= seen_pages:
+                        continue  # Already in the snapshot
+                    seen_pages = data["count"]
+                elif event == "status":
+                    state = data["status"]
+                yield sse(event, data)
+        finally:
+            status.listeners.remove(listener)
+
+    return Response(stream(), mimetype="text/event-stream", headers=headers)
+
 @app.route('/result/<path:task_id>')
 def get_result(task_id):
     """Get the result of a completed download"""
     try:
-        if task_id not in active_downloads:
-            return jsonify({"error": "Task not found"}), 404
-            
-        downloader = active_downloads[task_id]
-        if not hasattr(downloader.status, "output_file"):
-            return jsonify({"error": "Output file not found"}), 404
+        downloader = active_downloads.get(task_id)
+        if downloader is None:
+            job = job_store.get(task_id)
+            if job is None:
+                return jsonify({"error": "Task not found"}), 404
+            if job.etag in request.headers.get("If-None-Match", ""):
+                return "", 304, {"ETag": job.etag, "Cache-Control": "no-cache"}
+            return job_store.read_output(task_id), 200, {"ETag": job.etag, "Cache-Control": "no-cache"}
             
         try:
             # Return the current content even if not completed
             if hasattr(downloader, 'pages') and downloader.pages:
-                content = downloader._generate_markdown()
-                return content
+                # The snapshot is only re-rendered when pages changed, and the version
+                # doubles as an ETag so unchanged polls skip the body entirely
+                etag = f'"{id(downloader):x}-{downloader.pages_version}"'
+                if etag in request.headers.get("If-None-Match", ""):
+                    return "", 304, {"ETag": etag, "Cache-Control": "no-cache"}
+                content = downloader.markdown_snapshot()
+                return content, 200, {"ETag": etag, "Cache-Control": "no-cache"}
             else:
                 return jsonify({"error": "No content available yet"}), 404
         except Exception as e:
@@ -185,42 +328,167 @@ def get_result(task_id):
         logger.error(f"Error in get_result: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def negotiate_encoding():
+    """Pick the result's Content-Encoding from Accept-Encoding: br (if available), gzip or none"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+def compress_chunks(chunks, encoding):
+    """Compress a stream of byte chunks as it is sent"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 writes a gzip container
+        compress, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
 @app.route('/download/<path:task_id>/markdown')
 def download_markdown(task_id):
-    """Download the markdown file"""
+    """Stream the markdown file straight from the downloaded pages.
+
+    Finished downloads get an ETag, and a Content-Length and byte Range support
+    (on the uncompressed file) so large exports can be resumed. Otherwise the
+    response is compressed when the client accepts gzip or brotli. Stored jobs
+    are read from the job store in chunks.
+    """
     try:
-        if task_id not in active_downloads:
-            return jsonify({"error": "Task not found"}), 404
-            
-        downloader = active_downloads[task_id]
-        
-        try:
-            # Generate fresh markdown content
-            content = downloader._generate_markdown()
-            if not content:
+        downloader = active_downloads.get(task_id)
+        if downloader is not None:
+            if not downloader.pages:
                 return jsonify({"error": "No content available"}), 404
-                
-            # Create a temporary file with the content
-            domain = urlparse(downloader.base_url).netloc
-            temp_file = f'temp_{domain}.md'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                f.write(str(content))  # Ensure content is string
-            
-            return send_file(
-                temp_file,
-                as_attachment=True,
-                download_name=f"{domain}.md",
-                mimetype='text/markdown'
-            )
-                
-        except Exception as e:
-            logger.error(f"Error sending file: {str(e)}")
-            return jsonify({"error": f"Error downloading file: {str(e)}"}), 500
+            base_url = downloader.base_url
+        else:
+            job = job_store.get(task_id)
+            if job is None:
+                return jsonify({"error": "Task not found"}), 404
+            if not job.size:
+                return jsonify({"error": "No content available"}), 404
+            base_url = job.url
+
+        domain = urlparse(base_url).netloc
+        headers = {
+            "Content-Disposition": f'attachment; filename="{domain}.md"',
+            "Vary": "Accept-Encoding",
+        }
+        mimetype = "text/markdown"  # Flask adds "; charset=utf-8"
+        encoding = negotiate_encoding()
+        if downloader is not None and downloader.status.status not in ("completed", "error"):
+            # Still running: pages can change under the stream, so no validators or ranges
+            chunks = downloader.iter_markdown_bytes()
+            if encoding:
+                headers["Content-Encoding"] = encoding
+                chunks = compress_chunks(chunks, encoding)
+            return Response(chunks, mimetype=mimetype, headers=headers)
+
+        if downloader is not None:
+            # Finished but not moved to the job store yet
+            etag = f'"{id(downloader):x}-{downloader.pages_version}"'
+            size = downloader.markdown_size()
+            read = downloader.iter_markdown_bytes
+        else:
+            etag, size = job.etag, job.size
+
+            def read(start=0, end=None):
+                return job_store.iter_output(task_id, start, end)
+        headers["Accept-Ranges"] = "bytes"
+        if request.range is not None and request.headers.get("If-Range", etag) == etag:
+            # Ranges are served from the uncompressed file
+            span = request.range.range_for_length(size)
+            if span is None:
+                return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+            start, end = span
+            headers.update({
+                "ETag": etag,
+                "Content-Length": str(end - start),
+                "Content-Range": f"bytes {start}-{end - 1}/{size}",
+            })
+            return Response(read(start, end), 206, mimetype=mimetype, headers=headers)
+
+        if encoding:
+            etag = f'{etag[:-1]}-{encoding}"'  # Each encoding is a different representation
+        headers["ETag"] = etag
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            chunks = compress_chunks(read(), encoding)
+            return Response(chunks, mimetype=mimetype, headers=headers)
+        headers["Content-Length"] = str(size)
+        return Response(read(), mimetype=mimetype, headers=headers)
             
     except Exception as e:
         logger.error(f"Error in download_markdown: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def prometheus_histogram(name, description, histogram):
+    """Render a Histogram in the Prometheus text exposition format"""
+    data = histogram.to_dict()
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    lines += [f'{name}_bucket{{le="{le}"}} {count}' for le, count in data["buckets"].items()]
+    lines += [f"{name}_sum {data['sum']}", f"{name}_count {data['count']}"]
+    return lines
+
+def prometheus_gauge(name, description, value):
+    return [f"# HELP {name} {description}", f"# TYPE {name} gauge", f"{name} {value}"]
+
+@app.route('/metrics')
+def metrics():
+    """Crawl phase histograms and download gauges for Prometheus"""
+    with metrics_lock:
+        totals = CrawlMetrics()
+        totals.merge(finished_metrics)
+        downloaders = list(active_downloads.values())
+        for downloader in downloaders:
+            if not getattr(downloader, "metrics_recorded", False):
+                totals.merge(downloader.status.phases)
+
+    lines = []
+    for phase, (_, description) in CRAWL_PHASES.items():
+        lines += prometheus_histogram(f"gitbook_{phase}", description, totals.phases[phase])
+    lines += prometheus_gauge("gitbook_active_downloads", "Downloads currently running", scheduler.running)
+    lines += prometheus_gauge("gitbook_download_queue_depth", "Downloads queued for a free slot",
+                              scheduler.queue_depth)
+    frontiers = [downloader.frontier for downloader in downloaders if downloader.frontier is not None]
+    lines += prometheus_gauge("gitbook_crawl_queue_depth", "Pages queued for fetching by running downloads",
+                              sum(frontier.queue_depth for frontier in frontiers))
+    return "\n".join(lines) + "\n", 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="GitBook Downloader web app")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Cache responses here and revalidate them with ETag/Last-Modified on re-crawls")
+    parser.add_argument("--cache-max-mb", type=int, default=512,
+                        help="Cache size cap in MB; least recently used pages are evicted first")
+    parser.add_argument("--max-downloads", type=int, default=3,
+                        help="Downloads run at the same time; further requests wait in a FIFO queue")
+    parser.add_argument("--max-per-host", type=int, default=1,
+                        help="Downloads of the same host run at the same time, so one site can't take every slot")
+    parser.add_argument("--job-db", default=job_store.path,
+                        help="SQLite database for finished jobs (default downloads/jobs.sqlite3)")
+    parser.add_argument("--job-ttl-hours", type=float, default=168,
+                        help="Finished jobs not read for this long are deleted")
+    parser.add_argument("--max-jobs", type=int, default=200,
+                        help="Finished jobs kept; the least recently read are deleted first")
+    parser.add_argument("--result-ttl-minutes", type=float, default=60,
+                        help="Repeat requests within this long of a completed download get its stored result")
+    args = parser.parse_args()
+    job_store = JobStore(args.job_db, args.job_ttl_hours * 3600, args.max_jobs)
+    job_store.evict()
+    result_ttl = args.result_ttl_minutes * 60
+    scheduler.max_concurrent = args.max_downloads
+    scheduler.max_per_host = args.max_per_host
+    if args.cache_dir:
+        http_cache = HttpCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+        logger.info(f"Using HTTP cache at {args.cache_dir}")
+
     logger.info("Starting Flask application")
     app.run(host='0.0.0.0', port=8080, debug=True)
@@ -0,0 +1,78 @@
+"""Benchmark: page cleanup, one pass per rule vs the compiled cleanup stage.
+
+Before: four find_all walks over the main content (nav elements, sidebar ids,
+scripts/styles, prev/next links), then five re.sub calls over the markdown.
+After: strip_page_chrome removes the same elements in one walk, and
+clean_markdown's precompiled patterns have literal prefixes so the regex engine
+jumps between candidates.
+
+Runs offline on the tests-21 reference sites (see corpus.py), cleaning each
+page's <body> so the rendered sidebar and pager are in scope, and checks that
+both produce identical markdown.
+
+Usage:
+    python benchmarks/bench_cleanup.py [--max-pages N]
+"""
+import argparse
+import re
+import time
+
+import corpus  # noqa: F401  (puts the repo root on sys.path)
+from gitbook_downloader import clean_markdown, html_to_markdown, make_soup, strip_page_chrome
+
+
+def multi_pass_chrome(main_content):
+    for nav in main_content.find_all(["nav", "aside", "header", "footer"]):
+        nav.decompose()
+    for sidebar in main_content.find_all(id=re.compile(r"sidebar|nav|menu", re.I)):
+        sidebar.decompose()
+    for tag in main_content.find_all(["script", "style"]):
+        tag.decompose()
+    for link in main_content.find_all("a", string=re.compile(r"Previous|Next")):
+        link.decompose()
+
+
+def multi_pass_markdown(md):
+    md = re.sub(r"\n{3,}", "\n\n", md)
+    md = re.sub(r"#{3,}", "##", md)
+    md = re.sub(r'\[[\s\u200b]*\]\(#[^)]+\)\s*', '', md)
+    md = re.sub(r'\[([^\]]+)\]\(/[^)]*\)\[([^\]]+)\]\(/[^)]*\)\s*$', '', md, flags=re.MULTILINE)
+    md = re.sub(r'[⌘⌃⌥⇧]+[A-Za-z]\s*', '', md)
+    return md
+
+
+def time_cleanup(strip, clean, pages):
+    """Seconds spent in strip and clean over all pages, plus the cleaned markdown."""
+    strip_time = clean_time = 0.0
+    results = []
+    for html in pages:
+        body = make_soup(html).body
+        start = time.perf_counter()
+        strip(body)
+        strip_time += time.perf_counter() - start
+        md = html_to_markdown(body)
+        start = time.perf_counter()
+        results.append(clean(md))
+        clean_time += time.perf_counter() - start
+    return strip_time, clean_time, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-pages", type=int, default=40, help="Pages per site (default 40)")
+    args = parser.parse_args()
+
+    print(f"{'site':<24} {'pages':>5} {'strip ms before':>16} {'after':>6} {'clean ms before':>16} {'after':>6}")
+    for filename in corpus.SITES:
+        pages = [html for _, html in corpus.iter_site_pages(filename, args.max_pages)]
+        strip_before, clean_before, old_results = time_cleanup(multi_pass_chrome, multi_pass_markdown, pages)
+        strip_after, clean_after, new_results = time_cleanup(strip_page_chrome, clean_markdown, pages)
+        if old_results != new_results:
+            raise SystemExit(f"{filename}: compiled cleanup output differs from the multi-pass cleanup")
+        per_page = 1000 / len(pages)
+        print(f"{filename:<24} {len(pages):>5} {strip_before * per_page:>16.3f} {strip_after * per_page:>6.3f}"
+              f" {clean_before * per_page:>16.3f} {clean_after * per_page:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark: crawl bookkeeping on a synthetic 5k-page Docusaurus sidebar.
+
+Every page's sidebar re-lists the top-level categories plus its own expanded
+category, so the walk sees each visited link many times.
+Before: each already-visited link scanned every stored page to find its record
+and maybe update its depth, which made bookkeeping O(pages x nav links).
+After: PageStore finds the record through its URL -> index map.
+
+Fetching and parsing are stubbed out (pages arrive pre-parsed), so only the walk's
+own bookkeeping is timed. Checks that both stores end with identical pages.
+At these sizes the walk nests once per page, which is why it keeps an explicit
+stack instead of recursing.
+
+Usage:
+    python benchmarks/bench_crawl.py [--sizes 1000,2000,5000] [--category-size 25] [--legacy-max 2000]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import corpus  # noqa: F401  (puts the repo root on sys.path)
+from gitbook_downloader import GitbookDownloader, PageStore, ParsedPage
+
+BASE_URL = "https://docs.example.com/"
+
+
+class LinearScanPageStore(PageStore):
+    """The pre-PageStore lookup: scan every page for the URL."""
+
+    def update_depth(self, url, depth):
+        for page in self.values():
+            if page.get("url") == url and page.get("depth", 0) != depth:
+                if depth > page.get("depth", 0):
+                    page["depth"] = depth
+                    return True
+                return False
+        return False
+
+
+def build_sidebar(size, category_size):
+    """Categories of pages; returns (landing nav, nav per page URL)."""
+    categories = []
+    for start in range(0, size, category_size):
+        category = f"{BASE_URL}category-{start // category_size}"
+        children = [f"{category}/page-{i}" for i in range(start, min(start + category_size, size))]
+        categories.append((category, children))
+    top = [(url, url.rsplit("/", 1)[1], 0) for url, _ in categories]
+
+    navs = {}
+    for position, (category, children) in enumerate(categories):
+        # Top-level categories, with this category expanded in place
+        expanded = (top[:position + 1] + [(child, child.rsplit("/", 1)[1], 1) for child in children]
+                    + top[position + 1:])
+        navs[category] = expanded
+        for child in children:
+            navs[child] = expanded
+    return top, navs
+
+
+def crawl(store_class, top, navs):
+    downloader = GitbookDownloader(BASE_URL, native_md=False, parse_workers=0, force_crawl=True)
+    downloader.pages = store_class()
+
+    async def fetch_nav_page(link):
+        page = {"title": link.rsplit("/", 1)[1], "content": f"Content of {link}", "url": link}
+        return "<html></html>", None, ParsedPage(page, navs[link], {"nav_preserves_order": True})
+
+    downloader._fetch_nav_page = fetch_nav_page
+    start = time.perf_counter()
+    asyncio.run(downloader._follow_nav_links(top, page_index=1))
+    return time.perf_counter() - start, downloader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,2000,5000", help="Comma-separated page counts")
+    parser.add_argument("--category-size", type=int, default=25, help="Pages per sidebar category")
+    parser.add_argument("--legacy-max", type=int, default=2000,
+                        help="Largest size to run the linear-scan store on (it grows quadratically)")
+    args = parser.parse_args()
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
+
+    print(f"{'pages':>6} {'nav links seen':>15} {'before s':>9} {'after s':>8} {'speedup':>8}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        top, navs = build_sidebar(size, args.category_size)
+        links_seen = sum(len(navs[url]) for url in navs)
+        after, new = crawl(PageStore, top, navs)
+        if size <= args.legacy_max:
+            before, old = crawl(LinearScanPageStore, top, navs)
+            if list(old.pages.values()) != list(new.pages.values()):
+                raise SystemExit(f"{size} pages: PageStore crawl differs from the linear-scan crawl")
+            print(f"{len(new.pages):>6} {links_seen:>15} {before:>9.2f} {after:>8.2f} {before / after:>7.1f}x")
+        else:
+            print(f"{len(new.pages):>6} {links_seen:>15} {'-':>9} {after:>8.2f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
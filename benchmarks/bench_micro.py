@@ -0,0 +1,88 @@
+"""Micro-benchmarks: extractors, page content conversion and markdown generation.
+
+Runs offline with pytest-benchmark. The extractor and content benchmarks use the
+full-size page of each platform in benchmarks/pages/ (see capture_pages.py and
+pages/sources.json); markdown generation uses the tests-21 reference sites (see
+corpus.py).
+Results are compared against benchmarks/baseline.json (see conftest.py).
+
+Usage:
+    poetry run pytest benchmarks/bench_micro.py [--max-regression 0.5] [--save-baseline]
+"""
+import os
+
+import pytest
+
+import corpus
+from capture_pages import CAPTURES, PAGES_DIR
+from gitbook_downloader import (
+    DocusaurusExtractor,
+    FallbackExtractor,
+    GitBookExtractor,
+    GitbookDownloader,
+    MintlifyExtractor,
+    ModernGitBookExtractor,
+    VocsExtractor,
+    make_soup,
+    process_page_content,
+)
+
+EXTRACTORS = {
+    "mintlify": MintlifyExtractor,
+    "vocs": VocsExtractor,
+    "docusaurus": DocusaurusExtractor,
+    "modern_gitbook": ModernGitBookExtractor,
+    "gitbook": GitBookExtractor,
+    "fallback": FallbackExtractor,
+}
+
+# page, its site's base URL, extractor that handles it
+PAGES = [(filename, corpus.SITES[site][0], EXTRACTORS[platform]) for filename, _, site, platform, _ in CAPTURES]
+PAGE_IDS = [filename.rsplit(".", 1)[0] for filename, _, _ in PAGES]
+
+MARKDOWN_SITES = ["aztec-docs.md", "metalex-docs.md", "zama-protocol-docs.md"]
+
+
+def load_page(filename):
+    with open(os.path.join(PAGES_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def site_downloader(filename):
+    """A downloader holding a tests-21 site's pages in TOC order, as after a crawl."""
+    base_url, _ = corpus.SITES[filename]
+    toc, pages = corpus.load_site(filename)
+    by_title = {title: (url, content) for url, title, content in pages}
+    downloader = GitbookDownloader(base_url, native_md=False)
+    downloader.nav_preserves_order = True
+    for index, (title, depth, is_header) in enumerate(toc):
+        url, content = (None, None) if is_header else by_title.get(title, (None, None))
+        downloader.pages[index] = {"index": index, "depth": depth, "title": title, "content": content, "url": url}
+    return downloader
+
+
+@pytest.mark.parametrize("filename,base_url,extractor_cls", PAGES, ids=PAGE_IDS)
+def test_can_handle(bench, filename, base_url, extractor_cls):
+    soup = make_soup(load_page(filename))
+    assert bench(extractor_cls().can_handle, soup)
+
+
+@pytest.mark.parametrize("filename,base_url,extractor_cls", PAGES, ids=PAGE_IDS)
+def test_extract(bench, filename, base_url, extractor_cls):
+    soup = make_soup(load_page(filename))
+    extractor = extractor_cls()
+    assert bench(lambda: extractor.extract(soup, base_url, set()))
+
+
+@pytest.mark.parametrize("filename,base_url,extractor_cls", PAGES, ids=PAGE_IDS)
+def test_process_page_content(bench, filename, base_url, extractor_cls):
+    html = load_page(filename)
+    page = bench(process_page_content, base_url, html)
+    assert page["content"]
+
+
+@pytest.mark.parametrize("filename", MARKDOWN_SITES, ids=[name.rsplit("-docs", 1)[0] for name in MARKDOWN_SITES])
+def test_generate_markdown(bench, filename):
+    downloader = site_downloader(filename)
+    markdown = bench(downloader._generate_markdown)
+    assert markdown.startswith("# Table of Contents")
@@ -0,0 +1,87 @@
+"""Benchmark: parse time per page, three parses vs the single-parse pipeline.
+
+Before: BeautifulSoup parses the page for content extraction, again for nav
+extraction, and markdownify re-parses str(main_content).
+After: parse_page parses once and feeds both steps from the same soup.
+
+Runs offline on the tests-21 reference sites (see corpus.py) and checks that both
+pipelines produce identical page records and nav links.
+
+Usage:
+    python benchmarks/bench_parse.py [--max-pages N] [--repeat N]
+"""
+import argparse
+import statistics
+import time
+
+import markdownify
+
+import corpus  # noqa: F401  (puts the repo root on sys.path)
+import gitbook_downloader
+from gitbook_downloader import (
+    GitbookDownloader,
+    ParsedPage,
+    extract_nav_links,
+    parse_page,
+    process_page_content,
+)
+
+
+def reparse_html_to_markdown(element):
+    return markdownify.markdownify(str(element), heading_style="atx")
+
+
+def three_parse_pipeline(url, html, base_url, extractors):
+    """The pre-single-parse path: every step parses the HTML on its own."""
+    original = gitbook_downloader.html_to_markdown
+    gitbook_downloader.html_to_markdown = reparse_html_to_markdown
+    try:
+        page = process_page_content(url, html)
+    finally:
+        gitbook_downloader.html_to_markdown = original
+    return ParsedPage(page, *extract_nav_links(html, base_url, extractors))
+
+
+def single_parse_pipeline(url, html, base_url, extractors):
+    # Per-phase timings are only recorded by parse_page; they aren't part of the output
+    return tuple(parse_page(url, html, base_url, extractors)._replace(timings=None))
+
+
+def time_per_page(pipeline, pages, base_url, extractors, repeat):
+    """Return the median seconds per page over `repeat` runs, plus the last run's results."""
+    runs = []
+    for _ in range(repeat):
+        results = []
+        start = time.perf_counter()
+        for url, html in pages:
+            results.append(pipeline(url, html, base_url, extractors))
+        runs.append((time.perf_counter() - start) / len(pages))
+    return statistics.median(runs), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-pages", type=int, default=40, help="Pages per site (default 40)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per pipeline (default 3)")
+    args = parser.parse_args()
+
+    print(f"{'site':<24} {'pages':>5} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+    totals = [0.0, 0.0, 0]
+    for filename, (base_url, _) in corpus.SITES.items():
+        pages = list(corpus.iter_site_pages(filename, args.max_pages))
+        extractors = GitbookDownloader(base_url, native_md=False).extractors
+        before, old_results = time_per_page(three_parse_pipeline, pages, base_url, extractors, args.repeat)
+        after, new_results = time_per_page(single_parse_pipeline, pages, base_url, extractors, args.repeat)
+        if old_results != new_results:
+            raise SystemExit(f"{filename}: single-parse output differs from the three-parse pipeline")
+        totals[0] += before * len(pages)
+        totals[1] += after * len(pages)
+        totals[2] += len(pages)
+        print(f"{filename:<24} {len(pages):>5} {before * 1000:>10.2f} {after * 1000:>9.2f} {before / after:>7.2f}x")
+
+    before, after = totals[0] / totals[2], totals[1] / totals[2]
+    print(f"{'all sites':<24} {totals[2]:>5} {before * 1000:>10.2f} {after * 1000:>9.2f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark: TOC generation time on large synthetic navs.
+
+Before: each section header scanned ahead to its next sibling to decide whether it
+was empty, which is quadratic when a nav has long runs of nested headers (collapsed
+sections), and every entry re-ran slugify.
+After: _generate_markdown decides headers with a single stack-based pass and
+memoizes anchors (toc_anchor), so generation time grows linearly with the nav.
+
+Two nav shapes: "wide", where a collapsed section's sub-headers are siblings, so the
+look-ahead stops at the next one and both are linear; and "deep", where each sub-header
+nests in the previous one (a collapsed category tree), so every header scans the rest
+of the run. Before and after runs alternate, so a slowdown of the machine hits both.
+
+Checks that both produce the same markdown at every size.
+
+Usage:
+    python benchmarks/bench_toc.py [--sizes 10000,20000,40000] [--shapes wide,deep] [--repeat N]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from slugify import slugify
+
+import corpus  # noqa: F401  (puts the repo root on sys.path)
+from gitbook_downloader import GitbookDownloader, toc_anchor
+
+BASE_URL = "https://docs.example.com/"
+
+
+def legacy_markdown(sorted_pages, strict):
+    """The pre-stack generator: look ahead from every header, slugify every entry."""
+    empty = set()
+    for i, page in enumerate(sorted_pages):
+        if page.get("url") is None:
+            header_depth = page.get("depth", 0)
+            has_children = False
+            next_is_header = True
+            for j in range(i + 1, len(sorted_pages)):
+                next_page = sorted_pages[j]
+                next_depth = next_page.get("depth", 0)
+                if next_page.get("url") is None:
+                    if next_depth <= header_depth:
+                        break
+                    continue
+                next_is_header = False
+                has_children = next_depth > header_depth if strict else True
+                break
+            if not has_children and (next_is_header or strict):
+                empty.add(i)
+
+    lines, seen_urls, seen_headers = [], set(), set()
+    for i, page in enumerate(sorted_pages):
+        if not page.get("title") or i in empty:
+            continue
+        title, url = page["title"].strip(), page.get("url")
+        if url is None:
+            if title in seen_headers:
+                continue
+            seen_headers.add(title)
+            lines.append(f"{'  ' * page.get('depth', 0)}**{title}**")
+        else:
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            lines.append(f"{'  ' * page.get('depth', 0)}- [{title}](#{slugify(title)})")
+
+    # Body, as _generate_markdown writes it
+    parts, seen_titles = ["# Table of Contents\n", *lines, "\n---\n"], set()
+    for page in sorted_pages:
+        title = (page.get("title") or "").strip()
+        if title and page.get("content") and title not in seen_titles:
+            parts += [f"\n# {title}", f"\nSource: {page['url']}\n", page["content"].strip(), "\n---\n"]
+            seen_titles.add(title)
+    return "\n".join(parts)
+
+
+def synthetic_nav(size, seed=0, deep=False):
+    """A large nav: sections of pages plus collapsed sections (runs of headers with no pages).
+
+    With deep, a collapsed section's sub-headers nest one level per header instead of
+    being siblings.
+    """
+    rng = random.Random(seed)
+    pages = {}
+    while len(pages) < size:
+        section = len(pages)
+        pages[section] = {"title": f"Section {section}", "url": None, "depth": 0}
+        if rng.random() < 0.3:
+            # Collapsed section: its sub-headers are listed but their pages aren't
+            for level in range(rng.randint(50, 500)):
+                pages[len(pages)] = {"title": f"Group {len(pages)}", "url": None, "depth": level + 1 if deep else 1}
+        for _ in range(rng.randint(5, 40)):
+            index = len(pages)
+            pages[index] = {"title": f"Page {index}", "url": f"{BASE_URL}section-{section}/page-{index}",
+                            "depth": rng.choice([1, 1, 2]), "content": f"About page {index}."}
+    for index, page in pages.items():
+        page["index"] = index
+    return pages
+
+
+def timed(func, before=None):
+    if before:
+        before()
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def median_times(funcs, repeat):
+    """Median seconds and last result of each (func, before) pair, alternating between them."""
+    runs = [[] for _ in funcs]
+    results = [None] * len(funcs)
+    for _ in range(repeat):
+        for i, (func, before) in enumerate(funcs):
+            seconds, results[i] = timed(func, before)
+            runs[i].append(seconds)
+    return [(statistics.median(times), result) for times, result in zip(runs, results)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,20000,40000", help="Comma-separated nav sizes")
+    parser.add_argument("--shapes", default="wide,deep", help="Comma-separated nav shapes: wide, deep")
+    parser.add_argument("--repeat", type=int, default=7, help="Runs per measurement (default 7)")
+    args = parser.parse_args()
+
+    print(f"{'nav':>5} {'entries':>8} {'before ms':>10} {'after ms':>9} {'warm ms':>8} {'speedup':>8}")
+    for shape in args.shapes.split(","):
+        for size in (int(value) for value in args.sizes.split(",")):
+            downloader = GitbookDownloader(BASE_URL, native_md=False)
+            downloader.nav_preserves_order = True
+            downloader.pages = synthetic_nav(size, deep=shape == "deep")
+
+            def legacy():
+                # Sorting included: the old _generate_markdown sorted the pages too
+                return legacy_markdown(sorted(downloader.pages.values(), key=lambda p: p["index"]), True)
+
+            # Cold: anchors slugified from scratch; warm: repeated generation, as when the web UI polls
+            (before, expected), (after, markdown), (warm, _) = median_times([
+                (legacy, toc_anchor.cache_clear),
+                (downloader._generate_markdown, toc_anchor.cache_clear),
+                (downloader._generate_markdown, None),
+            ], args.repeat)
+            if markdown != expected:
+                raise SystemExit(f"{shape} nav of {size} entries: markdown differs from the legacy generator")
+            print(f"{shape:>5} {len(downloader.pages):>8} {before * 1000:>10.1f} {after * 1000:>9.1f} "
+                  f"{warm * 1000:>8.1f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Capture the full-size page of each platform that bench_micro.py times.
+
+One large page per extractor is saved to benchmarks/pages/: the HTML as served by
+the live site, sidebar, scripts and all. Where a page can't be fetched (offline,
+or no reference site runs the platform) it is rebuilt from the tests-21 copy of a
+reference site instead: the page's own markdown and the site's whole TOC, in the
+platform's sidebar markup (see corpus.py). pages/sources.json records which of
+the two each file is.
+
+Usage:
+    poetry run python benchmarks/capture_pages.py             # live where possible
+    poetry run python benchmarks/capture_pages.py --offline   # rebuild every page from tests-21
+
+Re-record the bench_micro.py baseline (--save-baseline) after re-capturing.
+"""
+import argparse
+import json
+import os
+import urllib.request
+
+import corpus
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+# file, page URL, reference site, platform markup, whether the URL serves that platform.
+# Each is the largest page of its site in tests-21. No reference site runs legacy
+# GitBook or a sidebar-less layout, so those two are always rebuilt.
+CAPTURES = [
+    ("docusaurus.html", "https://docs.aztec.network/developers/docs/resources/migration_notes",
+     "aztec-docs.md", "docusaurus", True),
+    ("vocs.html", "https://metalex-docs.vercel.app/faq", "metalex-docs.md", "vocs", True),
+    ("mintlify.html", "https://docs.metadao.fi/token/mechanics", "metadao-docs.md", "mintlify", True),
+    ("modern_gitbook.html", "https://docs.zama.org/protocol/zama-protocol-litepaper",
+     "zama-protocol-docs.md", "modern_gitbook", True),
+    ("gitbook.html", "https://noir-lang.org/docs/reference/nargo_commands", "noir-docs.md", "gitbook", False),
+    ("fallback.html", "https://noir-lang.org/docs/reference/nargo_commands", "noir-docs.md", "fallback", False),
+]
+
+
+def fetch(url):
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (gitbook-downloader benchmarks)"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read().decode(response.headers.get_content_charset() or "utf-8", errors="replace")
+
+
+def rebuild(url, site, platform):
+    """Render one page of a tests-21 reference site with the given platform's sidebar."""
+    toc, pages = corpus.load_site(site)
+    sidebar = corpus.render_sidebar(platform, toc, pages)
+    for page_url, title, content in pages:
+        if page_url == url:
+            return corpus.render_page(sidebar, page_url, title, content)
+    raise SystemExit(f"{url} is not in tests-21/{site}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--offline", action="store_true", help="Rebuild every page from tests-21")
+    args = parser.parse_args()
+
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    sources = {}
+    for filename, url, site, platform, live in CAPTURES:
+        html = None
+        if live and not args.offline:
+            try:
+                html = fetch(url)
+                sources[filename] = {"source": "live", "url": url}
+            except OSError as e:
+                print(f"{filename}: {url} failed ({e}), rebuilding from tests-21")
+        if html is None:
+            html = rebuild(url, site, platform)
+            sources[filename] = {"source": f"tests-21/{site}", "url": url, "platform": platform}
+        with open(os.path.join(PAGES_DIR, filename), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"{filename:<20} {len(html.encode('utf-8')):>8} bytes  {sources[filename]['source']}")
+
+    with open(os.path.join(PAGES_DIR, "sources.json"), "w", encoding="utf-8") as f:
+        json.dump(sources, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""pytest-benchmark setup for bench_micro.py: a regression check against a stored baseline.
+
+    poetry run pytest benchmarks/bench_micro.py                      # compare with baseline.json
+    poetry run pytest benchmarks/bench_micro.py --max-regression 0.2
+    poetry run pytest benchmarks/bench_micro.py --save-baseline      # record a new baseline
+
+Every benchmark round is paired with a calibration run (stdlib html.parser on a fixed
+document) timed right before it, and the stored figure is a low percentile of the
+per-round ratios. The ratio carries a baseline over to a faster or slower machine, and
+pairing each round with its own calibration cancels the slowdowns a shared machine
+goes through mid-run (CPU steal, frequency scaling), which last far longer than a
+round. Noise only ever adds time, so a low percentile is steadier than the median.
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from html.parser import HTMLParser
+
+import pytest
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+CALIBRATION_HTML = "".join(
+    f'<li class="menu__list-item"><a class="menu__link" href="/docs/page-{i}">Page {i}</a></li>'
+    for i in range(500)
+)
+
+ROUND_SECONDS = 0.002  # Calls per round are batched up to about this long, so tiny functions time reliably
+BENCHMARK_SECONDS = 1.5  # Time budget per benchmark, calibration included
+MIN_ROUNDS, MAX_ROUNDS = 15, 200
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("baseline", "benchmark baseline")
+    group.addoption("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file (default benchmarks/baseline.json)")
+    group.addoption("--save-baseline", action="store_true", help="Write this run's results to the baseline file")
+    group.addoption("--max-regression", type=float, default=0.5,
+                    help="Fail when a benchmark is this fraction slower than its baseline (default 0.5)")
+
+
+def timed(func, *args, **kwargs):
+    """Seconds for one call of func."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def calibrate():
+    """Seconds for one calibration run on this machine."""
+    return timed(HTMLParser().feed, CALIBRATION_HTML)
+
+
+class Baseline:
+    """Relative timings by benchmark name, loaded from and saved to the baseline file."""
+
+    def __init__(self, path, save, max_regression):
+        self.path = path
+        self.save = save
+        self.max_regression = max_regression
+        self.results = {}
+        self.stored = {}
+        if not save and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.stored = json.load(f)["benchmarks"]
+
+    def check(self, name, benchmark, calibrations, calls):
+        if benchmark.stats is None:
+            return  # --benchmark-disable: ran once, nothing to compare
+        # Round i was timed right after calibration i
+        ratios = [duration / calls / calibration
+                  for duration, calibration in zip(benchmark.stats.stats.data, calibrations)]
+        relative = statistics.quantiles(ratios, n=10)[1]  # 20th percentile
+        self.results[name] = relative
+        expected = self.stored.get(name)
+        if expected is not None and relative > expected * (1 + self.max_regression):
+            pytest.fail(
+                f"{name} is {relative / expected - 1:.0%} slower than the baseline "
+                f"({relative:.4g} vs {expected:.4g} calibration units, allowed {self.max_regression:.0%})"
+            )
+
+    def write(self):
+        data = {
+            "recorded_on": f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}",
+            "units": "20th percentile of per-round seconds / paired calibration seconds",
+            "benchmarks": {name: float(f"{value:.4g}") for name, value in sorted(self.results.items())},
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    config = request.config
+    stored = Baseline(config.getoption("--baseline"), config.getoption("--save-baseline"),
+                      config.getoption("--max-regression"))
+    yield stored
+    if stored.save and stored.results:
+        stored.write()
+
+
+@pytest.fixture
+def bench(benchmark, baseline, request):
+    """Like the benchmark fixture, then checks the timing against the baseline."""
+    def run(func, *args, **kwargs):
+        # A first call warms caches and sizes the rounds
+        result = func(*args, **kwargs)
+        once = max(timed(func, *args, **kwargs), 1e-7)
+        calls = max(1, round(ROUND_SECONDS / once))
+        rounds = int(BENCHMARK_SECONDS / (once * calls + calibrate()))
+        rounds = min(MAX_ROUNDS, max(MIN_ROUNDS, rounds))
+
+        def batch():
+            for _ in range(calls):
+                func(*args, **kwargs)
+
+        calibrations = []
+        benchmark.extra_info["calls_per_round"] = calls
+        benchmark.pedantic(batch, setup=lambda: calibrations.append(calibrate()), rounds=rounds)
+        baseline.check(request.node.name, benchmark, calibrations, calls)
+        return result
+    return run
@@ -0,0 +1,197 @@
+"""Rebuild the tests-N reference sites as HTML pages for offline benchmarks.
+
+Each tests-N/*.md file holds a site's TOC and every page's markdown with its Source
+URL. The pages are rendered back to HTML with the `markdown` package and wrapped in
+the sidebar markup of the platform the site runs on, so extractors and content
+processing see the same structure they see on the live site.
+"""
+import os
+import re
+import sys
+from html import escape
+
+import markdown
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+CORPUS_DIR = os.path.join(ROOT, "tests-21")
+
+# Base URL and platform of each reference site (see DOCS in test.py and the Test Sites table in README.md)
+SITES = {
+    "aztec-docs.md": ("https://docs.aztec.network/", "docusaurus"),
+    "gmtribe-docs.md": ("https://gmtribe.gitbook.io/gmtribe/", "modern_gitbook"),
+    "metadao-docs.md": ("https://docs.metadao.fi/", "mintlify"),
+    "metalex-docs.md": ("https://metalex-docs.vercel.app/", "vocs"),
+    "noir-docs.md": ("https://noir-lang.org/docs/", "docusaurus"),
+    "zama-protocol-docs.md": ("https://docs.zama.org/protocol/", "modern_gitbook"),
+    "zama-solidity-docs.md": ("https://docs.zama.org/protocol/solidity-guides/", "modern_gitbook"),
+    "zamm-docs.md": ("https://docs.zamm.eth.limo/", "vocs"),
+}
+
+SECTION_PATTERN = re.compile(r"^# (.+)\n\nSource: (\S+)\n", re.MULTILINE)
+TOC_ENTRY_PATTERN = re.compile(r"^( *)(?:- \[(.+)\]\(#[^)]*\)|\*\*(.+)\*\*)$")
+
+
+def load_site(filename):
+    """Parse a tests-N markdown file into (toc, pages).
+
+    toc is a list of (title, depth, is_section_header); pages a list of
+    (url, title, markdown) in document order.
+    """
+    with open(os.path.join(CORPUS_DIR, filename), encoding="utf-8") as f:
+        text = f.read()
+
+    toc_text, _, body = text.partition("\n---\n")
+    toc = []
+    for line in toc_text.splitlines()[1:]:
+        match = TOC_ENTRY_PATTERN.match(line)
+        if match:
+            indent, link_title, header_title = match.groups()
+            toc.append((link_title or header_title, len(indent) // 2, header_title is not None))
+
+    pages = []
+    matches = list(SECTION_PATTERN.finditer(body))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(body)
+        content = body[match.end():end].strip()
+        if content.endswith("---"):
+            content = content[:-3].rstrip()
+        pages.append((match.group(2), match.group(1), content))
+    return toc, pages
+
+
+def _nest(toc, urls):
+    """Turn the flat (title, depth, is_header) TOC into a tree of dicts."""
+    root = {"children": [], "depth": -1}
+    stack = [root]
+    for title, depth, is_header in toc:
+        node = {"title": title, "url": None if is_header else urls.get(title, "#"),
+                "depth": depth, "children": []}
+        while stack[-1]["depth"] >= depth:
+            stack.pop()
+        stack[-1]["children"].append(node)
+        stack.append(node)
+    return root["children"]
+
+
+def _docusaurus_sidebar(nodes):
+    items = []
+    for node in nodes:
+        title = escape(node["title"])
+        if node["url"] is None and not node["children"]:
+            items.append(f'<li class="sidebar-title"><span class="sidebar-title">{title}</span></li>')
+        elif node["children"]:
+            href = escape(node["url"] or "#")
+            items.append(
+                '<li class="theme-doc-sidebar-item-category menu__list-item">'
+                f'<div class="menu__list-item-collapsible"><a class="menu__link menu__link--sublist" href="{href}">{title}</a></div>'
+                f'{_docusaurus_sidebar(node["children"])}</li>'
+            )
+        else:
+            items.append(f'<li class="menu__list-item"><a class="menu__link" href="{escape(node["url"])}">{title}</a></li>')
+    return f'<ul class="theme-doc-sidebar-menu menu__list">{"".join(items)}</ul>'
+
+
+def _vocs_sidebar(nodes):
+    parts = []
+    for node in nodes:
+        title = escape(node["title"])
+        if node["children"]:
+            if node["url"] is None:
+                header = f'<div class="vocs_Sidebar_sectionTitle">{title}</div>'
+            else:
+                header = f'<a class="vocs_Sidebar_item" href="{escape(node["url"])}">{title}</a>'
+            parts.append(
+                f'<section class="vocs_Sidebar_section"><div class="vocs_Sidebar_sectionHeader">{header}</div>'
+                f'<div class="vocs_Sidebar_items">{_vocs_sidebar(node["children"])}</div></section>'
+            )
+        elif node["url"] is not None:
+            parts.append(f'<a class="vocs_Sidebar_item" href="{escape(node["url"])}">{title}</a>')
+    return "".join(parts)
+
+
+def _list_items(nodes, link_class=""):
+    items = []
+    for node in nodes:
+        title = escape(node["title"])
+        if node["url"] is None:
+            label = f'<div class="text-xs uppercase tracking-wide font-semibold">{title}</div>'
+        else:
+            label = f'<a class="{link_class}" href="{escape(node["url"])}">{title}</a>'
+        nested = f'<ul>{_list_items(node["children"], link_class)}</ul>' if node["children"] else ""
+        items.append(f"<li>{label}{nested}</li>")
+    return "".join(items)
+
+
+def _gitbook_items(nodes):
+    items = []
+    for node in nodes:
+        title = escape(node["title"])
+        if node["url"] is None:
+            # Part headers sit between the chapters they group
+            items.append(f'<li class="header">{title}</li>{_gitbook_items(node["children"])}')
+            continue
+        nested = f'<ul class="articles">{_gitbook_items(node["children"])}</ul>' if node["children"] else ""
+        items.append(f'<li class="chapter"><a href="{escape(node["url"])}">{title}</a>{nested}</li>')
+    return "".join(items)
+
+
+def _plain_links(nodes):
+    return "".join(
+        (f'<a href="{escape(node["url"])}">{escape(node["title"])}</a>' if node["url"] else "")
+        + _plain_links(node["children"])
+        for node in nodes
+    )
+
+
+def _mintlify_sidebar(nodes):
+    groups = []
+    for node in nodes:
+        if node["url"] is None:
+            groups.append(
+                f'<div><div class="sidebar-group-header"><h5>{escape(node["title"])}</h5></div>'
+                f'<ul class="sidebar-group">{_list_items(node["children"])}</ul></div>'
+            )
+        else:
+            groups.append(f"<ul>{_list_items([node])}</ul>")
+    return f'<div id="navigation-items">{"".join(groups)}</div>'
+
+
+def render_sidebar(platform, toc, pages):
+    urls = {title: url for url, title, _ in pages}
+    nodes = _nest(toc, urls)
+    if platform == "docusaurus":
+        return f'<aside class="theme-doc-sidebar-container"><nav class="menu thin-scrollbar">{_docusaurus_sidebar(nodes)}</nav></aside>'
+    if platform == "vocs":
+        return f'<aside class="vocs_Sidebar"><nav class="vocs_Sidebar_navigation">{_vocs_sidebar(nodes)}</nav></aside>'
+    if platform == "mintlify":
+        return _mintlify_sidebar(nodes)
+    if platform == "modern_gitbook":
+        return f'<aside><ul id="table-of-contents">{_list_items(nodes, "toclink")}</ul></aside>'
+    if platform == "gitbook":
+        return f'<div class="book-summary"><nav role="navigation"><ul class="summary">{_gitbook_items(nodes)}</ul></nav></div>'
+    if platform == "fallback":
+        return f'<div class="links">{_plain_links(nodes)}</div>'
+    raise ValueError(f"Unknown platform {platform}")
+
+
+def render_page(sidebar, url, title, content):
+    body = markdown.markdown(content, extensions=["fenced_code", "tables"])
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{escape(title)} | Docs</title>'
+        "<script>window.__theme = 'light';</script><style>body{margin:0}</style></head><body>"
+        f'<header><a href="/">Home</a><button>⌘K Search</button></header>'
+        f'<div class="main-wrapper">{sidebar}<main><article>{body}'
+        '<nav class="pagination-nav"><a href="/prev">Previous</a><a href="/next">Next</a></nav>'
+        f"</article></main></div><footer>© Docs</footer></body></html>"
+    )
+
+
+def iter_site_pages(filename, max_pages=None):
+    """Yield (url, html) for pages of a reference site."""
+    toc, pages = load_site(filename)
+    sidebar = render_sidebar(SITES[filename][1], toc, pages)
+    for url, title, content in pages[:max_pages]:
+        yield url, render_page(sidebar, url, title, content)
@@ -1,6 +1,12 @@
 import click
 import asyncio
-from gitbook_downloader import GitbookDownloader
+import json
+import os
+import time
+from gitbook_downloader import (
+    PARSER_BACKENDS, DownloadManifest, GitbookDownloader, HttpCache, RateLimiter, make_parse_pool,
+)
+from scheduler import DownloadScheduler
 
 
 @click.group()
@@ -12,23 +18,158 @@ def cli():
 @cli.command()
 @click.argument("url")
 @click.option("--output", "-o", default=None, help="Output markdown file")
-@click.option("--native", "-n", is_flag=True, help="Request native markdown")
+@click.option("--native", "-n", is_flag=True,
+              help="Fetch each page's native markdown ({url}.md), falling back to HTML if the site has none")
 @click.option("--section-only", "-s", is_flag=True, help="Only download pages within the same URL section")
-def download(url, output, native, section_only):
+@click.option("--concurrency", "-c", default=4, show_default=True, type=click.IntRange(min=1),
+              help="Max number of pages fetched in parallel")
+@click.option("--parse-workers", default=None, type=click.IntRange(min=0),
+              help="Processes for HTML parsing (default: CPU count for large crawls; 0 parses in-loop)")
+@click.option("--parser", "parser_backend", default="html.parser", show_default=True,
+              type=click.Choice(PARSER_BACKENDS), help="HTML parser backend")
+@click.option("--cache-dir", default=None, type=click.Path(file_okay=False),
+              help="Cache responses here and revalidate them with ETag/Last-Modified on re-crawls")
+@click.option("--cache-max-mb", default=512, show_default=True, type=click.IntRange(min=1),
+              help="Cache size cap; least recently used pages are evicted first")
+@click.option("--incremental", "-i", is_flag=True,
+              help="Reuse unchanged pages from the previous download to --output (see its .manifest.json)")
+@click.option("--sitemap", is_flag=True,
+              help="Discover pages from robots.txt/sitemap.xml and prefetch them while the nav is walked")
+@click.option("--force-crawl", is_flag=True,
+              help="Crawl the HTML navigation even if the site publishes llms-full.txt/llms.txt")
+def download(url, output, native, section_only, concurrency, parse_workers, parser_backend, cache_dir, cache_max_mb,
+             incremental, sitemap, force_crawl):
     """Download a GitBook by URL and save as markdown."""
+    if incremental and not output:
+        raise click.UsageError("--incremental requires --output")
 
     async def run():
-        downloader = GitbookDownloader(url, native, section_only=section_only)
-        markdown = await downloader.download()
+        downloader = GitbookDownloader(
+            url, native, section_only=section_only, max_concurrency=concurrency, parse_workers=parse_workers,
+            parser_backend=parser_backend,
+            http_cache=HttpCache(cache_dir, cache_max_mb * 1024 * 1024) if cache_dir else None,
+            previous_manifest=DownloadManifest.load(output) if incremental else None,
+            record_manifest=bool(output),
+            use_sitemap=sitemap,
+            force_crawl=force_crawl,
+        )
         if output:
-            with open(output, "w", encoding="utf-8") as f:
-                f.write(markdown)
+            # Stream page bodies through a spool file instead of building the document in memory
+            await downloader.download_to_file(output)
+            downloader.build_manifest(output).save()
+            if incremental:
+                click.echo(f"Reused {downloader.status.pages_reused} unchanged pages")
             click.echo(f"Saved to {output}")
         else:
-            click.echo(markdown)
+            click.echo(await downloader.download())
 
     asyncio.run(run())
 
 
+def load_batch(text):
+    """Parse a download-many list: a JSON array of [url, output] pairs, or one "url output" per line."""
+    try:
+        entries = json.loads(text)
+    except ValueError:
+        entries = [line.split() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    if not isinstance(entries, list) or not all(isinstance(entry, list) and len(entry) == 2 for entry in entries):
+        raise click.UsageError("Expected [url, output] pairs, as a JSON array or one \"url output\" per line")
+    return [(str(url), str(output)) for url, output in entries]
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+@cli.command("download-many")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--output-dir", "-d", default=None, type=click.Path(file_okay=False),
+              help="Directory for relative output paths (created if missing)")
+@click.option("--max-sites", default=3, show_default=True, type=click.IntRange(min=1),
+              help="Sites crawled at the same time; the rest wait in order")
+@click.option("--max-per-host", default=1, show_default=True, type=click.IntRange(min=1),
+              help="Sites on the same host crawled at the same time")
+@click.option("--native", "-n", is_flag=True,
+              help="Fetch each page's native markdown ({url}.md), falling back to HTML if the site has none")
+@click.option("--section-only", "-s", is_flag=True, help="Only download pages within the same URL section")
+@click.option("--concurrency", "-c", default=4, show_default=True, type=click.IntRange(min=1),
+              help="Max number of pages fetched in parallel per site")
+@click.option("--parse-workers", default=None, type=click.IntRange(min=0),
+              help="Processes for HTML parsing, shared by all sites (default: CPU count; 0 parses in-loop)")
+@click.option("--parser", "parser_backend", default="html.parser", show_default=True,
+              type=click.Choice(PARSER_BACKENDS), help="HTML parser backend")
+@click.option("--cache-dir", default=None, type=click.Path(file_okay=False),
+              help="Cache responses here and revalidate them with ETag/Last-Modified on re-crawls")
+@click.option("--cache-max-mb", default=512, show_default=True, type=click.IntRange(min=1),
+              help="Cache size cap; least recently used pages are evicted first")
+@click.option("--force-crawl", is_flag=True,
+              help="Crawl the HTML navigation even if the site publishes llms-full.txt/llms.txt")
+def download_many(source, output_dir, max_sites, max_per_host, native, section_only, concurrency, parse_workers,
+                  parser_backend, cache_dir, cache_max_mb, force_crawl):
+    """Download several sites in one process, reading [url, output] pairs from SOURCE (- for stdin)."""
+    sites = load_batch(source.read())
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        sites = [(url, os.path.join(output_dir, output)) for url, output in sites]
+    # One scheduler, rate limiter and cache for every site, so crawls of a shared
+    # host stay polite and its cached pages are reused
+    scheduler = DownloadScheduler(max_sites, max_per_host)
+    rate_limiter = RateLimiter()
+    http_cache = HttpCache(cache_dir, cache_max_mb * 1024 * 1024) if cache_dir else None
+    # One parse pool for every site too; a pool per site would run max_sites
+    # times as many processes as there are cores
+    if parse_workers is None:
+        parse_workers = os.cpu_count() if (os.cpu_count() or 1) > 1 else 0
+    parse_pool = make_parse_pool(parse_workers) if parse_workers else None
+    results = {}  # output -> (pages, bytes, seconds, error)
+
+    def job(url, output):
+        async def run():
+            started = time.monotonic()
+            downloader = GitbookDownloader(
+                url, native, section_only=section_only, max_concurrency=concurrency, parse_workers=parse_workers,
+                parse_pool=parse_pool, parser_backend=parser_backend, rate_limiter=rate_limiter, http_cache=http_cache,
+                record_manifest=True, force_crawl=force_crawl,
+            )
+            try:
+                await downloader.download_to_file(output)
+                downloader.build_manifest(output).save()
+                error = None
+            except Exception as e:
+                error = str(e)
+            size = os.path.getsize(output) if os.path.exists(output) else 0
+            results[output] = (len(downloader.status.pages_scraped), size, time.monotonic() - started, error)
+            click.echo(f"{'Failed' if error else 'Saved'}: {url} -> {output}", err=True)
+        return run
+
+    started = time.monotonic()
+    try:
+        jobs = [scheduler.submit(output, url, job(url, output)) for url, output in sites]
+        for submitted in jobs:
+            submitted.done.wait()
+    finally:
+        scheduler.shutdown()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+    elapsed = time.monotonic() - started
+
+    rows = [("Site", "Pages", "Bytes", "Time", "Status")]
+    for url, output in sites:
+        pages, size, seconds, error = results.get(output, (0, 0, 0.0, "not run"))
+        rows.append((url, str(pages), format_bytes(size), f"{seconds:.1f}s", f"error: {error}" if error else "ok"))
+    total_pages = sum(result[0] for result in results.values())
+    total_bytes = sum(result[1] for result in results.values())
+    rows.append(("Total", str(total_pages), format_bytes(total_bytes), f"{elapsed:.1f}s", ""))
+    widths = [max(len(row[column]) for row in rows) for column in range(4)]
+    for row in rows:
+        click.echo(f"{row[0]:<{widths[0]}}  {row[1]:>{widths[1]}}  {row[2]:>{widths[2]}}  {row[3]:>{widths[3]}}  {row[4]}")
+    if any(result[3] for result in results.values()) or len(results) < len(sites):
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     cli()
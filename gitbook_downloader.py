@@ -1,23 +1,49 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Optional, List, Set
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from itertools import accumulate, islice
+from typing import Dict, Optional, List, NamedTuple, Set
 from urllib.parse import urljoin, urlparse
 import asyncio
+import bisect
 import hashlib
+import json
 import logging
+import multiprocessing
+import os
 import re
+import tempfile
+import threading
 import time
+import zlib
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import Executor, ProcessPoolExecutor
 
 import aiohttp
 import markdownify
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from slugify import slugify
 
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # Optional, only needed for the selectolax parser backend
+    LexborHTMLParser = None
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# HTML parser backends. html.parser is the stdlib default; lxml is several times faster;
+# selectolax additionally extracts page content with lexbor (nav extraction uses lxml)
+PARSER_BACKENDS = ("html.parser", "lxml", "selectolax")
+
+# Crawls with fewer nav links than this parse on the event loop when parse_workers is
+# left to auto, since spawning worker processes costs more than it saves
+PROCESS_POOL_MIN_PAGES = 50
+
 # Regex to match version path segments (e.g., /v1/, /nightly/, /beta/)
 VERSION_PATH_PATTERN = re.compile(
     r'/(?:v\d+(?:\.\d+)*|nightly|canary|next|latest|testnet|stable|beta|alpha|rc\d*|dev|staging|main|master|trunk|edge|unstable)(?:/|$)',
@@ -25,6 +51,21 @@ VERSION_PATH_PATTERN = re.compile(
 )
 
 
+# Sitemap discovery limits: sitemap files fetched per download (indexes included)
+MAX_SITEMAP_FILES = 50
+
+# TOC helpers, compiled once since the TOC is regenerated on every web UI poll
+H2_HEADING_PATTERN = re.compile(r'^## (.+)$', re.MULTILINE)
+SECTION_NUMBER_PATTERN = re.compile(r'^(\d+(?:\.\d+)*)\s')
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+
+@lru_cache(maxsize=65536)
+def toc_anchor(title: str) -> str:
+    """Anchor slug for a TOC entry; memoized since slugify dominates TOC generation."""
+    return slugify(title)
+
+
 def normalize_url(href: str, base_url: str) -> Optional[str]:
     """Convert href to full URL, strip fragments, normalize slashes.
     Returns None if URL should be skipped (fragment-only or external)."""
@@ -128,6 +169,18 @@ def is_different_doc_section(url: str, base_url: str) -> bool:
     return False
 
 
+# Sidebar class patterns used by the extractors, compiled once rather than per call
+MENU_LIST_CLASS = re.compile(r'\bmenu__list\b')
+MENU_LINK_CLASS = re.compile(r'\bmenu__link\b')
+MENU_CLASS = re.compile(r'\bmenu\b')
+DOCUSAURUS_SIDEBAR_CLASS = re.compile(r'docSidebar|theme-doc-sidebar')
+SUBLIST_LINK_CLASS = re.compile(r'menu__link--sublist')
+CATEGORY_LINK_CLASS = re.compile(r'menu__link--sublist|menu__link')
+TOCLINK_CLASS = re.compile(r'\btoclink\b')
+TOCLINK_PART_CLASS = re.compile(r'toclink')
+GROUP_TOCLINK_CLASS = re.compile(r'group/toclink')
+
+
 class NavExtractor(ABC):
     """Abstract base class for navigation extraction strategies."""
 
@@ -142,6 +195,14 @@ class NavExtractor(ABC):
         URL can be None for section headers."""
         pass
 
+    def nav_container(self, soup: BeautifulSoup):
+        """The element extract() reads its links from, or None if they don't come from one element.
+
+        extract() must depend only on this element's subtree, since pages whose
+        container HTML is identical share one extraction (see sidebar_fingerprint).
+        """
+        return None
+
     def _process_nav_list(self, nav_list, base_url: str, processed_urls: Set[str], depth: int = 0) -> List[tuple]:
         """Recursively process navigation list items, tracking depth for hierarchy."""
         nav_links = []
@@ -166,12 +227,15 @@ class MintlifyExtractor(NavExtractor):
     def can_handle(self, soup: BeautifulSoup) -> bool:
         return soup.find(id="navigation-items") is not None
 
+    def nav_container(self, soup: BeautifulSoup):
+        return soup.find(id="navigation-items")
+
     def extract(self, soup: BeautifulSoup, base_url: str, processed_urls: Set[str]) -> List[tuple]:
         nav_links = []
-        navigation_items = soup.find(id="navigation-items")
+        navigation_items = self.nav_container(soup)
 
         for child in navigation_items.children:
-            if not hasattr(child, 'name'):
+            if not hasattr(child, 'name') or child.name is None:
                 continue
 
             # Check for section group (div with sidebar-group-header + sidebar-group ul)
@@ -232,9 +296,12 @@ class VocsExtractor(NavExtractor):
     def can_handle(self, soup: BeautifulSoup) -> bool:
         return soup.find(class_="vocs_Sidebar_navigation") is not None
 
+    def nav_container(self, soup: BeautifulSoup):
+        return soup.find(class_="vocs_Sidebar_navigation")
+
     def extract(self, soup: BeautifulSoup, base_url: str, processed_urls: Set[str]) -> List[tuple]:
         nav_links = []
-        nav = soup.find(class_="vocs_Sidebar_navigation")
+        nav = self.nav_container(soup)
         if not nav:
             return nav_links
 
@@ -328,30 +395,34 @@ class DocusaurusExtractor(NavExtractor):
 
     def can_handle(self, soup: BeautifulSoup) -> bool:
         # Docusaurus uses Infima CSS with menu__list and menu__link classes
-        menu_list = soup.find(class_=re.compile(r'\bmenu__list\b'))
-        menu_link = soup.find(class_=re.compile(r'\bmenu__link\b'))
+        menu_list = soup.find(class_=MENU_LIST_CLASS)
+        menu_link = soup.find(class_=MENU_LINK_CLASS)
         return menu_list is not None and menu_link is not None
 
-    def extract(self, soup: BeautifulSoup, base_url: str, processed_urls: Set[str]) -> List[tuple]:
-        nav_links = []
-
+    def nav_container(self, soup: BeautifulSoup):
         # Find the main sidebar navigation
-        sidebar = soup.find('nav', class_=re.compile(r'\bmenu\b'))
+        sidebar = soup.find('nav', class_=MENU_CLASS)
         if not sidebar:
-            sidebar = soup.find('aside', class_=re.compile(r'docSidebar|theme-doc-sidebar'))
+            sidebar = soup.find('aside', class_=DOCUSAURUS_SIDEBAR_CLASS)
         if not sidebar:
             # Try finding any element containing menu__list
-            menu_list = soup.find('ul', class_=re.compile(r'\bmenu__list\b'))
+            menu_list = soup.find('ul', class_=MENU_LIST_CLASS)
             if menu_list:
                 sidebar = menu_list.parent
+        return sidebar
+
+    def extract(self, soup: BeautifulSoup, base_url: str, processed_urls: Set[str]) -> List[tuple]:
+        nav_links = []
+
+        sidebar = self.nav_container(soup)
         if not sidebar:
             return nav_links
 
         # Find top-level menu lists - only take the first one to avoid duplicate
         # version sidebars (e.g., Aztec has multiple version docs)
-        menu_lists = sidebar.find_all('ul', class_=re.compile(r'\bmenu__list\b'), recursive=False)
+        menu_lists = sidebar.find_all('ul', class_=MENU_LIST_CLASS, recursive=False)
         if not menu_lists:
-            menu_lists = sidebar.find_all('ul', class_=re.compile(r'\bmenu__list\b'))
+            menu_lists = sidebar.find_all('ul', class_=MENU_LIST_CLASS)
 
         # Only process the first menu list to avoid duplicates from multiple versions
         if menu_lists:
@@ -395,12 +466,12 @@ class DocusaurusExtractor(NavExtractor):
 
             # Check if this is a category (collapsible section)
             is_category = 'theme-doc-sidebar-item-category' in class_str or \
-                          li.find(class_=re.compile(r'menu__link--sublist'))
+                          li.find(class_=SUBLIST_LINK_CLASS)
 
             if is_category:
                 # Extract category header
-                category_link = li.find('a', class_=re.compile(r'menu__link--sublist|menu__link'))
-                nested_list = li.find('ul', class_=re.compile(r'\bmenu__list\b'))
+                category_link = li.find('a', class_=CATEGORY_LINK_CLASS)
+                nested_list = li.find('ul', class_=MENU_LIST_CLASS)
                 has_nested = nested_list is not None
 
                 if category_link:
@@ -426,7 +497,7 @@ class DocusaurusExtractor(NavExtractor):
                     nav_links.extend(self._process_menu_list(nested_list, base_url, processed_urls, current_depth + 1))
             else:
                 # Regular link item
-                link = li.find('a', class_=re.compile(r'\bmenu__link\b'), href=True)
+                link = li.find('a', class_=MENU_LINK_CLASS, href=True)
                 if link:
                     url = normalize_url(link['href'], base_url)
                     if url and url not in processed_urls and not should_skip_url(url):
@@ -451,22 +522,14 @@ class ModernGitBookExtractor(NavExtractor):
             return True
 
         # Check for toclink class (GitBook's link styling)
-        toclink = soup.find(class_=re.compile(r'\btoclink\b'))
+        toclink = soup.find(class_=TOCLINK_CLASS)
         if toclink:
             return True
 
         # Check for group/toclink pattern (Tailwind group variant)
-        for elem in soup.find_all(class_=True):
-            classes = elem.get('class', [])
-            if isinstance(classes, list):
-                if any('group/toclink' in c for c in classes):
-                    return True
-
-        return False
-
-    def extract(self, soup: BeautifulSoup, base_url: str, processed_urls: Set[str]) -> List[tuple]:
-        nav_links = []
+        return soup.find(class_=GROUP_TOCLINK_CLASS) is not None
 
+    def nav_container(self, soup: BeautifulSoup):
         # Find the table of contents container
         toc = soup.find(id="table-of-contents")
         if not toc:
@@ -474,10 +537,17 @@ class ModernGitBookExtractor(NavExtractor):
         if not toc:
             # Fall back to finding aside with toclink children
             for aside in soup.find_all('aside'):
-                if aside.find(class_=re.compile(r'\btoclink\b')):
+                if aside.find(class_=TOCLINK_CLASS):
                     toc = aside
                     break
+        # _process_toc also looks for a #table-of-contents ancestor, but one can only
+        # exist when the container was found by that id
+        return toc
 
+    def extract(self, soup: BeautifulSoup, base_url: str, processed_urls: Set[str]) -> List[tuple]:
+        nav_links = []
+
+        toc = self.nav_container(soup)
         if not toc:
             return nav_links
 
@@ -556,7 +626,7 @@ class ModernGitBookExtractor(NavExtractor):
             # Process nested divs that might contain more nav items
             elif child.name == 'div':
                 # Check if this div contains toclinks
-                if child.find(class_=re.compile(r'toclink')):
+                if child.find(class_=TOCLINK_PART_CLASS):
                     nav_links.extend(self._process_toc(child, base_url, processed_urls, depth))
 
         return nav_links
@@ -605,6 +675,1309 @@ class FallbackExtractor(NavExtractor):
         return nav_links
 
 
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds to wait."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class HostRateLimiter:
+    """Adaptive token bucket for a single host.
+
+    The refill rate grows while responses are healthy and is cut on 429/503 or a
+    Retry-After hint, so fast doc hosts aren't held to a fixed delay and struggling
+    ones get backed off automatically.
+    """
+
+    def __init__(self, rate: float = 2.0, min_rate: float = 0.2, max_rate: float = 10.0,
+                 increase_factor: float = 1.05, backoff_factor: float = 0.5):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_factor = increase_factor
+        self.backoff_factor = backoff_factor
+        self.throttle_events = 0
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def capacity(self) -> float:
+        """Burst size - roughly one second's worth of requests."""
+        return max(1.0, self.rate)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token. Returns the number of seconds spent waiting."""
+        waited = 0.0
+        # The lock keeps waiters FIFO so concurrent fetches share the bucket fairly
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+                await asyncio.sleep(wait)
+                waited += wait
+
+    def on_success(self):
+        """Healthy response: speed up."""
+        self.rate = min(self.max_rate, self.rate * self.increase_factor)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """429/503 or Retry-After seen: slow down and honour the server's wait time."""
+        self.throttle_events += 1
+        self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = 0.0
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+
+class RateLimiter:
+    """Per-host registry of adaptive token buckets shared by every fetch.
+
+    Pass one instance to several downloaders to keep them polite towards a host
+    they crawl at the same time.
+    """
+
+    def __init__(self, **bucket_options):
+        self.bucket_options = bucket_options
+        self._hosts: Dict[str, HostRateLimiter] = {}
+
+    def for_url(self, url: str) -> HostRateLimiter:
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = HostRateLimiter(**self.bucket_options)
+        return self._hosts[host]
+
+    async def acquire(self, url: str) -> float:
+        return await self.for_url(url).acquire()
+
+    def record(self, url: str, status: int, retry_after: Optional[float] = None) -> bool:
+        """Feed a response back into the host's bucket. Returns True if it was throttled."""
+        bucket = self.for_url(url)
+        if status in (429, 503) or retry_after is not None:
+            bucket.on_throttle(retry_after)
+            return True
+        if status < 500:
+            bucket.on_success()
+        return False
+
+
+def make_soup(content: str, parser_backend: str = "html.parser") -> BeautifulSoup:
+    """Parse HTML into a BeautifulSoup tree for the given backend.
+
+    Extractors always work on BeautifulSoup, so the selectolax backend builds its
+    soup with lxml; selectolax is only used for content extraction.
+    """
+    features = "lxml" if parser_backend == "selectolax" else parser_backend
+    return BeautifulSoup(content, features)
+
+
+def check_parser_backend(parser_backend: str):
+    """Raise ValueError if the backend is unknown or its library isn't installed."""
+    if parser_backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend {parser_backend!r}, expected one of {', '.join(PARSER_BACKENDS)}")
+    if parser_backend == "selectolax" and LexborHTMLParser is None:
+        raise ValueError("The selectolax parser backend requires the selectolax package")
+    if parser_backend in ("lxml", "selectolax"):
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            raise ValueError(f"The {parser_backend} parser backend requires the lxml package")
+
+
+def html_to_markdown(element) -> str:
+    """Convert a parsed soup or tag to markdown without serializing and re-parsing it."""
+    converter = markdownify.MarkdownConverter(heading_style="atx")
+    md = converter.convert_soup(element)
+    if element.name != "[document]":
+        # markdownify strips leading/trailing newlines at document level when it parses
+        # the HTML itself; apply the same step so output matches markdownify(str(element))
+        md = converter.convert__document_(element, md, parent_tags=set())
+    return md
+
+
+def _lap(timings: Optional[Dict[str, float]], phase: str, start: float) -> float:
+    """Add the seconds since start to timings[phase] (if timing) and return the current time."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + now - start
+    return now
+
+
+# Markdown cleanup patterns, compiled once. `###+` and `\n\n\n+` are `#{3,}` and
+# `\n{3,}` spelled with a literal prefix, which lets the regex engine skip straight
+# to candidates instead of trying the pattern at every offset of the page
+EXTRA_NEWLINES_PATTERN = re.compile(r"\n\n\n+")
+DEEP_HEADING_PATTERN = re.compile(r"###+")
+PERMALINK_ANCHOR_PATTERN = re.compile(r'\[[\s\u200b]*\]\(#[^)]+\)\s*')
+ADJACENT_NAV_LINKS_PATTERN = re.compile(r'\[([^\]]+)\]\(/[^)]*\)\[([^\]]+)\]\(/[^)]*\)\s*$', re.MULTILINE)
+SHORTCUT_KEYS = "⌘⌃⌥⇧"
+SHORTCUT_HINT_PATTERN = re.compile(r'[⌘⌃⌥⇧]+[A-Za-z]\s*')
+
+# Page chrome removed from the main content before conversion
+CHROME_TAGS = frozenset(["nav", "aside", "header", "footer", "script", "style"])
+CHROME_ID_PATTERN = re.compile(r"sidebar|nav|menu", re.I)
+PAGER_TEXT_PATTERN = re.compile(r"Previous|Next")
+
+
+def clean_markdown(md: str) -> str:
+    """Tidy converted markdown: collapse blank lines, normalize headings, drop anchors and nav leftovers.
+
+    The passes run in this order because later ones see the earlier ones' output
+    (e.g. removing an anchor can leave two nav links adjacent at the end of a line).
+    """
+    md = EXTRA_NEWLINES_PATTERN.sub("\n\n", md)  # Remove extra newlines
+    md = DEEP_HEADING_PATTERN.sub("##", md)  # Normalize heading levels
+    # Remove permalink anchor links like [​](#anchor) or [ ](#anchor)
+    md = PERMALINK_ANCHOR_PATTERN.sub('', md)
+    # Remove adjacent navigation links (prev/next) at end of content
+    # Pattern: [text](url)[text](url) with no space between
+    md = ADJACENT_NAV_LINKS_PATTERN.sub('', md)
+    # Remove keyboard shortcut hints (⌘I, ⌃C, etc.) - most pages have none
+    if any(key in md for key in SHORTCUT_KEYS):
+        md = SHORTCUT_HINT_PATTERN.sub('', md)
+    return md
+
+
+def strip_page_chrome(main_content):
+    """Remove nav, sidebars, scripts, styles and prev/next links below main_content, in one walk.
+
+    Matches the former find_all/decompose pass per kind: chrome subtrees are
+    dropped as soon as they are reached, and a link's text is tested after its
+    own chrome is gone. Links are collected and removed after the walk, as a
+    nested link must not change whether its parent matches.
+    """
+    pager_links = []
+    stack = [(child, False) for child in reversed(main_content.contents) if isinstance(child, Tag)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            string = node.string
+            if string is not None and PAGER_TEXT_PATTERN.search(string):
+                pager_links.append(node)
+            continue
+        node_id = node.get("id")
+        if node.name in CHROME_TAGS or (isinstance(node_id, str) and CHROME_ID_PATTERN.search(node_id)):
+            node.decompose()
+            continue
+        if node.name == "a":
+            stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node.contents) if isinstance(child, Tag))
+    for link in pager_links:
+        link.decompose()
+
+
+def _clean_page_title(h1_text: Optional[str], title_text: Optional[str], url: str) -> str:
+    """Pick the page title: h1, else <title> without the site name, else the URL slug."""
+    title = h1_text
+    if not title and title_text:
+        # Clean up title - remove site name and extra parts
+        title = re.split(r"[|\-–]", title_text)[0].strip()
+    if not title:
+        title = urlparse(url).path.split("/")[-1] or "Introduction"
+    return title
+
+
+def process_page_content(url: str, content, parser_backend: str = "html.parser",
+                         timings: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+    """Extract the title and markdown body of a page.
+
+    content is raw HTML or an already parsed soup. A soup is modified in place
+    (nav, scripts etc. are decomposed), so extract nav links from it first.
+    Raw HTML with the selectolax backend takes the lexbor fast path. With
+    timings, the seconds spent parsing, converting and cleaning are added to it
+    by phase (see CRAWL_PHASES).
+    """
+    if parser_backend == "selectolax" and not isinstance(content, BeautifulSoup):
+        return _process_page_content_lexbor(url, content, timings)
+    try:
+        if isinstance(content, BeautifulSoup):
+            soup = content
+        else:
+            start = time.perf_counter()
+            soup = make_soup(content, parser_backend)
+            _lap(timings, "parse_seconds", start)
+
+        # Extract title
+        h1 = soup.find("h1")
+        title_tag = soup.find("title")
+        title = _clean_page_title(
+            h1.get_text(strip=True) if h1 else None,
+            title_tag.get_text(strip=True) if title_tag else None,
+            url,
+        )
+
+        # Get main content - prefer more specific containers first
+        # Look for article first (more specific), then main (less specific)
+        main_content = soup.find("article")
+        if not main_content:
+            # Try content-area div (common in Mintlify sites)
+            main_content = soup.find("div", {"id": "content-area"})
+        if not main_content:
+            main_content = soup.find("main")
+        if not main_content:
+            main_content = soup.find(
+                "div",
+                {"class": ["markdown", "content", "article", "documentation"]},
+            )
+        if not main_content:
+            main_content = soup
+
+        # Remove navigation, sidebars, scripts/styles and prev/next links
+        start = time.perf_counter()
+        strip_page_chrome(main_content)
+        start = _lap(timings, "cleanup_seconds", start)
+
+        # Convert to markdown
+        md = html_to_markdown(main_content)
+        start = _lap(timings, "convert_seconds", start)
+        md = clean_markdown(md)
+        _lap(timings, "cleanup_seconds", start)
+
+        return {"title": title, "content": md, "url": url}
+
+    except Exception as e:
+        logger.error(f"Error processing page content: {str(e)}")
+        return None
+
+
+def _lexbor_string(node) -> Optional[str]:
+    """Equivalent of BeautifulSoup's Tag.string: the text of a single-child chain."""
+    while node is not None and node.is_element_node:
+        child = node.child
+        if child is None or child.next is not None:
+            return None
+        node = child
+    return node.text_content if node is not None else None
+
+
+def _process_page_content_lexbor(url: str, content: str, timings: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+    """selectolax/lexbor fast path for process_page_content.
+
+    Finds and cleans the main content with lexbor, so BeautifulSoup only has to
+    parse the (much smaller) main content for markdownify.
+    """
+    try:
+        start = time.perf_counter()
+        tree = LexborHTMLParser(content)
+        _lap(timings, "parse_seconds", start)
+
+        h1 = tree.css_first("h1")
+        title_tag = tree.css_first("title")
+        title = _clean_page_title(
+            h1.text(strip=True) if h1 else None,
+            title_tag.text(strip=True) if title_tag else None,
+            url,
+        )
+
+        # Same container priority as the BeautifulSoup path
+        main_content = (
+            tree.css_first("article")
+            or tree.css_first("div#content-area")
+            or tree.css_first("main")
+            or tree.css_first("div.markdown, div.content, div.article, div.documentation")
+        )
+        is_document = main_content is None
+        if is_document:
+            main_content = tree.root
+
+        def descendants(selector):
+            # lexbor's css() includes the node itself; BeautifulSoup's find_all doesn't
+            return [node for node in main_content.css(selector) if node.mem_id != main_content.mem_id]
+
+        start = time.perf_counter()
+        for node in descendants("nav, aside, header, footer"):
+            node.decompose()
+        for node in descendants("[id]"):
+            if CHROME_ID_PATTERN.search(node.attributes.get("id") or ""):
+                node.decompose()
+        for node in descendants("script, style"):
+            node.decompose()
+        for node in descendants("a"):
+            string = _lexbor_string(node)
+            if string is not None and PAGER_TEXT_PATTERN.search(string):
+                node.decompose()
+        start = _lap(timings, "cleanup_seconds", start)
+
+        if is_document:
+            md = markdownify.markdownify(tree.html, heading_style="atx")
+        else:
+            md = markdownify.markdownify(main_content.html, heading_style="atx")
+        start = _lap(timings, "convert_seconds", start)
+        md = clean_markdown(md)
+        _lap(timings, "cleanup_seconds", start)
+
+        return {"title": title, "content": md, "url": url}
+
+    except Exception as e:
+        logger.error(f"Error processing page content: {str(e)}")
+        return None
+
+
+class PlatformDecision(NamedTuple):
+    """The docs platform detected on the landing page, pinned for the rest of the crawl."""
+    extractor: "NavExtractor"
+    has_global_nav: bool
+    nav_preserves_order: bool
+    sparse_nav: bool
+
+
+# Extractors that identify a specific platform. GitBookExtractor and FallbackExtractor
+# also match pages of those platforms, so a site they handle keeps detecting per page.
+PINNABLE_EXTRACTORS = (MintlifyExtractor, VocsExtractor, DocusaurusExtractor, ModernGitBookExtractor)
+
+
+class NavExtraction(NamedTuple):
+    """Result of extract_nav_links for one page."""
+    nav_links: List[tuple]
+    nav_flags: Dict
+    platform: Optional[PlatformDecision] = None  # Set when detection ran and found a specific platform
+    fingerprint: Optional[str] = None  # Sidebar fingerprint, when the links came from the nav container alone
+    cached: bool = False  # True when the links came from SIDEBAR_CACHE instead of extraction
+
+
+class SidebarCache:
+    """Nav extraction results keyed by (extractor, base URL, sidebar fingerprint).
+
+    Most pages of a Docusaurus, Vocs or GitBook site carry the same sidebar, or one
+    of a few variants, so pages whose nav container HTML is identical share one
+    extraction. A bounded LRU shared by the crawls in a process; each parse pool
+    worker has its own.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # The web app and download-many crawl on one scheduler loop, but the cache is
+        # module-level: other callers may run downloaders on loops in several threads
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[tuple]:
+        """(nav_links, nav_flags) copies for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        return list(entry[0]), dict(entry[1])
+
+    def put(self, key, nav_links: List[tuple], nav_flags: Dict):
+        with self._lock:
+            self._entries[key] = (tuple(nav_links), dict(nav_flags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+SIDEBAR_CACHE = SidebarCache()
+
+
+def sidebar_fingerprint(container, source: Optional[str] = None) -> str:
+    """SHA-256 of a nav container's HTML.
+
+    Re-serializing the container costs a good part of what extracting its links
+    does, so when the page source is given and the parser recorded source
+    positions (html.parser does, lxml doesn't), the container's markup is sliced
+    straight from the source: from its start tag to the next tag after it.
+    """
+    html = None
+    if source is not None and container.sourceline is not None:
+        start = _source_offset(source, container.sourceline, container.sourcepos)
+        node, following = container, None
+        while node is not None and following is None:
+            following = node.find_next_sibling()
+            node = node.parent
+        end = len(source)
+        if following is not None and following.sourceline is not None:
+            end = _source_offset(source, following.sourceline, following.sourcepos)
+        if source.startswith("<", start) and end > start:
+            html = source[start:end]
+    if html is None:
+        html = container.decode(formatter=None)
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def _source_offset(source: str, line: int, column: int) -> int:
+    """Offset in source of a 1-based line and 0-based column, as recorded by html.parser."""
+    offset = 0
+    for _ in range(line - 1):
+        offset = source.index("\n", offset) + 1
+    return offset + column
+
+
+def extract_nav_links(content, base_url: str, extractors: List[NavExtractor], parser_backend: str = "html.parser",
+                      platform: Optional[PlatformDecision] = None, source: Optional[str] = None) -> NavExtraction:
+    """Extract navigation links using the first matching extractor.
+
+    content is raw HTML or an already parsed soup (which is only read); source is
+    the soup's HTML, used to fingerprint the sidebar cheaply. The nav_flags in
+    the result hold the has_global_nav, nav_preserves_order and sparse_nav values
+    the page implies. Flags are returned rather than set so extraction can run in
+    a worker process.
+
+    With platform (the decision from an earlier page), its extractor runs without
+    any can_handle checks, and detection only runs if it finds no links. Pinned
+    extractions whose links all come from the nav container are cached by the
+    container's fingerprint, so later pages with the same sidebar skip extraction.
+    """
+    nav_flags = {}
+    try:
+        if isinstance(content, BeautifulSoup):
+            soup = content
+        else:
+            soup = make_soup(content, parser_backend)
+            source = content
+
+        if platform is not None:
+            extractor = platform.extractor
+            try:
+                fingerprint = None
+                container = extractor.nav_container(soup)
+                if container is not None:
+                    fingerprint = sidebar_fingerprint(container, source)
+                    key = (type(extractor).__name__, base_url, fingerprint)
+                    cached = SIDEBAR_CACHE.get(key)
+                    if cached is not None:
+                        return NavExtraction(*cached, fingerprint=fingerprint, cached=True)
+                nav_links, from_container = _run_extractor(extractor, soup, base_url, set(), nav_flags)
+            except Exception:
+                nav_links = []  # Page lacks the platform's sidebar markup
+            if nav_links:
+                if fingerprint is not None and from_container:
+                    SIDEBAR_CACHE.put(key, nav_links, nav_flags)
+                else:
+                    fingerprint = None  # Links also depend on the page content
+                return NavExtraction(nav_links, nav_flags, fingerprint=fingerprint)
+            nav_flags = {}
+
+        processed_urls = set()
+        for extractor in extractors:
+            if extractor.can_handle(soup):
+                nav_links, from_container = _run_extractor(extractor, soup, base_url, processed_urls, nav_flags)
+                if nav_links:
+                    if not isinstance(extractor, PINNABLE_EXTRACTORS):
+                        return NavExtraction(nav_links, nav_flags)
+                    decision = PlatformDecision(
+                        extractor,
+                        nav_flags.get("has_global_nav", False),
+                        nav_flags.get("nav_preserves_order", False),
+                        nav_flags.get("sparse_nav", False),
+                    )
+                    # Not cached: flags set by extractors tried before this one carry over
+                    container = extractor.nav_container(soup) if from_container else None
+                    fingerprint = sidebar_fingerprint(container, source) if container is not None else None
+                    return NavExtraction(nav_links, nav_flags, decision, fingerprint)
+
+        return NavExtraction([], nav_flags)
+
+    except Exception as e:
+        logger.error(f"Error extracting nav links: {str(e)}")
+        return NavExtraction([], nav_flags)
+
+
+def _run_extractor(extractor: NavExtractor, soup, base_url: str, processed_urls: Set[str], nav_flags: Dict):
+    """Extract nav links with one extractor, setting the flags its platform implies.
+
+    Returns (nav_links, from_container): nav_links is [] if the extractor finds
+    none, and from_container is False when they were supplemented with links
+    from the page content.
+    """
+    # Set flags based on extractor type:
+    # - has_global_nav: sidebar is identical on all pages (skip re-extraction)
+    # - nav_preserves_order: navigation order should be used for TOC sorting
+    if isinstance(extractor, MintlifyExtractor):
+        nav_flags["has_global_nav"] = True
+        nav_flags["nav_preserves_order"] = True
+    elif isinstance(extractor, (DocusaurusExtractor, ModernGitBookExtractor)):
+        # These extractors produce reliable nav ordering
+        nav_flags["nav_preserves_order"] = True
+    elif isinstance(extractor, VocsExtractor):
+        # VocsExtractor: check if sections are collapsed first before setting flag
+        pass  # Will be set below if nav is complete
+    nav_links = extractor.extract(soup, base_url, processed_urls)
+    if not nav_links:
+        return [], True
+    from_container = True
+    # For Vocs sites with collapsed sections, also extract content links
+    # to bootstrap into sections that aren't visible in the collapsed nav
+    if isinstance(extractor, VocsExtractor):
+        # Check if we have actual page URLs (not just section headers)
+        actual_pages = [link for link in nav_links if link[0] is not None]
+        section_headers = [link for link in nav_links if link[0] is None]
+        # If there are section headers but few pages, sections are likely collapsed
+        if section_headers and len(actual_pages) <= len(section_headers) + 3:
+            # Don't trust nav order when using fallback - use URL-based sorting
+            nav_flags["nav_preserves_order"] = False
+            # Mark nav as sparse so subnav extraction filters section headers
+            # (sub-pages have expanded sections with local depths that don't match global structure)
+            nav_flags["sparse_nav"] = True
+            from_container = False
+            fallback = FallbackExtractor()
+            content_links = fallback.extract(soup, base_url, processed_urls)
+            # Bump fallback depths by 1 since section headers are at depth 0
+            # and fallback items should nest under them
+            adjusted_links = [(url, title, depth + 1) for url, title, depth in content_links]
+            nav_links.extend(adjusted_links)
+        else:
+            # Nav is complete, preserve order
+            nav_flags["nav_preserves_order"] = True
+
+    # For Modern GitBook sites with client-rendered nav, also extract content links
+    # to find pages not visible in the static sidebar
+    if isinstance(extractor, ModernGitBookExtractor):
+        actual_pages = [link for link in nav_links if link[0] is not None]
+        # If we found fewer than 10 actual pages, supplement with content links
+        if len(actual_pages) < 10:
+            # Don't trust nav order when using fallback - use URL-based sorting
+            nav_flags["nav_preserves_order"] = False
+            from_container = False
+            fallback = FallbackExtractor()
+            content_links = fallback.extract(soup, base_url, processed_urls)
+            nav_links.extend(content_links)
+
+    # Deduplicate while preserving order
+    seen = set()
+    return [
+        item for item in nav_links
+        if item[0] is None or (item[0] not in seen and not seen.add(item[0]))
+    ], from_container
+
+
+class ParsedPage(NamedTuple):
+    """Output of the parse stage for one fetched page."""
+    page: Optional[Dict]  # title/content/url record, None if processing failed or skipped
+    nav_links: Optional[List[tuple]]  # None when nav extraction was skipped
+    nav_flags: Dict
+    platform: Optional[PlatformDecision] = None  # Set when this page's nav ran platform detection
+    nav_fingerprint: Optional[str] = None  # See NavExtraction
+    nav_cached: bool = False
+    timings: Optional[Dict[str, float]] = None  # Seconds per phase spent parsing this page (see CRAWL_PHASES)
+
+
+def parse_page(url: str, content: str, base_url: str, extractors: List[NavExtractor],
+               process_content: bool = True, extract_nav: bool = True,
+               parser_backend: str = "html.parser", platform: Optional[PlatformDecision] = None) -> ParsedPage:
+    """Parse stage: turn raw HTML into the page record and its nav links.
+
+    The HTML is parsed once and the soup feeds both steps. Module-level and free of
+    downloader state so it can run in a ProcessPoolExecutor; the pinned platform
+    is passed in (see extract_nav_links), and the time spent in each phase comes
+    back in the result's timings.
+    """
+    if not (process_content or extract_nav):
+        return ParsedPage(None, None, {})
+    timings = {}
+    if not extract_nav:
+        # Content only - lets the selectolax backend use its lexbor fast path
+        page = process_page_content(url, content, parser_backend, timings)
+        return ParsedPage(page, None, {}, timings=timings)
+    start = time.perf_counter()
+    soup = make_soup(content, parser_backend)
+    start = _lap(timings, "parse_seconds", start)
+    # Nav extraction only reads the tree, so it runs before content extraction
+    # decomposes nav/aside/header elements
+    nav = extract_nav_links(soup, base_url, extractors, platform=platform, source=content)
+    _lap(timings, "nav_extract_seconds", start)
+    page = process_page_content(url, soup, timings=timings) if process_content else None
+    return ParsedPage(page, *nav, timings)
+
+
+def make_parse_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for parse_page that is safe to start from a multithreaded process.
+
+    Workers come from a forkserver (spawn where there is none) instead of forking the
+    caller: the web app and download-many crawl on scheduler threads, and a forked
+    child can inherit a lock another thread held at that moment. Workers start on
+    demand, so an idle pool costs nothing.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+class CachedResponse(NamedTuple):
+    """A cached response body and the validators used to revalidate it."""
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class HttpCache:
+    """On-disk HTTP response cache with ETag/Last-Modified revalidation.
+
+    Entries are keyed by normalized URL and stored one file per URL: a JSON header
+    line (url, validators) followed by the body. File mtimes double as the LRU
+    clock, so the eviction order survives restarts. Only responses carrying a
+    validator are stored, since anything else can't be revalidated.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # The web app shares one cache across download threads
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self.total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(cache_dir):
+            if name.endswith(".cache"):
+                stat = os.stat(os.path.join(cache_dir, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def cache_key(url: str) -> str:
+        """Normalize a URL: lowercase scheme/host, no default port, fragment or trailing slash."""
+        parsed = urlparse(url)
+        scheme = parsed.scheme.lower()
+        netloc = parsed.netloc.lower()
+        if (scheme, netloc.rpartition(":")[2]) in (("http", "80"), ("https", "443")):
+            netloc = netloc.rpartition(":")[0]
+        key = f"{scheme}://{netloc}{parsed.path.rstrip('/') or '/'}"
+        return f"{key}?{parsed.query}" if parsed.query else key
+
+    def _file_name(self, url: str) -> str:
+        return hashlib.sha256(self.cache_key(url).encode("utf-8")).hexdigest() + ".cache"
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        name = self._file_name(url)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            try:
+                with open(os.path.join(self.cache_dir, name), "rb") as f:
+                    header = json.loads(f.readline())
+                    body = f.read().decode("utf-8")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry for {url}: {str(e)}")
+                self._remove(name)
+                return None
+        return CachedResponse(body, header.get("etag"), header.get("last_modified"))
+
+    @staticmethod
+    def conditional_headers(cached: CachedResponse) -> Dict[str, str]:
+        headers = {}
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def store(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]):
+        if not (etag or last_modified):
+            return
+        name = self._file_name(url)
+        header = json.dumps({"url": self.cache_key(url), "etag": etag, "last_modified": last_modified})
+        data = header.encode("utf-8") + b"\n" + body.encode("utf-8")
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.total_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+
+    def touch(self, url: str):
+        """Mark an entry as recently used (e.g. after a 304)."""
+        name = self._file_name(url)
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                try:
+                    os.utime(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, name: str):
+        self.total_bytes -= self._entries.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+
+class DownloadManifest:
+    """Per-page record of a download, written next to the output for incremental re-downloads.
+
+    For every page it keeps the URL, nav position (index and depth), the SHA256 of
+    the fetched source and of the converted markdown, and which nav links the page
+    produced. Page bodies aren't duplicated: `contents` maps a content hash to the
+    byte range of that body in the output file. A later run whose fetched source
+    hashes the same reuses the nav links and reads the body back from the old
+    output instead of parsing the page again.
+    """
+
+    VERSION = 1
+
+    def __init__(self, output_path: str, base_url: str, native_md: bool, pages: Optional[List[Dict]] = None,
+                 navs: Optional[List[Dict]] = None, contents: Optional[Dict[str, List[int]]] = None):
+        self.output_path = output_path
+        self.base_url = base_url
+        self.native_md = native_md
+        self.pages = pages or []  # Page entries in nav order
+        self.navs = navs or []  # Distinct {links, flags} nav extractions, referenced by index
+        self.contents = contents or {}  # content SHA256 -> [byte offset, byte length] in the output
+        self._by_url = {entry["url"]: entry for entry in self.pages if entry.get("url")}
+
+    @staticmethod
+    def path_for(output_path: str) -> str:
+        return f"{output_path}.manifest.json"
+
+    @classmethod
+    def load(cls, output_path: str) -> Optional["DownloadManifest"]:
+        """Load the manifest for output_path, or None if it is missing or no longer matches the output."""
+        try:
+            with open(cls.path_for(output_path), encoding="utf-8") as f:
+                data = json.load(f)
+            stat = os.stat(output_path)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != cls.VERSION:
+            return None
+        # Byte offsets are only valid for the exact file the manifest was written with
+        if (data.get("output_size"), data.get("output_mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+            logger.warning(f"{output_path} changed since its manifest was written; ignoring the manifest")
+            return None
+        return cls(output_path, data["base_url"], data["native_md"], data["pages"], data["navs"], data["contents"])
+
+    def save(self):
+        """Write the manifest; call after the output file has been written."""
+        stat = os.stat(self.output_path)
+        data = {
+            "version": self.VERSION,
+            "base_url": self.base_url,
+            "native_md": self.native_md,
+            "output_size": stat.st_size,
+            "output_mtime_ns": stat.st_mtime_ns,
+            "pages": self.pages,
+            "navs": self.navs,
+            "contents": self.contents,
+        }
+        path = self.path_for(self.output_path)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def matches(self, base_url: str, native_md: bool) -> bool:
+        return (self.base_url, self.native_md) == (base_url, native_md)
+
+    def reuse(self, url: str, source_hash: str, process_content: bool, extract_nav: bool) -> Optional[ParsedPage]:
+        """Return the previous parse of url if its source is unchanged and everything needed was recorded."""
+        entry = self._by_url.get(url)
+        if entry is None or entry["source_sha256"] != source_hash:
+            return None
+        nav_links, nav_flags = None, {}
+        if extract_nav:
+            if entry.get("nav") is None:
+                return None
+            nav = self.navs[entry["nav"]]
+            nav_links = [tuple(item) for item in nav["links"]]
+            nav_flags = dict(nav["flags"])
+        page = None
+        if process_content:
+            span = self.contents.get(entry["content_sha256"])
+            if span is None:
+                return None  # Body wasn't written (e.g. a later page with the same title)
+            try:
+                with open(self.output_path, "rb") as f:
+                    f.seek(span[0])
+                    body = f.read(span[1]).decode("utf-8")
+            except (OSError, UnicodeDecodeError):
+                return None
+            page = {"title": entry["page_title"], "content": body, "url": url,
+                    "content_hash": entry["content_sha256"]}
+        return ParsedPage(page, nav_links, nav_flags)
+
+
+LLMS_LINK_PATTERN = re.compile(r'^\s*[-*]\s*\[([^\]]+)\]\(([^)\s]+)\)')
+LLMS_SOURCE_PATTERN = re.compile(r'^(?:Source|URL):\s*(\S+)\s*$', re.IGNORECASE)
+
+
+def parse_llms_index(text: str, base_url: str) -> List[tuple]:
+    """Turn an llms.txt index into nav links: "## Section" headings and "- [Title](url)" entries.
+
+    Links are returned without a trailing .md so they name the page itself; the
+    markdown is fetched through the native markdown pipeline.
+    """
+    nav_links = []
+    in_section = False
+    for line in text.splitlines():
+        if line.startswith("## "):
+            nav_links.append((None, line[3:].strip(), 0))
+            in_section = True
+            continue
+        match = LLMS_LINK_PATTERN.match(line)
+        if not match:
+            continue
+        link = normalize_url(match.group(2), base_url)
+        if link is None or should_skip_url(link):
+            continue
+        if link.endswith(".md"):
+            link = link[:-3]
+        nav_links.append((link, match.group(1).strip(), 1 if in_section else 0))
+    return nav_links
+
+
+def split_llms_full(text: str, source_url: str) -> List[Dict]:
+    """Split an llms-full.txt document into page records at its top-level "# " headings.
+
+    A "Source: <url>" (or "URL:") line right under a heading gives the page URL;
+    otherwise the page is addressed as an anchor in llms-full.txt. Headings inside
+    fenced code blocks are ignored.
+    """
+    pages = []
+    title, lines, in_fence = None, [], False
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if title is None:
+            return  # Preamble before the first page
+        url = None
+        first_line, _, rest = body.partition("\n")
+        match = LLMS_SOURCE_PATTERN.match(first_line)
+        if match:
+            url, body = match.group(1), rest.strip()
+        pages.append({"title": title, "content": body, "url": url or f"{source_url}#{toc_anchor(title)}"})
+
+    for line in text.splitlines():
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        if not in_fence and line.startswith("# "):
+            flush()
+            title, lines = line[2:].strip(), []
+            continue
+        lines.append(line)
+    flush()
+    return pages
+
+
+class SitemapParser:
+    """Incremental sitemap.xml parser: feed it chunks as they arrive.
+
+    Handles both <urlset> sitemaps and <sitemapindex> files. Each finished entry is
+    dropped from the tree, so memory stays flat on 50k-URL sitemaps.
+    """
+
+    def __init__(self, gzipped: bool = False):
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+        self._root = None
+        self._entry = None  # "url" or "sitemap" while inside an entry
+
+    def feed(self, data: bytes) -> List[tuple]:
+        """Parse a chunk; returns the (kind, loc) entries it completed, kind being "url" or "sitemap"."""
+        if self._decompressor is not None:
+            data = self._decompressor.decompress(data)
+        self._parser.feed(data)
+        return self._read_events()
+
+    def close(self) -> List[tuple]:
+        if self._decompressor is not None:
+            self._parser.feed(self._decompressor.flush())
+        self._parser.close()
+        return self._read_events()
+
+    def _read_events(self):
+        entries = []
+        for event, elem in self._parser.read_events():
+            tag = elem.tag.rpartition("}")[2]  # Ignore the sitemaps.org namespace
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                elif tag in ("url", "sitemap"):
+                    self._entry = tag
+            elif tag == "loc" and self._entry and elem.text:
+                entries.append((self._entry, elem.text.strip()))
+            elif tag in ("url", "sitemap"):
+                self._entry = None
+                self._root.clear()
+        return entries
+
+
+class CrawlFrontier:
+    """Bounded worker pool that fetches nav links ahead of the crawl walk.
+
+    The walk in `_follow_nav_links` stays sequential, so page indexes and depths are
+    assigned exactly as a one-page-at-a-time crawl would assign them. The frontier only
+    makes sure the pages the walk is about to visit are already in flight.
+    """
+
+    def __init__(self, fetch, max_concurrency: int = 4, max_buffered: Optional[int] = None, process=None):
+        self._fetch = fetch
+        # Optional post-fetch stage (e.g. parsing) run outside the fetch slot so a
+        # CPU-bound step never holds up network concurrency
+        self._process = process
+        self.max_concurrency = max(1, max_concurrency)
+        # Cap on fetched-but-not-yet-consumed pages so prefetching a 5k-link sidebar
+        # doesn't hold every page body in memory at once
+        self.max_buffered = max_buffered or self.max_concurrency * 4
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._pending = OrderedDict()  # URLs queued for prefetch, FIFO
+        # Lower-priority URLs the walk may or may not visit (e.g. from a sitemap). They
+        # only use slots the walk's queue leaves idle, at most max_concurrency are in
+        # flight, and at most max_concurrency finished results are held - the oldest is
+        # dropped for a newer one, since many (tag pages, blog posts) are never in the nav
+        self._background = OrderedDict()
+        self._background_running = set()  # Background URLs being fetched
+        self._background_done = OrderedDict()  # Fetched background URLs not yet consumed, oldest first
+        self._tasks: Dict[str, asyncio.Task] = {}  # Started prefetches not yet consumed
+        self._consumed = set()  # URLs already handed to the walk, so late discoveries don't refetch them
+
+    @property
+    def queue_depth(self) -> int:
+        """URLs queued for prefetch that haven't started yet."""
+        return len(self._pending) + len(self._background)
+
+    def prefetch(self, urls, background: bool = False):
+        """Queue URLs for background fetching in the order the walk will visit them."""
+        for url in urls:
+            if url in self._tasks or url in self._pending or url in self._consumed:
+                continue
+            if background:
+                self._background.setdefault(url, None)
+            else:
+                self._background.pop(url, None)  # The walk needs it now - promote it
+                self._pending[url] = None
+        self._pump()
+
+    async def get(self, url):
+        """Return the fetch result for url, fetching it now if it hasn't started yet."""
+        task = self._tasks.pop(url, None)
+        self._background_running.discard(url)
+        self._background_done.pop(url, None)
+        self._consumed.add(url)
+        if task is None:
+            # Not started (or never queued) - fetch directly instead of waiting behind
+            # the prefetch buffer, otherwise a full buffer could block the walk forever
+            self._pending.pop(url, None)
+            self._background.pop(url, None)
+            result = await self._run(url)
+        else:
+            result = await task
+        self._pump()
+        return result
+
+    async def close(self):
+        """Cancel prefetches the walk never consumed."""
+        self._pending.clear()
+        self._background.clear()
+        self._background_running.clear()
+        self._background_done.clear()
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _pump(self):
+        while self._pending and (len(self._tasks) < self.max_buffered or self._background_done):
+            if len(self._tasks) >= self.max_buffered:
+                self._drop_background()  # The walk's prefetches come first
+            url, _ = self._pending.popitem(last=False)
+            self._tasks[url] = asyncio.ensure_future(self._run(url))
+        while (self._background and not self._pending and len(self._tasks) < self.max_buffered
+               and len(self._background_running) < self.max_concurrency):
+            url, _ = self._background.popitem(last=False)
+            self._background_running.add(url)
+            task = self._tasks[url] = asyncio.ensure_future(self._run(url))
+            task.add_done_callback(lambda task, url=url: self._background_finished(url))
+
+    def _background_finished(self, url):
+        """Free a finished background fetch's slot, holding its result for the walk."""
+        if url not in self._background_running:
+            return  # Consumed, or the frontier was closed
+        self._background_running.discard(url)
+        self._background_done[url] = None
+        while len(self._background_done) > self.max_concurrency:
+            self._drop_background()
+        self._pump()
+
+    def _drop_background(self):
+        """Forget the oldest unconsumed background result; the walk refetches it if it gets there."""
+        url, _ = self._background_done.popitem(last=False)
+        task = self._tasks.pop(url)
+        if not task.cancelled():
+            task.exception()  # Retrieved, so a failed fetch isn't reported as never retrieved
+
+    async def _run(self, url):
+        async with self._semaphore:
+            result = await self._fetch(url)
+        if self._process is not None:
+            result = await self._process(url, result)
+        return result
+
+
+class SpooledContent(NamedTuple):
+    """Location of a page body moved out of memory into the download's spool file."""
+    offset: int
+    length: int
+
+
+class PageStore(dict):
+    """The downloader's pages: index -> page record, in insertion (= nav) order.
+
+    A dict, so the markdown generators and existing callers read it unchanged, plus
+    a URL -> index map kept in step on assignment. The crawl looks pages up by URL
+    for every already-visited sidebar link, which was a scan over all pages.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._by_url = {}
+        self.edits = 0  # Replacements, deletions and depth changes; appending a page isn't one
+        for index, page in dict(*args, **kwargs).items():
+            self[index] = page
+
+    def __setitem__(self, index, page):
+        previous = self.get(index)
+        if previous is not None:
+            self.edits += 1
+            if self._by_url.get(previous.get("url")) == index:
+                del self._by_url[previous["url"]]
+        super().__setitem__(index, page)
+        if page.get("url") is not None:
+            self._by_url.setdefault(page["url"], index)
+
+    def __delitem__(self, index):
+        page = self[index]
+        super().__delitem__(index)
+        self.edits += 1
+        if self._by_url.get(page.get("url")) == index:
+            del self._by_url[page["url"]]
+
+    def find(self, url) -> Optional[int]:
+        """Index of the first page stored for url, or None."""
+        return self._by_url.get(url)
+
+    def update_depth(self, url, depth: int) -> bool:
+        """Move url's page to depth if that is deeper; returns True if the page changed.
+
+        Nav extraction gives the true depth, so a deeper sighting wins over a shallow
+        first discovery (e.g. a page first reached through content links at depth 0).
+        """
+        index = self._by_url.get(url)
+        if index is None or depth <= self[index].get("depth", 0):
+            return False
+        self[index]["depth"] = depth
+        self.edits += 1
+        return True
+
+
+class MarkdownRender:
+    """One rendering of a downloader's pages into TOC lines and body pieces.
+
+    Pages are fed in output order, to toc() for the table of contents and to body()
+    for the content, and the (text, content hash) pieces they yield are joined by
+    newlines. The dedup and empty-section state carries over between calls, so
+    markdown_snapshot can keep a render and feed it only pages added since.
+    """
+
+    def __init__(self, read_content, include_h2: bool = False, strict_depth: bool = False):
+        self.read_content = read_content  # page record -> markdown body
+        self.include_h2 = include_h2  # For single-page docs, include h2 headings for richer ToC
+        self.strict_depth = strict_depth
+        self.seen_urls = set()  # Track URLs to avoid duplicate pages in TOC
+        self.seen_section_headers = set()  # Track section header titles to avoid duplicates
+        self.seen_titles = set()  # Track titles for content deduplication
+        self.pending_headers = []
+
+    def toc(self, pages):
+        """TOC lines for pages, each preceded by the section headers it opens.
+
+        Empty section headers are dropped. A header is decided by the first item after
+        it that is either a URL item or a header at the same/shallower depth:
+        - A header: the section is empty
+        - A URL item: when nav order is reliable (strict_depth), the section has content
+          only if the item is nested deeper; with URL-sorted pages any URL item counts
+        Undecided headers wait on a stack (strictly increasing depth, since a header
+        closes every pending one at or below its depth), so each page is handled once.
+        One generator walks all the pages: a nav can have tens of thousands of entries,
+        and a generator per page costs about as much as rendering its line.
+        """
+        pending = self.pending_headers
+        for page in pages:
+            depth = page.get("depth", 0)
+            if page.get("url") is None:
+                while pending and pending[-1].get("depth", 0) >= depth:
+                    pending.pop()  # Closed with no URL item in between - empty
+                pending.append(page)
+                continue
+            for header in pending:
+                if not self.strict_depth or depth > header.get("depth", 0):
+                    line = self._toc_line(header)
+                    if line is not None:
+                        yield line, None
+            pending.clear()
+            line = self._toc_line(page)
+            if line is not None:
+                yield line, None
+                if self.include_h2 and page.get("content"):
+                    yield from self._h2_entries(page)
+
+    def _toc_line(self, page):
+        """TOC line for one page or section header, or None if it is skipped as a duplicate."""
+        if not page.get("title"):
+            return None
+        title = page["title"].strip()
+        url = page.get("url")
+
+        # Section headers deduplicated by title; pages deduplicated by URL
+        # This allows a page to have the same title as a section header
+        # Use depth for indentation (2 spaces per level)
+        indent = "  " * page.get("depth", 0)
+        if url is None:
+            if title in self.seen_section_headers:
+                return None
+            self.seen_section_headers.add(title)
+            # Section headers (no URL) shown as bold text, pages as links
+            return f"{indent}**{title}**"
+        if url in self.seen_urls:
+            return None
+        self.seen_urls.add(url)
+        return f"{indent}- [{title}](#{toc_anchor(title)})"
+
+    def _h2_entries(self, page):
+        """TOC sub-items for a page's h2 headings."""
+        current_section_depth = 0  # Track depth based on numbered sections
+        for h2 in H2_HEADING_PATTERN.findall(self.read_content(page)):
+            h2_clean = h2.strip()
+            if h2_clean:
+                # Determine depth from numbered prefix (e.g., "1" = depth 1, "1.1" = depth 2)
+                number_match = SECTION_NUMBER_PATTERN.match(h2_clean)
+                if number_match:
+                    number_parts = number_match.group(1).split('.')
+                    h2_depth = len(number_parts)  # "1" = 1, "1.1" = 2, "1.1.1" = 3
+                    current_section_depth = h2_depth
+                else:
+                    # Non-numbered heading: nest under current section
+                    h2_depth = current_section_depth + 1
+                h2_indent = "  " * h2_depth
+                yield f"{h2_indent}- [{h2_clean}](#{toc_anchor(h2_clean)})", None
+
+    def body(self, pages):
+        """Content pieces for pages: heading, source, body and separator for each."""
+        seen_titles = self.seen_titles
+        for page in pages:
+            if page.get("title") and page.get("content"):
+                title = page["title"].strip()
+
+                if title and title not in seen_titles:
+                    yield f"\n# {title}\n\nSource: {page['url']}\n", None
+                    yield self.read_content(page).strip(), page.get("content_hash")
+                    yield "\n---\n", None
+                    seen_titles.add(title)
+
+
+@dataclass
+class MarkdownSnapshot:
+    """The render markdown_snapshot keeps between polls, to extend with new pages."""
+    version: int  # pages_version rendered
+    layout: tuple  # Ordering flags and PageStore.edits it was rendered with
+    render: MarkdownRender
+    rendered: int  # Pages fed to render: the first `rendered` pages in insertion order
+    last_key: tuple  # Sort key of the last page in output order
+    toc: List[str]
+    body: List[str]
+    markdown: str
+
+
+# Histogram bucket upper bounds, in seconds and in bytes
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Crawl phases GitbookDownloader times: name -> (bucket bounds, description)
+CRAWL_PHASES = {
+    "fetch_seconds": (SECONDS_BUCKETS, "HTTP request latency, up to the body being read"),
+    "fetch_bytes": (BYTES_BUCKETS, "Size of fetched response bodies"),
+    "sleep_seconds": (SECONDS_BUCKETS, "Waits for the rate limiter and retry backoff"),
+    "parse_seconds": (SECONDS_BUCKETS, "HTML parsing"),
+    "nav_extract_seconds": (SECONDS_BUCKETS, "Navigation link extraction"),
+    "convert_seconds": (SECONDS_BUCKETS, "HTML to markdown conversion"),
+    "cleanup_seconds": (SECONDS_BUCKETS, "Page chrome removal and markdown cleanup"),
+    "render_seconds": (SECONDS_BUCKETS, "Table of contents and markdown document generation"),
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus layout: per-bucket counts, total count and sum."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float):
+        # bisect_left puts a value equal to a bound in that bound's bucket, as "le" means
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram"):
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+
+    def to_dict(self) -> Dict:
+        """count, sum and cumulative counts keyed by upper bound ("le"), ending with "+Inf"."""
+        cumulative = list(accumulate(self.counts))  # Copy first: observe() may run in another thread
+        buckets = {str(bound): total for bound, total in zip(self.buckets, cumulative)}
+        buckets["+Inf"] = cumulative[-1]
+        return {"count": cumulative[-1], "sum": round(self.sum, 6), "buckets": buckets}
+
+
+class CrawlMetrics:
+    """One histogram per crawl phase (see CRAWL_PHASES)."""
+
+    def __init__(self):
+        self.phases = {name: Histogram(buckets) for name, (buckets, _) in CRAWL_PHASES.items()}
+
+    def observe(self, phase: str, value: float):
+        self.phases[phase].observe(value)
+
+    def observe_timings(self, timings: Optional[Dict[str, float]]):
+        """Record a page's per-phase seconds, as returned in ParsedPage.timings."""
+        for phase, seconds in (timings or {}).items():
+            self.phases[phase].observe(seconds)
+
+    def merge(self, other: "CrawlMetrics"):
+        for name, histogram in other.phases.items():
+            self.phases[name].merge(histogram)
+
+    def to_dict(self) -> Dict:
+        return {name: histogram.to_dict() for name, histogram in self.phases.items()}
+
+
 @dataclass
 class DownloadStatus:
     top_level_pages: int = 0
@@ -616,10 +1989,45 @@ class DownloadStatus:
     pages_scraped: List[str] = None
     output_file: Optional[str] = None
     rate_limit_reset: Optional[int] = None
+    request_rate: Optional[float] = None  # Current requests/second allowed for the site's host
+    throttle_events: int = 0
+    cache_hits: int = 0  # Pages served from the HTTP cache after a 304
+    pages_reused: int = 0  # Unchanged pages taken from the previous download's manifest
+    sitemap_urls: int = 0  # In-scope page URLs discovered from sitemaps
+    llms_txt: Optional[str] = None  # llms-full.txt / llms.txt URL the pages came from, if any
+    platform: Optional[str] = None  # Docs platform pinned for nav extraction, e.g. "Docusaurus"
+    nav_extractions_saved: int = 0  # Sub-nav extractions served from the sidebar fingerprint cache
+    phases: Optional[CrawlMetrics] = None  # Per-phase timing and size histograms
+    # Callables(event, data) told about status changes, finished pages and rate limiting as they
+    # happen; they run on the download's event loop, so they should only hand the event off
+    listeners: Optional[List] = None
 
     def __post_init__(self):
         if self.pages_scraped is None:
             self.pages_scraped = []
+        if self.phases is None:
+            self.phases = CrawlMetrics()
+        if self.listeners is None:
+            self.listeners = []
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        """Change the status (and error), emitting a "status" event."""
+        self.status = status
+        if error is not None:
+            self.error = error
+        self.emit("status", {"status": status, "error": self.error, "output_file": self.output_file})
+
+    def add_page(self, title: str):
+        """Record a finished page, emitting a "page" event."""
+        self.pages_scraped.append(title)
+        self.emit("page", {"title": title, "count": len(self.pages_scraped), "total": self.top_level_pages})
+
+    def emit(self, event: str, data: Dict):
+        for listener in list(self.listeners):
+            try:
+                listener(event, data)
+            except Exception as e:
+                logger.error(f"Error in status listener: {str(e)}")
 
     def to_dict(self) -> Dict:
         return {
@@ -636,15 +2044,33 @@ class DownloadStatus:
             "pages_scraped": self.pages_scraped,
             "output_file": self.output_file,
             "rate_limit_reset": self.rate_limit_reset,
+            "request_rate": self.request_rate,
+            "throttle_events": self.throttle_events,
+            "cache_hits": self.cache_hits,
+            "pages_reused": self.pages_reused,
+            "sitemap_urls": self.sitemap_urls,
+            "llms_txt": self.llms_txt,
+            "platform": self.platform,
+            "nav_extractions_saved": self.nav_extractions_saved,
+            "phases": self.phases.to_dict(),
         }
 
 
 class GitbookDownloader:
-    def __init__(self, url, native_md: bool, section_only: bool = False):
+    def __init__(self, url, native_md: bool, section_only: bool = False, max_concurrency: int = 4,
+                 rate_limiter: Optional[RateLimiter] = None, parse_workers: Optional[int] = None,
+                 parser_backend: str = "html.parser", http_cache: Optional[HttpCache] = None,
+                 previous_manifest: Optional[DownloadManifest] = None, record_manifest: bool = False,
+                 use_sitemap: bool = False, force_crawl: bool = False, parse_pool: Optional[Executor] = None):
+        check_parser_backend(parser_backend)
         # Preserve trailing slash so urljoin treats base_url as a directory
         # This prevents dropping path prefixes like /scf-handbook when joining relative URLs
         self.base_url = url.rstrip("/") + "/"
         self.native_md = native_md
+        self.native_md_supported = None  # Decided by the first .md response when native_md is set
+        self.fetch_markdown = native_md  # Also switched on when pages come from an llms.txt index
+        # Skip the llms-full.txt / llms.txt probe and always crawl the HTML navigation
+        self.force_crawl = force_crawl
         self.section_only = section_only
         # Extract section prefix for filtering when section_only is enabled
         if section_only:
@@ -655,15 +2081,48 @@ class GitbookDownloader:
             self.section_prefix = None
         self.status = DownloadStatus()
         self.session = None
+        self.frontier = None
+        self.max_concurrency = max_concurrency  # Max nav pages fetched in parallel
+        # Processes for HTML parsing: None sizes the pool to the CPU count for large crawls,
+        # 0 always parses on the event loop
+        self.parse_workers = parse_workers
+        # A pool shared with other downloads (see make_parse_pool): used in place of a
+        # pool of our own whatever the crawl size, and left running for its owner
+        self.parse_pool = parse_pool
+        self.parse_executor = None
+        self.parser_backend = parser_backend  # One of PARSER_BACKENDS
+        self.http_cache = http_cache  # Optional on-disk cache for conditional re-crawls
+        # Manifest of the previous download of this site; unchanged pages are reused from it
+        if previous_manifest is not None and not previous_manifest.matches(self.base_url, native_md):
+            previous_manifest = None
+        self.previous_manifest = previous_manifest
+        self.record_manifest = record_manifest  # Keep what build_manifest() needs while crawling
+        self._manifest_records = {}  # url -> (source hash, parsed page title, nav id)
+        self._manifest_navs = {}  # (nav links, nav flags) -> nav id
+        self.content_offsets = {}  # content hash -> (byte offset, byte length) in the generated markdown
+        self._spool = None  # Temporary file holding page bodies while download_to_file() runs
+        # Discover page URLs from robots.txt/sitemap.xml up front and prefetch them while
+        # the nav walk runs; the nav still decides which pages are included and in what order
+        self.use_sitemap = use_sitemap
         self.visited_urls = set()
-        self.delay = 1  # Delay between requests in seconds
+        self.rate_limiter = rate_limiter or RateLimiter()  # Paces requests per host
         self.max_retries = 3
         self.retry_delay = 2  # Initial retry delay in seconds
-        self.pages = {}  # Store page titles and content
+        self.pages = PageStore()  # Store page titles and content
+        # Bumped on every change to self.pages (or the flags that order them), so
+        # markdown_snapshot() can tell when its cached render is stale
+        self.pages_version = 0
+        self._snapshot: Optional[MarkdownSnapshot] = None  # Kept render of the last markdown_snapshot()
+        # The web app polls markdown_snapshot() from several request threads, and it
+        # extends the kept render in place
+        self._snapshot_lock = threading.Lock()
+        self._markdown_size = None  # (pages_version, byte length) of the last markdown_size()
         self.content_hash = {}  # Track content hashes
         self.has_global_nav = False  # True for sites like Mintlify where nav is identical on all pages
         self.nav_preserves_order = False  # True for extractors that produce reliable nav ordering
         self.sparse_nav = False  # True for sites with collapsed nav where sub-page section headers should be filtered
+        self.platform = None  # PlatformDecision pinned once a page's nav detects the platform
+        self._walked_sidebars = set()  # Fingerprints of the sidebars the walk has followed
         # Navigation extractors in priority order
         self.extractors = [
             MintlifyExtractor(),
@@ -674,59 +2133,421 @@ class GitbookDownloader:
             FallbackExtractor()
         ]
 
-    async def download(self):
-        """Main download method"""
+    async def download(self, output_path: Optional[str] = None):
+        """Main download method; returns the markdown.
+
+        With output_path, the markdown is also saved there (and status.output_file set)
+        before the download is marked completed, so the "completed" event carries it.
+        """
+        if output_path is None:
+            return await self._download(self._generate_markdown)
+        return await self._download(lambda: self._save_markdown(self._generate_markdown(), output_path))
+
+    def _save_markdown(self, markdown, output_path):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        self.status.output_file = output_path
+        return markdown
+
+    async def download_to_file(self, output_path):
+        """Download and stream the markdown to output_path; returns output_path.
+
+        Page bodies go to a spool file as pages finish and only lightweight page
+        metadata stays in memory. The output is then written from the spool in TOC
+        order, so peak memory is bounded by the largest page rather than the site.
+        """
+        self._spool = tempfile.TemporaryFile()
+        try:
+            return await self._download(lambda: self._write_markdown(output_path))
+        finally:
+            self._spool.close()
+            self._spool = None
+
+    async def _download(self, render):
         try:
             self.status.start_time = time.time()
-            self.status.status = "downloading"
+            self.status.set_status("downloading")
             self.visited_urls = set()  # Track visited URLs
 
             # Create aiohttp session with timeout
             timeout = aiohttp.ClientTimeout(total=60, connect=10, sock_read=30)
             async with aiohttp.ClientSession(timeout=timeout) as self.session:
-                # First get the main page
-                initial_content = await self._fetch_page(self.base_url)
-                if not initial_content:
-                    raise Exception("Failed to fetch main page")
-
-                # Extract navigation links
-                nav_links = await self._extract_nav_links(initial_content)
-
-                # For sites with global nav (Mintlify), nav_links includes main page with correct depth
-                # For other sites, process main page separately
-                if self.has_global_nav:
-                    self.status.top_level_pages = len(nav_links)
-                    await self._follow_nav_links(nav_links, page_index=0)
-                else:
-                    self.status.top_level_pages = len(nav_links) + 1  # +1 for main page
-                    # Process main page
-                    main_page = await self._process_page_content(
-                        self.base_url, initial_content
-                    )
-                    if main_page:
-                        self.pages[0] = {"index": 0, "depth": 0, **main_page}
-                        self.status.pages_scraped.append(main_page["title"])
-                        # Normalize URL (no trailing slash) for consistent visited_urls tracking
-                        self.visited_urls.add(self.base_url.rstrip("/"))
-                    # Process other pages
-                    await self._follow_nav_links(nav_links, page_index=1)
-
-                # Generate markdown
-                markdown_content = self._generate_markdown()
-                if not markdown_content:
-                    raise Exception("Failed to generate markdown content")
-
-                self.status.status = "completed"
-                return markdown_content
+                self.frontier = CrawlFrontier(
+                    self._fetch_nav_page, self.max_concurrency, process=self._parse_nav_page
+                )
+                try:
+                    return await self._crawl(render)
+                finally:
+                    await self.frontier.close()
+                    self.frontier = None
+                    if self.parse_executor is not None and self.parse_executor is not self.parse_pool:
+                        self.parse_executor.shutdown(cancel_futures=True)
+                    self.parse_executor = None
 
         except Exception as e:
-            self.status.status = "error"
-            self.status.error = str(e)
+            self.status.set_status("error", str(e))
             logger.error(f"Download failed: {str(e)}")
             raise
 
+    async def _crawl(self, render):
+        """Collect the pages (from llms.txt files or the nav) and render the markdown with render()."""
+        if self.force_crawl or not await self._ingest_llms_txt():
+            await self._crawl_nav()
+
+        # Generate markdown
+        markdown_content = render()
+        if not markdown_content:
+            raise Exception("Failed to generate markdown content")
+
+        self.status.set_status("completed")
+        return markdown_content
+
+    async def _ingest_llms_txt(self):
+        """Zero-crawl fast path: build the pages from the site's llms-full.txt or llms.txt.
+
+        llms-full.txt already holds every page, so it is split into pages directly,
+        minus those outside the crawl scope (whole-site only, so not with section_only).
+        Failing that, llms.txt is an ordered page index whose pages are fetched
+        concurrently as native markdown.
+        Returns False if the site has neither, so the caller crawls the navigation.
+        """
+        if not self.section_only:
+            full_url = urljoin(self.base_url, "llms-full.txt")
+            full_text = await self._fetch_page(full_url, markdown=True)
+            pages = split_llms_full(full_text, full_url) if full_text else []
+            # It holds the whole site; keep only what a crawl from base_url would reach
+            pages = [page for page in pages if self._is_in_crawl_scope(page["url"])]
+            if pages:
+                logger.info(f"Using {full_url} ({len(pages)} pages)")
+                self.status.llms_txt = full_url
+                self.status.top_level_pages = len(pages)
+                self.has_global_nav = self.nav_preserves_order = True  # Keep the document's order
+                for page in pages:
+                    self._store_llms_page(page)
+                return True
+
+        index_url = urljoin(self.base_url, "llms.txt")
+        index_text = await self._fetch_page(index_url, markdown=True)
+        nav_links = parse_llms_index(index_text, self.base_url) if index_text else []
+        nav_links = [item for item in nav_links if item[0] is None or self._is_in_crawl_scope(item[0])]
+        if not any(link for link, _, _ in nav_links):
+            return False
+        logger.info(f"Using {index_url} as the page index")
+        self.status.llms_txt = index_url
+        self.status.top_level_pages = len(nav_links)
+        # The index is the whole nav, in order, so no page needs its sidebar parsed
+        self.has_global_nav = self.nav_preserves_order = True
+        self.fetch_markdown = True
+        self._start_parse_executor(len(nav_links))
+        await self._follow_nav_links(nav_links, page_index=0)
+        return True
+
+    def _store_llms_page(self, page):
+        """Add a page split out of llms-full.txt, deduplicated like crawled pages."""
+        content_hash = self._content_hash(page)
+        if content_hash in self.content_hash or page["url"] in self.visited_urls:
+            return
+        page_index = len(self.pages)
+        self.pages[page_index] = {"index": page_index, "depth": 0, **page, "content_hash": content_hash}
+        self._spool_content(self.pages[page_index])
+        self.pages_version += 1
+        self.content_hash[content_hash] = page_index
+        self.visited_urls.add(page["url"])
+        self.status.add_page(page["title"])
+
+    async def _crawl_nav(self):
+        """Fetch the main page and walk the navigation."""
+        # First get the main page
+        initial_content = await self._fetch_page(self.base_url)
+        if not initial_content:
+            raise Exception("Failed to fetch main page")
+
+        # Extract navigation links and the main page content from a single parse
+        landing = self._reuse_parsed(self.base_url, initial_content, None, True, True)
+        if landing is None:
+            landing = parse_page(
+                self.base_url, initial_content, self.base_url, self.extractors, parser_backend=self.parser_backend
+            )
+            self.status.phases.observe_timings(landing.timings)
+        self._apply_nav_flags(landing.nav_flags, landing.platform)
+        if landing.nav_fingerprint is not None:
+            self._walked_sidebars.add(landing.nav_fingerprint)
+        self._record_page(self.base_url, initial_content, None, landing)
+        nav_links = landing.nav_links
+        self._start_parse_executor(len(nav_links))
+        sitemap_task = asyncio.ensure_future(self._prefetch_sitemap_urls()) if self.use_sitemap else None
+
+        # For sites with global nav (Mintlify), nav_links includes main page with correct depth
+        # For other sites, process main page separately
+        if self.has_global_nav:
+            self.status.top_level_pages = len(nav_links)
+            await self._follow_nav_links(nav_links, page_index=0)
+        else:
+            self.status.top_level_pages = len(nav_links) + 1  # +1 for main page
+            # Start fetching the nav pages while the main page is processed
+            main_url = self.base_url.rstrip("/")
+            self._prefetch_nav_links([item for item in nav_links if item[0] != main_url])
+            # Process main page
+            main_page = landing.page
+            if main_page:
+                self.pages[0] = {"index": 0, "depth": 0, "content_hash": self._content_hash(main_page), **main_page}
+                self._spool_content(self.pages[0])
+                self.pages_version += 1
+                self.status.add_page(main_page["title"])
+                # Normalize URL (no trailing slash) for consistent visited_urls tracking
+                self.visited_urls.add(self.base_url.rstrip("/"))
+            # Process other pages
+            await self._follow_nav_links(nav_links, page_index=1)
+
+        if sitemap_task is not None:
+            sitemap_task.cancel()  # The walk is done; discovery has nothing left to speed up
+            await asyncio.gather(sitemap_task, return_exceptions=True)
+
+    def _is_in_crawl_scope(self, link):
+        """Return True if link passes the version, doc section and section_only filters."""
+        # Skip URLs from different version paths (e.g., /nightly/ when base is stable)
+        # This prevents duplicating content from multiple doc versions
+        if is_different_version_path(link, self.base_url):
+            return False
+
+        # Skip URLs from different documentation sections (e.g., /operators/ when base is /developers/)
+        # This prevents mixing content from unrelated doc sections
+        if is_different_doc_section(link, self.base_url):
+            return False
+
+        # Skip URLs outside section when section_only is enabled
+        if self.section_only and self.section_prefix:
+            link_path = urlparse(link).path
+            if not link_path.startswith(self.section_prefix):
+                return False
+
+        return True
+
+    def _prefetch_nav_links(self, nav_links):
+        """Queue every nav link the walk will fetch so the frontier can fetch them in parallel."""
+        if self.frontier is None:
+            return
+        self.frontier.prefetch(
+            link for link, _, _ in nav_links
+            if link is not None and link not in self.visited_urls and self._is_in_crawl_scope(link)
+        )
+
+    async def _prefetch_sitemap_urls(self):
+        """Queue every in-scope sitemap URL as a low-priority frontier prefetch."""
+        try:
+            async for link in self._discover_sitemap_urls():
+                if self._is_in_crawl_scope(link):
+                    self.status.sitemap_urls += 1
+                    if link not in self.visited_urls and self.frontier is not None:
+                        self.frontier.prefetch([link], background=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Sitemap discovery failed: {str(e)}")
+
+    async def _discover_sitemap_urls(self):
+        """Yield page URLs under base_url from the site's sitemaps, following sitemap indexes.
+
+        Sitemaps come from robots.txt `Sitemap:` lines, falling back to sitemap.xml
+        next to base_url and at the site root.
+        """
+        parsed_base = urlparse(self.base_url)
+        origin = f"{parsed_base.scheme}://{parsed_base.netloc}"
+        sitemaps = []
+        robots = await self._fetch_page(f"{origin}/robots.txt")
+        for line in (robots or "").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "sitemap" and value.strip():
+                sitemaps.append(value.strip())
+        if not sitemaps:
+            sitemaps = [urljoin(self.base_url, "sitemap.xml"), f"{origin}/sitemap.xml"]
+
+        queued, seen = list(dict.fromkeys(sitemaps)), set()
+        while queued and len(seen) < MAX_SITEMAP_FILES:
+            sitemap_url = queued.pop(0)
+            if sitemap_url in seen or urlparse(sitemap_url).netloc != parsed_base.netloc:
+                continue
+            seen.add(sitemap_url)
+            async for kind, loc in self._stream_sitemap(sitemap_url):
+                if kind == "sitemap":
+                    queued.append(loc)
+                    continue
+                link = normalize_url(loc, self.base_url)
+                if link and not should_skip_url(link):
+                    yield link
+
+    async def _stream_sitemap(self, url):
+        """Fetch a sitemap and yield its (kind, loc) entries as the body streams in."""
+        await self._acquire(url)
+        try:
+            async with self.session.get(url) as response:
+                self.rate_limiter.record(url, response.status, parse_retry_after(response.headers.get("Retry-After")))
+                if response.status != 200:
+                    logger.info(f"No sitemap at {url} (HTTP {response.status})")
+                    return
+                # .xml.gz files are served as gzip bodies, not with Content-Encoding: gzip
+                gzipped = urlparse(url).path.endswith(".gz") and "gzip" not in response.headers.get(
+                    "Content-Encoding", ""
+                )
+                parser = SitemapParser(gzipped)
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    for entry in parser.feed(chunk):
+                        yield entry
+                for entry in parser.close():
+                    yield entry
+        except (aiohttp.ClientError, ElementTree.ParseError, zlib.error) as e:
+            logger.warning(f"Error reading sitemap {url}: {str(e)}")
+
+    async def _fetch_nav_page(self, link):
+        """Fetch a nav page as one frontier job: its HTML, its native markdown, or both."""
+        if not self.fetch_markdown or self.native_md_supported is False:
+            return await self._fetch_page(link), None, None
+        if self.has_global_nav:
+            # The sidebar is already known, so the markdown is all the page needs
+            md_text = await self._fetch_native_markdown(link)
+            if md_text is not None:
+                return None, md_text, None
+            return await self._fetch_page(link), None, None
+        # Sub-nav links still come from the HTML, so fetch both at once
+        content, md_text = await asyncio.gather(self._fetch_page(link), self._fetch_native_markdown(link))
+        return content, md_text, None
+
+    async def _fetch_native_markdown(self, link):
+        """Fetch {link}.md; the first answer decides whether the site serves native markdown at all."""
+        md_text = await self._fetch_page(f"{link}.md", markdown=True)
+        if self.native_md_supported is None:
+            self.native_md_supported = md_text is not None
+            if not self.native_md_supported:
+                logger.info(f"{link}.md is not markdown; using HTML pages for this site")
+        return md_text
+
+    def _start_parse_executor(self, nav_link_count):
+        """Start the parse process pool unless the crawl is small enough to parse in-loop."""
+        if self.parse_executor is not None:
+            return
+        if self.parse_pool is not None:
+            self.parse_executor = self.parse_pool  # Already running, so no startup cost to avoid
+            return
+        workers = self.parse_workers
+        if workers is None:
+            cpus = os.cpu_count() or 1
+            workers = cpus if cpus > 1 and nav_link_count >= PROCESS_POOL_MIN_PAGES else 0
+        if workers > 0:
+            self.parse_executor = make_parse_pool(workers)
+
+    async def _parse_nav_page(self, link, fetched):
+        """Frontier post-fetch stage: parse the page in the process pool, if there is one."""
+        content, md_text, _ = fetched
+        if not content:
+            return fetched
+        # Native markdown replaces the page content; HTML is only converted without it
+        process_content = md_text is None
+        reused = self._reuse_parsed(link, content, md_text, process_content, not self.has_global_nav)
+        if reused is not None:
+            return content, md_text, reused
+        if self.parse_executor is None:
+            return fetched
+        loop = asyncio.get_running_loop()
+        try:
+            parsed = await loop.run_in_executor(
+                self.parse_executor, parse_page, link, content, self.base_url, self.extractors,
+                process_content, not self.has_global_nav, self.parser_backend, self.platform,
+            )
+        except Exception as e:
+            # Leave parsing to the walk (in-loop) if the pool is unavailable
+            logger.error(f"Error parsing {link} in process pool: {str(e)}")
+            return fetched
+        self.status.phases.observe_timings(parsed.timings)
+        return content, md_text, parsed
+
+    @staticmethod
+    def _source_hash(content, md_text):
+        digest = hashlib.sha256((content or "").encode("utf-8"))
+        if md_text is not None:
+            digest.update(b"\0" + md_text.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _content_hash(page_data):
+        return page_data.get("content_hash") or hashlib.sha256(page_data["content"].encode("utf-8")).hexdigest()
+
+    def _spool_content(self, page):
+        """Move a page body to the spool file (when streaming), leaving a SpooledContent in its place."""
+        if self._spool is None or not page.get("content"):
+            return
+        data = page["content"].encode("utf-8")
+        self._spool.seek(0, os.SEEK_END)
+        page["content"] = SpooledContent(self._spool.tell(), len(data))
+        self._spool.write(data)
+
+    def _page_content(self, page):
+        """Return a page body, reading it back from the spool if it was moved there."""
+        content = page["content"]
+        if isinstance(content, SpooledContent):
+            self._spool.seek(content.offset)
+            return self._spool.read(content.length).decode("utf-8")
+        return content
+
+    def _reuse_parsed(self, link, content, md_text, process_content, extract_nav):
+        """Return the previous download's parse of link if its fetched source is unchanged."""
+        if self.previous_manifest is None:
+            return None
+        parsed = self.previous_manifest.reuse(
+            link, self._source_hash(content, md_text), process_content, extract_nav
+        )
+        if parsed is not None:
+            self.status.pages_reused += 1
+        return parsed
+
+    def _record_page(self, link, content, md_text, parsed):
+        """Remember what the manifest needs to reuse this page's parse next time."""
+        if not self.record_manifest:
+            return
+        nav_id = None
+        if parsed is not None and parsed.nav_links is not None:
+            # Many pages share a sidebar, so each distinct nav is stored once
+            key = (tuple(parsed.nav_links), tuple(sorted(parsed.nav_flags.items())))
+            nav_id = self._manifest_navs.setdefault(key, len(self._manifest_navs))
+        page_title = parsed.page["title"] if parsed is not None and parsed.page else None
+        self._manifest_records[link.rstrip("/")] = (self._source_hash(content, md_text), page_title, nav_id)
+
+    def build_manifest(self, output_path: str) -> DownloadManifest:
+        """Describe the last generated markdown (as written to output_path) for incremental re-downloads."""
+        pages = []
+        for page in sorted(self.pages.values(), key=lambda p: p["index"]):
+            url = page.get("url")
+            record = self._manifest_records.get(url.rstrip("/")) if url else None
+            if record is None:
+                continue  # Section headers are rebuilt from the nav links
+            source_hash, page_title, nav_id = record
+            pages.append({
+                "url": url,
+                "index": page["index"],
+                "depth": page.get("depth", 0),
+                "source_sha256": source_hash,
+                "content_sha256": page.get("content_hash"),
+                "page_title": page_title,
+                "nav": nav_id,
+            })
+        navs = [
+            {"links": [list(item) for item in links], "flags": dict(flags)}
+            for (links, flags), _ in sorted(self._manifest_navs.items(), key=lambda item: item[1])
+        ]
+        contents = {content_hash: list(span) for content_hash, span in self.content_offsets.items()}
+        return DownloadManifest(output_path, self.base_url, self.native_md, pages, navs, contents)
+
     async def _follow_nav_links(self, nav_links, page_index):
-        for link, title, depth in nav_links:
+        # Depth-first walk over an explicit stack of sidebar iterators rather than recursion:
+        # each page's sub-nav lists every sibling not yet visited, so on a large sidebar the
+        # walk nests once per page and would overflow the interpreter's recursion limit
+        self._prefetch_nav_links(nav_links)
+        stack = [iter(nav_links)]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                continue
+            link, title, depth = entry
             try:
                 # Handle section headers (title-only, no URL)
                 if link is None:
@@ -741,56 +2562,44 @@ class GitbookDownloader:
                         "content": None,  # No content for section headers
                         "url": None,
                     }
+                    self.pages_version += 1
                     page_index += 1
                     continue
 
                 # Skip if URL already processed, but update depth if found at different depth
                 # (e.g., page first discovered via content link at depth 0, then found in nav at depth 1)
                 if link in self.visited_urls:
-                    # Find and update depth if current depth is more accurate (from nav extraction)
-                    for page_idx, page_data in self.pages.items():
-                        if page_data.get('url') == link and page_data.get('depth', 0) != depth:
-                            # Prefer deeper depth from proper nav extraction over shallow depth from fallback
-                            if depth > page_data.get('depth', 0):
-                                self.pages[page_idx]['depth'] = depth
-                            break
+                    if self.pages.update_depth(link, depth):
+                        self.pages_version += 1
                     continue
 
-                # Skip URLs from different version paths (e.g., /nightly/ when base is stable)
-                # This prevents duplicating content from multiple doc versions
-                if is_different_version_path(link, self.base_url):
+                if not self._is_in_crawl_scope(link):
                     continue
 
-                # Skip URLs from different documentation sections (e.g., /operators/ when base is /developers/)
-                # This prevents mixing content from unrelated doc sections
-                if is_different_doc_section(link, self.base_url):
-                    continue
-
-                # Skip URLs outside section when section_only is enabled
-                if self.section_only and self.section_prefix:
-                    link_path = urlparse(link).path
-                    if not link_path.startswith(self.section_prefix):
-                        continue
-
                 self.status.current_page = page_index
                 self.status.current_url = link
 
-                # Add delay between requests
-                await asyncio.sleep(self.delay)
-
-                content = await self._fetch_page(link)
+                if self.frontier is not None:
+                    content, md_text, parsed = await self.frontier.get(link)
+                else:
+                    content, md_text, parsed = await self._fetch_nav_page(link)
                 self.visited_urls.add(link)
-                if content:
-                    if self.native_md:
-                        md_text = await self._fetch_page(f"{link}.md")
+                if content or md_text:
+                    if parsed is None and content:
+                        # Not parsed in the process pool - parse once here
+                        parsed = parse_page(
+                            link, content, self.base_url, self.extractors,
+                            process_content=md_text is None, extract_nav=not self.has_global_nav,
+                            parser_backend=self.parser_backend, platform=self.platform,
+                        )
+                        self.status.phases.observe_timings(parsed.timings)
+                    if md_text is not None:
                         page_data = {"title": title, "content": md_text, "url": link}
                     else:
-                        page_data = await self._process_page_content(link, content)
+                        page_data = parsed.page
                     if page_data:
                         # Check for duplicate content using SHA256 for stable hashing
-                        content_hash = hashlib.sha256(
-                            page_data["content"].encode("utf-8")
-                        ).hexdigest()
+                        content_hash = self._content_hash(page_data)
                         if content_hash not in self.content_hash:
                             # Use nav title if available (more reliable for TOC than page h1)
                             # e.g., Docusaurus category "Getting Started" vs page h1 "Quick Start"
@@ -800,8 +2609,12 @@ class GitbookDownloader:
                                 "depth": depth,
                                 **page_data,
                                 "title": effective_title,  # Override with nav title
+                                "content_hash": content_hash,
                             }
-                            self.status.pages_scraped.append(effective_title)
+                            self._spool_content(self.pages[page_index])
+                            self.pages_version += 1
+                            self._record_page(link, content, md_text, parsed)
+                            self.status.add_page(effective_title)
                             self.content_hash[content_hash] = page_index
                             page_index += 1
 
@@ -809,14 +2622,27 @@ class GitbookDownloader:
                             # JS-rendered collapsible navigation (e.g., Vocs, Docusaurus)
                             # Skip for sites with global nav (e.g., Mintlify) since all pages have same sidebar
                             if not self.has_global_nav:
-                                subnav_links = await self._extract_nav_links(content)
+                                if parsed is not None and parsed.nav_links is not None:
+                                    self._apply_nav_flags(parsed.nav_flags, parsed.platform)
+                                    subnav_links = parsed.nav_links
+                                    if parsed.nav_cached:
+                                        self.status.nav_extractions_saved += 1
+                                    if parsed.nav_fingerprint is not None:
+                                        if parsed.nav_fingerprint in self._walked_sidebars:
+                                            # Same sidebar as a page already walked: its links are
+                                            # visited or queued on the stack, so don't walk it again
+                                            subnav_links = []
+                                        self._walked_sidebars.add(parsed.nav_fingerprint)
+                                elif content:
+                                    subnav_links = await self._extract_nav_links(content)
+                                else:
+                                    subnav_links = []  # HTML fetch failed; only the markdown arrived
                                 # For sites with sparse nav (collapsed sections), filter out section headers
                                 # from sub-pages to avoid depth issues (sub-pages have local depths)
                                 if self.sparse_nav:
                                     subnav_links = [(url, title, depth) for url, title, depth in subnav_links if url is not None]
-                                page_index = await self._follow_nav_links(
-                                    subnav_links, page_index
-                                )
+                                self._prefetch_nav_links(subnav_links)
+                                stack.append(iter(subnav_links))
 
             except Exception as e:
                 logger.error(f"Error processing page {link}: {str(e)}")
@@ -826,75 +2652,7 @@ class GitbookDownloader:
 
     async def _process_page_content(self, url, content):
         """Process the content of a page"""
-        try:
-            soup = BeautifulSoup(content, "html.parser")
-
-            # Extract title
-            title = None
-            h1 = soup.find("h1")
-            if h1:
-                title = h1.get_text(strip=True)
-            if not title:
-                title_tag = soup.find("title")
-                if title_tag:
-                    # Clean up title - remove site name and extra parts
-                    title = title_tag.get_text(strip=True)
-                    title = re.split(r"[|\-–]", title)[0].strip()
-            if not title:
-                title = urlparse(url).path.split("/")[-1] or "Introduction"
-
-            # Get main content - prefer more specific containers first
-            # Look for article first (more specific), then main (less specific)
-            main_content = soup.find("article")
-            if not main_content:
-                # Try content-area div (common in Mintlify sites)
-                main_content = soup.find("div", {"id": "content-area"})
-            if not main_content:
-                main_content = soup.find("main")
-            if not main_content:
-                main_content = soup.find(
-                    "div",
-                    {"class": ["markdown", "content", "article", "documentation"]},
-                )
-            if not main_content:
-                main_content = soup
-
-            # Remove navigation elements
-            for nav in main_content.find_all(["nav", "aside", "header", "footer"]):
-                nav.decompose()
-
-            # Remove sidebar elements by id (common patterns)
-            for sidebar in main_content.find_all(id=re.compile(r"sidebar|nav|menu", re.I)):
-                sidebar.decompose()
-
-            # Remove scripts and styles
-            for tag in main_content.find_all(["script", "style"]):
-                tag.decompose()
-
-            # Remove navigation links at bottom
-            for link in main_content.find_all("a", text=re.compile(r"Previous|Next")):
-                link.decompose()
-
-            # Convert to markdown
-            content_html = str(main_content)
-            md = markdownify.markdownify(content_html, heading_style="atx")
-
-            # Clean up markdown
-            md = re.sub(r"\n{3,}", "\n\n", md)  # Remove extra newlines
-            md = re.sub(r"#{3,}", "##", md)  # Normalize heading levels
-            # Remove permalink anchor links like [​](#anchor) or [ ](#anchor)
-            md = re.sub(r'\[[\s\u200b]*\]\(#[^)]+\)\s*', '', md)
-            # Remove adjacent navigation links (prev/next) at end of content
-            # Pattern: [text](url)[text](url) with no space between
-            md = re.sub(r'\[([^\]]+)\]\(/[^)]*\)\[([^\]]+)\]\(/[^)]*\)\s*$', '', md, flags=re.MULTILINE)
-            # Remove keyboard shortcut hints (⌘I, ⌃C, etc.)
-            md = re.sub(r'[⌘⌃⌥⇧]+[A-Za-z]\s*', '', md)
-
-            return {"title": title, "content": md, "url": url}
-
-        except Exception as e:
-            logger.error(f"Error processing page content: {str(e)}")
-            return None
+        return process_page_content(url, content, self.parser_backend)
 
     def _get_page_sort_key(self, page):
         """Generate a sort key for a page based on URL structure.
@@ -938,7 +2696,7 @@ class GitbookDownloader:
 
             # Try to infer section from title (remove emojis and special chars)
             # e.g., "🤖 BORGs" -> "borgs", "Developer" -> "developer"
-            clean_title = re.sub(r'[^\w\s]', '', title).strip().lower()
+            clean_title = NON_WORD_PATTERN.sub('', title).strip().lower()
             words = clean_title.split()
             section_key = words[0] if words else ""
 
@@ -950,159 +2708,209 @@ class GitbookDownloader:
         if not self.pages:
             return ""
 
-        markdown_parts = []
-        seen_urls = set()  # Track URLs to avoid duplicate pages in TOC
-        seen_section_headers = set()  # Track section header titles to avoid duplicates
-        seen_titles = set()  # Track titles for content deduplication
+        start = time.perf_counter()
+        parts = list(self._markdown_parts())
+
+        self.content_offsets = {}
+        if self.record_manifest:
+            offset = 0
+            for part, content_hash in parts:
+                size = len(part.encode("utf-8"))
+                if content_hash:
+                    self.content_offsets.setdefault(content_hash, (offset, size))
+                offset += size + 1  # "\n" separator
+
+        markdown = "\n".join([part for part, _ in parts])
+        self.status.phases.observe("render_seconds", time.perf_counter() - start)
+        return markdown
+
+    def markdown_snapshot(self):
+        """Return the markdown for the pages downloaded so far, rendering only pages added since the last call.
+
+        Meant for callers that poll while a download runs (the web UI). A poll with no
+        new pages returns the cached markdown. New pages that sort after everything
+        already rendered (always, in nav order) are fed to the kept MarkdownRender, so
+        only they are rendered and read from the spool; the pieces are then re-joined.
+        Anything else renders from scratch: a page sorting earlier in URL order, a
+        replaced, removed or re-depthed page, a changed ordering flag, or going from one
+        page (whose TOC lists its h2 headings) to several.
+        """
+        with self._snapshot_lock:
+            version = self.pages_version  # Read first: pages added mid-render leave the snapshot stale
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot.markdown
+            if not self.pages:
+                return ""
+
+            start = time.perf_counter()
+            strict_depth = self.has_global_nav or self.nav_preserves_order
+            sort_key = (lambda page: page["index"]) if strict_depth else self._get_page_sort_key
+            layout = (self.has_global_nav, self.nav_preserves_order, self.pages.edits)
+            new_pages = None
+            if snapshot is not None and snapshot.layout == layout and snapshot.rendered > 1:
+                new_pages = sorted(islice(self.pages.values(), snapshot.rendered, None), key=sort_key)
+                if new_pages and sort_key(new_pages[0]) < snapshot.last_key:
+                    new_pages = None  # Goes between pages already rendered
+            if new_pages is None:
+                new_pages = self._sorted_pages()
+                render = MarkdownRender(self._page_content, include_h2=len(self.pages) == 1,
+                                        strict_depth=strict_depth)
+                snapshot = MarkdownSnapshot(version, layout, render, 0, (), [], [], "")
+
+            snapshot.toc.extend(part for part, _ in snapshot.render.toc(new_pages))
+            snapshot.body.extend(part for part, _ in snapshot.render.body(new_pages))
+            snapshot.rendered += len(new_pages)
+            if new_pages:
+                snapshot.last_key = sort_key(new_pages[-1])
+            snapshot.version = version
+            snapshot.markdown = "\n".join(["# Table of Contents\n", *snapshot.toc, "\n---\n", *snapshot.body])
+            self._snapshot = snapshot
+            self.status.phases.observe("render_seconds", time.perf_counter() - start)
+            return snapshot.markdown
+
+    def iter_markdown_bytes(self, start: int = 0, end: Optional[int] = None):
+        """Yield the markdown as UTF-8 chunks, one piece (e.g. a page body) at a time.
+
+        Produces the same bytes as _generate_markdown without building the document.
+        With start/end, only bytes [start, end) are yielded, for HTTP Range requests.
+        """
+        if not self.pages:
+            return
+        offset = 0
+        for i, (part, _) in enumerate(self._markdown_parts()):
+            data = part.encode("utf-8")
+            if i:
+                data = b"\n" + data
+            next_offset = offset + len(data)
+            if next_offset > start:
+                yield data[max(0, start - offset):None if end is None else end - offset]
+            offset = next_offset
+            if end is not None and offset >= end:
+                return
+
+    def markdown_size(self) -> int:
+        """Byte length of the markdown, computed a piece at a time and cached until pages change."""
+        version = self.pages_version
+        if self._markdown_size is None or self._markdown_size[0] != version:
+            self._markdown_size = (version, sum(len(chunk) for chunk in self.iter_markdown_bytes()))
+        return self._markdown_size[1]
+
+    def _write_markdown(self, output_path):
+        """Stream the markdown to output_path, copying page bodies from the spool one at a time.
+
+        Produces the same bytes as _generate_markdown without holding the document in
+        memory. Writes to a temporary file first so a failed run leaves the previous
+        output (which an incremental run reads from) untouched.
+        """
+        if not self.pages:
+            return None
 
+        start = time.perf_counter()
+        self.content_offsets = {}
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for i, (part, content_hash) in enumerate(self._markdown_parts()):
+                if i:
+                    f.write(b"\n")
+                if content_hash:
+                    self.content_offsets.setdefault(content_hash, (f.tell(), len(part.encode("utf-8"))))
+                f.write(part.encode("utf-8"))
+        os.replace(tmp_path, output_path)
+        self.status.phases.observe("render_seconds", time.perf_counter() - start)
+        self.status.output_file = output_path
+        return output_path
+
+    def _markdown_parts(self):
+        """Yield the output's pieces in order as (text, content hash), joined by newlines.
+
+        The content hash is set only on page bodies. Page bodies are read one at a
+        time, so a spooled download never has the whole document in memory.
+        """
+        sorted_pages = self._sorted_pages()
+        render = MarkdownRender(self._page_content, include_h2=len(self.pages) == 1,
+                                strict_depth=self.has_global_nav or self.nav_preserves_order)
         # Add table of contents
-        markdown_parts.append("# Table of Contents\n")
-        # For single-page docs, include h2 headings for richer ToC
-        include_h2 = len(self.pages) == 1
+        yield "# Table of Contents\n", None
+        yield from render.toc(sorted_pages)
+        # Headers still pending at the end have no items
+        yield "\n---\n", None
+        # Add content (use same sort order as TOC)
+        yield from render.body(sorted_pages)
+
+    def _sorted_pages(self):
         # For sites with reliable nav ordering, preserve extraction order for TOC
         # For other sites, sort by URL structure to group related pages
         if self.has_global_nav or self.nav_preserves_order:
-            sorted_pages = sorted(self.pages.values(), key=lambda x: x["index"])
-        else:
-            sorted_pages = sorted(self.pages.values(), key=self._get_page_sort_key)
-
-        # Pre-filter: identify section headers that have no items following them
-        # A section header is "empty" if:
-        # - When nav_preserves_order: next URL item is at same/shallower depth
-        # - Always: there's another section header immediately following with no URL items between
-        empty_header_indices = set()
-        for i, page in enumerate(sorted_pages):
-            if page.get("url") is None:  # Section header
-                header_depth = page.get("depth", 0)
-                has_children = False
-                next_is_header = True  # Assume empty unless we find a URL item
-
-                # Look ahead for items that belong to this section
-                for j in range(i + 1, len(sorted_pages)):
-                    next_page = sorted_pages[j]
-                    next_depth = next_page.get("depth", 0)
-
-                    if next_page.get("url") is None:
-                        # Another section header
-                        if next_depth <= header_depth:
-                            # Sibling or parent level header - stop here
-                            break
-                        # Nested section header - continue looking
-                        continue
+            return sorted(self.pages.values(), key=lambda x: x["index"])
+        return sorted(self.pages.values(), key=self._get_page_sort_key)
 
-                    # Found a URL item
-                    next_is_header = False
+    async def _fetch_page(self, url, markdown: bool = False):
+        """Fetch a page with retry logic.
 
-                    if self.has_global_nav or self.nav_preserves_order:
-                        # Strict depth checking when nav order is reliable
-                        if next_depth > header_depth:
-                            has_children = True
-                            break
-                        # Same or shallower depth - not our child
-                        break
-                    else:
-                        # When using fallback, just finding any URL item means section has content
-                        has_children = True
-                        break
-
-                # Empty if no children found (either next is header or strict depth check failed)
-                if not has_children and next_is_header:
-                    empty_header_indices.add(i)
-                elif not has_children and (self.has_global_nav or self.nav_preserves_order):
-                    empty_header_indices.add(i)
-
-        for i, page in enumerate(sorted_pages):
-            if page.get("title"):
-                title = page["title"].strip()
-                url = page.get("url")
-
-                # Skip empty section headers
-                if i in empty_header_indices:
-                    continue
-
-                # Section headers deduplicated by title; pages deduplicated by URL
-                # This allows a page to have the same title as a section header
-                if url is None:
-                    if title in seen_section_headers:
-                        continue
-                    seen_section_headers.add(title)
-                else:
-                    if url in seen_urls:
-                        continue
-                    seen_urls.add(url)
-                # Use depth for indentation (2 spaces per level)
-                depth = page.get("depth", 0)
-                indent = "  " * depth
-                # Section headers (no URL) shown as bold text, pages as links
-                if url is None:
-                    markdown_parts.append(f"{indent}**{title}**")
-                else:
-                    markdown_parts.append(f"{indent}- [{title}](#{slugify(title)})")
-                    # Extract h2 headings from content for sub-items
-                    if include_h2 and page.get("content"):
-                        h2_headings = re.findall(r'^## (.+)$', page["content"], re.MULTILINE)
-                        current_section_depth = 0  # Track depth based on numbered sections
-                        for h2 in h2_headings:
-                            h2_clean = h2.strip()
-                            if h2_clean:
-                                # Determine depth from numbered prefix (e.g., "1" = depth 1, "1.1" = depth 2)
-                                number_match = re.match(r'^(\d+(?:\.\d+)*)\s', h2_clean)
-                                if number_match:
-                                    number_parts = number_match.group(1).split('.')
-                                    h2_depth = len(number_parts)  # "1" = 1, "1.1" = 2, "1.1.1" = 3
-                                    current_section_depth = h2_depth
-                                else:
-                                    # Non-numbered heading: nest under current section
-                                    h2_depth = current_section_depth + 1
-                                h2_indent = "  " * h2_depth
-                                markdown_parts.append(f"{h2_indent}- [{h2_clean}](#{slugify(h2_clean)})")
-
-        markdown_parts.append("\n---\n")
-
-        # Add content (use same sort order as TOC)
-        seen_titles.clear()
-        for page in sorted_pages:
-            if page.get("title") and page.get("content"):
-                title = page["title"].strip()
-                content = page["content"].strip()
-
-                if title and title not in seen_titles:
-                    markdown_parts.append(f"\n# {title}")
-                    markdown_parts.append(f"\nSource: {page['url']}\n")
-                    markdown_parts.append(content)
-                    markdown_parts.append("\n---\n")
-                    seen_titles.add(title)
-
-        return "\n".join(markdown_parts)
-
-    async def _fetch_page(self, url):
-        """Fetch a page with retry logic"""
+        With markdown=True, a 200 response that is HTML rather than markdown (e.g. a
+        single-page app answering every path) counts as missing.
+        """
         retry_count = 0
         current_delay = self.retry_delay
         logging.info(f"fetching {url}")
 
         while retry_count < self.max_retries:
             try:
-                async with self.session.get(url) as response:
-                    if response.status == 429:  # Rate limit
-                        retry_after = response.headers.get("Retry-After", "60")
-                        wait_time = int(retry_after)
-                        self.status.rate_limit_reset = wait_time
-                        logging.warning(f"Rate limited. Waiting {wait_time} seconds")
-                        await asyncio.sleep(wait_time)
-                        retry_count += 1
-                        continue
-
-                    if response.status == 200:
-                        return await response.text()
-                    else:
-                        logging.warning(f"HTTP {response.status} for {url}")
-                        return None
+                cached = self.http_cache.get(url) if self.http_cache else None
+                headers = HttpCache.conditional_headers(cached) if cached else None
+                await self._acquire(url)
+                fetch_start = time.perf_counter()
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if response.status in (429, 503) and retry_after is None:
+                            # No hint from the server - fall back to exponential backoff
+                            retry_after = current_delay
+                            current_delay *= 2
+                        if self.rate_limiter.record(url, response.status, retry_after):
+                            self.status.throttle_events += 1
+                        self.status.request_rate = round(self.rate_limiter.for_url(url).rate, 2)
+
+                        if response.status in (429, 503):  # Rate limited or overloaded
+                            self.status.rate_limit_reset = int(retry_after)
+                            self.status.emit("rate_limited", {"retry_after": self.status.rate_limit_reset})
+                            # The rate limiter holds the host's next request until the wait is over
+                            logging.warning(f"HTTP {response.status} for {url}. Backing off {retry_after:.0f} seconds")
+                            retry_count += 1
+                            continue
+
+                        if response.status == 304 and cached is not None:
+                            # Unchanged since the last crawl - reuse the cached body
+                            self.http_cache.touch(url)
+                            self.status.cache_hits += 1
+                            return cached.body
+
+                        if response.status == 200:
+                            if markdown and response.content_type == "text/html":
+                                logging.info(f"{url} is HTML, not markdown")
+                                return None
+                            body = await response.text()
+                            self.status.phases.observe("fetch_bytes", len(await response.read()))  # Buffered by text()
+                            if markdown and body.lstrip()[:15].lower().startswith(("<!doctype html", "<html")):
+                                logging.info(f"{url} is HTML, not markdown")
+                                return None
+                            if self.http_cache:
+                                self.http_cache.store(
+                                    url, body, response.headers.get("ETag"), response.headers.get("Last-Modified")
+                                )
+                            return body
+                        else:
+                            logging.warning(f"HTTP {response.status} for {url}")
+                            return None
+                finally:
+                    self.status.phases.observe("fetch_seconds", time.perf_counter() - fetch_start)
 
             except Exception as e:
                 logging.error(f"Error fetching {url}: {str(e)}")
                 if retry_count < self.max_retries - 1:
                     await asyncio.sleep(current_delay)
+                    self.status.phases.observe("sleep_seconds", current_delay)
                     current_delay *= 2  # Exponential backoff
                     retry_count += 1
                 else:
@@ -1110,72 +2918,33 @@ class GitbookDownloader:
 
         return None
 
+    async def _acquire(self, url):
+        """Wait for the rate limiter, recording any wait in the sleep_seconds phase."""
+        waited = await self.rate_limiter.acquire(url)
+        if waited:
+            self.status.phases.observe("sleep_seconds", waited)
+
     async def _extract_nav_links(self, content):
         """Extract navigation links using the first matching extractor."""
-        try:
-            soup = BeautifulSoup(content, "html.parser")
-            processed_urls = set()
-
-            for extractor in self.extractors:
-                if extractor.can_handle(soup):
-                    # Set flags based on extractor type:
-                    # - has_global_nav: sidebar is identical on all pages (skip re-extraction)
-                    # - nav_preserves_order: navigation order should be used for TOC sorting
-                    if isinstance(extractor, MintlifyExtractor):
-                        self.has_global_nav = True
-                        self.nav_preserves_order = True
-                    elif isinstance(extractor, (DocusaurusExtractor, ModernGitBookExtractor)):
-                        # These extractors produce reliable nav ordering
-                        self.nav_preserves_order = True
-                    elif isinstance(extractor, VocsExtractor):
-                        # VocsExtractor: check if sections are collapsed first before setting flag
-                        pass  # Will be set below if nav is complete
-                    nav_links = extractor.extract(soup, self.base_url, processed_urls)
-                    if nav_links:
-                        # For Vocs sites with collapsed sections, also extract content links
-                        # to bootstrap into sections that aren't visible in the collapsed nav
-                        if isinstance(extractor, VocsExtractor):
-                            # Check if we have actual page URLs (not just section headers)
-                            actual_pages = [link for link in nav_links if link[0] is not None]
-                            section_headers = [link for link in nav_links if link[0] is None]
-                            # If there are section headers but few pages, sections are likely collapsed
-                            if section_headers and len(actual_pages) <= len(section_headers) + 3:
-                                # Don't trust nav order when using fallback - use URL-based sorting
-                                self.nav_preserves_order = False
-                                # Mark nav as sparse so subnav extraction filters section headers
-                                # (sub-pages have expanded sections with local depths that don't match global structure)
-                                self.sparse_nav = True
-                                fallback = FallbackExtractor()
-                                content_links = fallback.extract(soup, self.base_url, processed_urls)
-                                # Bump fallback depths by 1 since section headers are at depth 0
-                                # and fallback items should nest under them
-                                adjusted_links = [(url, title, depth + 1) for url, title, depth in content_links]
-                                nav_links.extend(adjusted_links)
-                            else:
-                                # Nav is complete, preserve order
-                                self.nav_preserves_order = True
-
-                        # For Modern GitBook sites with client-rendered nav, also extract content links
-                        # to find pages not visible in the static sidebar
-                        if isinstance(extractor, ModernGitBookExtractor):
-                            actual_pages = [link for link in nav_links if link[0] is not None]
-                            # If we found fewer than 10 actual pages, supplement with content links
-                            if len(actual_pages) < 10:
-                                # Don't trust nav order when using fallback - use URL-based sorting
-                                self.nav_preserves_order = False
-                                fallback = FallbackExtractor()
-                                content_links = fallback.extract(soup, self.base_url, processed_urls)
-                                nav_links.extend(content_links)
-
-                        # Deduplicate while preserving order
-                        seen = set()
-                        return [
-                            item for item in nav_links
-                            if item[0] is None or (item[0] not in seen and not seen.add(item[0]))
-                        ]
-
-            return []
-
-        except Exception as e:
-            logger.error(f"Error extracting nav links: {str(e)}")
-            return []
+        start = time.perf_counter()
+        nav = extract_nav_links(content, self.base_url, self.extractors, self.parser_backend, self.platform)
+        self.status.phases.observe("nav_extract_seconds", time.perf_counter() - start)
+        self._apply_nav_flags(nav.nav_flags, nav.platform)
+        if nav.cached:
+            self.status.nav_extractions_saved += 1
+        return nav.nav_links
+
+    def _apply_nav_flags(self, nav_flags, platform=None):
+        """Apply site-structure flags reported by nav extraction, in crawl order.
+
+        The first platform detected (normally on the landing page) is pinned, so
+        later pages go straight to its extractor.
+        """
+        if platform is not None and self.platform is None:
+            self.platform = platform
+            self.status.platform = type(platform.extractor).__name__.replace("Extractor", "")
+            logger.info(f"Detected {self.status.platform} navigation")
+        for name, value in nav_flags.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                self.pages_version += 1  # The flags decide TOC ordering
@@ -0,0 +1,186 @@
+"""SQLite store for the web app's finished downloads.
+
+Each job keeps its status (DownloadStatus.to_dict()), its page records (title,
+URL and depth in TOC order) and the generated markdown. Outputs are read back in
+chunks with SQLite's incremental blob I/O, so serving a large export never loads
+it whole. Jobs expire after a TTL, and beyond max_jobs the least recently read
+are evicted first, so the store (and the service's memory) stays bounded however
+many crawls have run.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    task_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    status_json TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    finished_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_accessed_at ON jobs (accessed_at);
+CREATE TABLE IF NOT EXISTS pages (
+    task_id TEXT NOT NULL REFERENCES jobs (task_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT,
+    url TEXT,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (task_id, position)
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    task_id TEXT PRIMARY KEY REFERENCES jobs (task_id) ON DELETE CASCADE,
+    markdown BLOB NOT NULL
+);
+"""
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StoredJob(NamedTuple):
+    task_id: str
+    url: str
+    status: Dict  # DownloadStatus.to_dict() when the job finished
+    etag: str  # Quoted ETag of the markdown output
+    size: int  # Byte length of the markdown output
+    finished_at: float
+
+
+class JobStore:
+    """Finished downloads in an SQLite database, with TTL and least-recently-used eviction.
+
+    Safe to share between threads: one connection, serialized by a lock. The
+    database is opened on first use.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_jobs: int = 200):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA foreign_keys = ON")
+            db.execute("PRAGMA journal_mode = WAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def save(self, task_id: str, url: str, status: Dict, pages: List[Dict], markdown: str):
+        """Store a finished job, replacing any earlier job with the same id, then evict expired jobs.
+
+        pages are page records in TOC order; only their title, URL and depth are kept,
+        since the bodies are in the markdown.
+        """
+        data = markdown.encode("utf-8")
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()[:32]
+        now = time.time()
+        with self._lock:
+            db = self.db
+            with db:
+                db.execute("BEGIN")
+                db.execute("DELETE FROM jobs WHERE task_id = ?", (task_id,))
+                db.execute(
+                    "INSERT INTO jobs (task_id, url, status, status_json, etag, size, finished_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task_id, url, status["status"], json.dumps(status), etag, len(data), now, now),
+                )
+                db.executemany(
+                    "INSERT INTO pages (task_id, position, title, url, depth) VALUES (?, ?, ?, ?, ?)",
+                    [(task_id, position, page.get("title"), page.get("url"), page.get("depth", 0))
+                     for position, page in enumerate(pages)],
+                )
+                db.execute("INSERT INTO outputs (task_id, markdown) VALUES (?, ?)", (task_id, data))
+        self.evict()
+
+    def get(self, task_id: str, touch: bool = True) -> Optional[StoredJob]:
+        """Return a stored job (None if unknown or expired), marking it recently used."""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT task_id, url, status_json, etag, size, finished_at, accessed_at FROM jobs WHERE task_id = ?",
+                (task_id,),
+            ).fetchone()
+            if row is None or row[6] < time.time() - self.ttl_seconds:
+                return None
+            if touch:
+                self.db.execute("UPDATE jobs SET accessed_at = ? WHERE task_id = ?", (time.time(), task_id))
+        return StoredJob(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5])
+
+    def pages(self, task_id: str) -> List[Dict]:
+        """Page records of a stored job, in TOC order."""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT title, url, depth FROM pages WHERE task_id = ? ORDER BY position", (task_id,)
+            ).fetchall()
+        return [{"title": title, "url": url, "depth": depth} for title, url, depth in rows]
+
+    def iter_output(self, task_id: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield bytes [start, end) of a job's markdown in chunks.
+
+        Each chunk is read through a short-lived blob handle, so other threads can
+        use the store between chunks. Stops early if the job is evicted mid-read.
+        """
+        with self._lock:
+            row = self.db.execute("SELECT rowid, length(markdown) FROM outputs WHERE task_id = ?",
+                                  (task_id,)).fetchone()
+        if row is None:
+            return
+        rowid, size = row
+        end = size if end is None else min(end, size)
+        offset = start
+        while offset < end:
+            with self._lock:
+                try:
+                    with self.db.blobopen("outputs", "markdown", rowid, readonly=True) as blob:
+                        blob.seek(offset)
+                        chunk = blob.read(min(CHUNK_SIZE, end - offset))
+                except sqlite3.OperationalError:
+                    return  # Evicted while streaming
+            if not chunk:
+                return
+            yield chunk
+            offset += len(chunk)
+
+    def read_output(self, task_id: str) -> Optional[str]:
+        with self._lock:
+            row = self.db.execute("SELECT markdown FROM outputs WHERE task_id = ?", (task_id,)).fetchone()
+        return row[0].decode("utf-8") if row is not None else None
+
+    def evict(self) -> int:
+        """Drop jobs unread for longer than the TTL, then the least recently read beyond max_jobs."""
+        with self._lock:
+            db = self.db
+            with db:
+                db.execute("BEGIN")
+                expired = db.execute("DELETE FROM jobs WHERE accessed_at < ?",
+                                     (time.time() - self.ttl_seconds,)).rowcount
+                overflow = db.execute(
+                    "DELETE FROM jobs WHERE task_id IN ("
+                    " SELECT task_id FROM jobs ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_jobs,),
+                ).rowcount
+        return expired + overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,120 @@
+"""Download scheduler for the web app and `cli.py download-many`: every download runs on one shared event loop.
+
+Jobs wait in a FIFO queue until a slot is free. At most max_concurrent jobs run at
+once, and at most max_per_host of them crawl the same host, so one site's large
+crawl can't hold every slot while requests for other sites wait behind it.
+"""
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A queued or running download."""
+
+    def __init__(self, task_id: str, url: str, run: Callable[[], Awaitable]):
+        self.task_id = task_id
+        self.url = url
+        self.host = urlparse(url).netloc.lower()
+        self.run = run  # Coroutine function doing the work, called once on the scheduler's loop
+        self.state = "queued"  # queued -> running -> finished
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+
+class DownloadScheduler:
+    """Runs jobs on a long-lived event loop in a background thread, with a global and a per-host limit.
+
+    submit() and the queue accessors are safe to call from any thread (e.g. Flask
+    request handlers); jobs only ever run on the scheduler's loop, so they can
+    share loop-bound objects such as a RateLimiter.
+    """
+
+    def __init__(self, max_concurrent: int = 3, max_per_host: int = 1):
+        self.max_concurrent = max_concurrent
+        self.max_per_host = max_per_host
+        self._queue: List[Job] = []  # FIFO
+        self._running: Dict[str, int] = {}  # host -> running jobs
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The scheduler's event loop, started on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="download-scheduler", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def submit(self, task_id: str, url: str, run: Callable[[], Awaitable]) -> Job:
+        """Queue run() as a job for url; it starts once the global and per-host limits allow."""
+        job = Job(task_id, url, run)
+        loop = self.loop
+        with self._lock:
+            self._queue.append(job)
+        loop.call_soon_threadsafe(self._dispatch)
+        return job
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """1-based position of a queued job in the FIFO queue, or None if it isn't waiting."""
+        with self._lock:
+            for position, job in enumerate(self._queue, 1):
+                if job.task_id == task_id:
+                    return position
+        return None
+
+    def shutdown(self):
+        """Stop the loop; jobs still running are abandoned."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def _dispatch(self):
+        """Start queued jobs in FIFO order, passing over those whose host is at its limit."""
+        started = []
+        with self._lock:
+            for job in list(self._queue):
+                if self.running >= self.max_concurrent:
+                    break
+                if self._running.get(job.host, 0) >= self.max_per_host:
+                    continue
+                self._queue.remove(job)
+                self._running[job.host] = self._running.get(job.host, 0) + 1
+                job.state = "running"
+                started.append(job)
+        for job in started:
+            self._loop.create_task(self._run(job))
+
+    async def _run(self, job: Job):
+        try:
+            await job.run()
+        except Exception as e:
+            logger.error(f"Job {job.task_id} failed: {str(e)}")
+            job.error = str(e)
+        finally:
+            with self._lock:
+                self._running[job.host] -= 1
+                if not self._running[job.host]:
+                    del self._running[job.host]
+            job.state = "finished"
+            job.done.set()
+            self._dispatch()
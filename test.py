@@ -3,11 +3,14 @@ Test script for gitbook-downloader.
 
 Downloads multiple documentation sites to verify the downloader still works correctly.
 Creates a new tests-N folder (tests-1, tests-2, etc.) each run to preserve previous results.
+All sites are crawled concurrently by one `cli.py download-many` process, which
+prints a summary of pages, bytes and time per site.
 
 Usage:
     python test.py
 """
 
+import json
 import subprocess
 import os
 
@@ -41,13 +44,10 @@ def main():
     os.makedirs(folder)
     print(f"Created folder: {folder}")
 
-    # Run download for each documentation URL
-    for link, filename in DOCS:
-        output_path = os.path.join(folder, filename)
-        cmd = ["poetry", "run", "python", "cli.py", "download", link, "-o", output_path]
-        print(f"\nDownloading: {link}")
-        print(f"Output: {output_path}")
-        subprocess.run(cmd)
+    # Download every documentation URL in one process
+    cmd = ["poetry", "run", "python", "cli.py", "download-many", "-", "--output-dir", folder]
+    print(f"\nDownloading {len(DOCS)} sites")
+    subprocess.run(cmd, input=json.dumps(DOCS), text=True)
 
 
 if __name__ == "__main__":
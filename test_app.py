@@ -0,0 +1,378 @@
+"""Web app tests: the Flask test client against downloads of the in-memory test_crawl site."""
+import asyncio
+import gzip
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+import pytest
+
+from gitbook_downloader import CRAWL_PHASES, CrawlMetrics, GitbookDownloader, make_parse_pool
+from job_store import JobStore
+from test_crawl import BASE_URL, _render_menu, build_site, run_download
+
+
+class FakeSites:
+    """Serves the test_crawl site on every host; fetches of URLs or hosts in `blocked` wait."""
+
+    def __init__(self):
+        self.html = build_site()
+        self.blocked = set()
+        self.fetches = []
+
+    async def fetch(self, url):
+        self.fetches.append(url)
+        while url in self.blocked or urlparse(url).netloc in self.blocked:
+            await asyncio.sleep(0.01)
+        page_url = BASE_URL + urlparse(url).path.lstrip("/")
+        return self.html.get(page_url, self.html.get(page_url.rstrip("/")))
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # Importing the app opens app.log in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
+
+
+@pytest.fixture
+def sites(monkeypatch):
+    sites = FakeSites()
+    monkeypatch.setattr(GitbookDownloader, "_fetch_page", lambda self, url, markdown=False: sites.fetch(url))
+    return sites
+
+
+@pytest.fixture
+def client(app_module, sites, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Outputs go to downloads/
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(app_module, "job_store", store)
+    monkeypatch.setattr(app_module, "active_downloads", {})
+    monkeypatch.setattr(app_module, "finished_metrics", CrawlMetrics())
+    yield app_module.app.test_client()
+    sites.blocked.clear()
+    # Let the scheduler drain before the next test
+    wait_for(lambda: not app_module.scheduler.running and not app_module.scheduler.queue_depth)
+    store.close()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def crawl(app_module, client, url=BASE_URL, **options):
+    """POST a download and wait until it is finished and stored; returns the POST response."""
+    data = client.post("/download", json={"url": url, **options}).get_json()
+    wait_for(lambda: data["task_id"] not in app_module.active_downloads)
+    return data
+
+
+def read_events(response):
+    """Parse a streamed text/event-stream response into (event, data) pairs as they arrive."""
+    buffer = ""
+    for chunk in response.response:
+        buffer += chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+        while "\n\n" in buffer:
+            block, buffer = buffer.split("\n\n", 1)
+            if block.startswith(":"):
+                continue  # Keepalive
+            fields = dict(line.split(": ", 1) for line in block.splitlines())
+            yield fields["event"], json.loads(fields["data"])
+
+
+class TestEvents:
+
+    def test_stream_follows_the_download_until_it_completes(self, app_module, client, sites):
+        sites.blocked.add(f"{BASE_URL}guides/install")
+        task_id = client.post("/download", json={"url": BASE_URL}).get_json()["task_id"]
+        wait_for(lambda: f"{BASE_URL}guides/install" in sites.fetches)
+        status = app_module.active_downloads[task_id].status
+
+        response = client.get(f"/events/{task_id}", buffered=False)
+        assert response.mimetype == "text/event-stream"
+        events = read_events(response)
+        event, snapshot = next(events)
+        assert event == "snapshot" and snapshot["status"] == "downloading"
+        assert snapshot["pages"] == status.pages_scraped[:len(snapshot["pages"])] and snapshot["pages"]
+        # A page the snapshot already has (e.g. delivered between subscribing and the snapshot) is dropped
+        status.emit("page", {"title": snapshot["pages"][0], "count": 1, "total": status.top_level_pages})
+        sites.blocked.clear()
+        rest = list(events)
+        response.close()
+
+        pages = [data for event, data in rest if event == "page"]
+        assert [data["count"] for data in pages] == list(range(len(snapshot["pages"]) + 1, 13))
+        statuses = [data for event, data in rest if event == "status"]
+        assert [data["status"] for data in statuses] == ["completed"]  # Once, and the stream ends there
+        assert statuses[0]["output_file"] and os.path.exists(statuses[0]["output_file"])
+        assert not status.listeners  # Unsubscribed when the stream closed
+
+    def test_queued_download_streams_its_queue_position(self, app_module, client, sites, monkeypatch):
+        monkeypatch.setattr(app_module.scheduler, "max_concurrent", 1)
+        hosts = ["https://a.example.com/", "https://b.example.com/", "https://c.example.com/"]
+        sites.blocked.update(urlparse(url).netloc for url in hosts[:2])
+        for url in hosts:
+            client.post("/download", json={"url": url})
+            wait_for(lambda: app_module.scheduler.running == 1)  # a starts once the loop dispatches it
+
+        response = client.get(f"/events/{hosts[2]}", buffered=False)
+        events = read_events(response)
+        assert next(events) == ("snapshot", {"status": "queued", "error": None, "pages": [], "total": 0,
+                                             "queue_position": 2})
+        sites.blocked.discard("a.example.com")
+        assert next(events) == ("queue", {"queue_position": 1})
+        sites.blocked.clear()
+        rest = list(events)
+        response.close()
+        assert [data["status"] for event, data in rest if event == "status"] == ["downloading", "completed"]
+
+    def test_finished_download_is_a_single_snapshot(self, app_module, client):
+        task_id = crawl(app_module, client)["task_id"]
+        events = list(read_events(client.get(f"/events/{task_id}")))
+        assert len(events) == 1
+        event, snapshot = events[0]
+        assert event == "snapshot" and snapshot["status"] == "completed" and len(snapshot["pages"]) == 12
+
+    def test_unknown_task(self, client):
+        assert client.get("/events/https://nowhere.example.com/").status_code == 404
+
+
+@pytest.fixture(params=["memory", "store"])
+def finished(request, app_module, client):
+    """A finished download of the test site, in memory or in the job store; returns (task_id, markdown bytes)."""
+    downloader, markdown = run_download(build_site())
+    if request.param == "memory":
+        app_module.active_downloads[BASE_URL] = downloader  # Not moved to the store yet
+    else:
+        pages = sorted(downloader.pages.values(), key=lambda page: page["index"])
+        app_module.job_store.save(BASE_URL, BASE_URL, downloader.status.to_dict(), pages, markdown)
+    return BASE_URL, markdown.encode("utf-8")
+
+
+class TestMarkdownDownload:
+
+    def test_full_download(self, client, finished):
+        task_id, expected = finished
+        response = client.get(f"/download/{task_id}/markdown")
+        assert response.status_code == 200
+        assert response.data == expected
+        assert response.headers["Content-Length"] == str(len(expected))
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.headers["Content-Disposition"] == 'attachment; filename="docs.example.com.md"'
+        assert response.mimetype == "text/markdown"
+        assert "Content-Encoding" not in response.headers
+
+        etag = response.headers["ETag"]
+        assert client.get(f"/download/{task_id}/markdown", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_ranges(self, client, finished):
+        task_id, expected = finished
+        size = len(expected)
+        for header, start, end in [("bytes=100-199", 100, 200), ("bytes=-50", size - 50, size),
+                                   (f"bytes={size - 10}-", size - 10, size)]:
+            response = client.get(f"/download/{task_id}/markdown", headers={"Range": header})
+            assert response.status_code == 206
+            assert response.data == expected[start:end]
+            assert response.headers["Content-Length"] == str(end - start)
+            assert response.headers["Content-Range"] == f"bytes {start}-{end - 1}/{size}"
+
+        response = client.get(f"/download/{task_id}/markdown", headers={"Range": f"bytes={size}-"})
+        assert response.status_code == 416
+        assert response.headers["Content-Range"] == f"bytes */{size}"
+
+    def test_if_range(self, client, finished):
+        task_id, expected = finished
+        etag = client.get(f"/download/{task_id}/markdown").headers["ETag"]
+        response = client.get(f"/download/{task_id}/markdown", headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == 206 and response.data == expected[:10]
+        # The file changed since the client's partial copy: send all of it
+        response = client.get(f"/download/{task_id}/markdown", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200 and response.data == expected
+
+    def test_gzip(self, client, finished):
+        task_id, expected = finished
+        identity_etag = client.get(f"/download/{task_id}/markdown").headers["ETag"]
+        response = client.get(f"/download/{task_id}/markdown", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.data) == expected
+        etag = response.headers["ETag"]
+        assert etag != identity_etag  # Each encoding is its own representation
+        headers = {"Accept-Encoding": "gzip", "If-None-Match": etag}
+        assert client.get(f"/download/{task_id}/markdown", headers=headers).status_code == 304
+        headers["If-None-Match"] = identity_etag
+        assert client.get(f"/download/{task_id}/markdown", headers=headers).status_code == 200
+
+    def test_brotli(self, client, finished):
+        brotli = pytest.importorskip("brotli")
+        task_id, expected = finished
+        response = client.get(f"/download/{task_id}/markdown", headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["Content-Encoding"] == "br"
+        assert brotli.decompress(response.data) == expected
+
+    def test_running_download_has_no_validators(self, app_module, client):
+        downloader, markdown = run_download(build_site())
+        downloader.status.status = "downloading"
+        app_module.active_downloads[BASE_URL] = downloader
+        response = client.get(f"/download/{BASE_URL}/markdown", headers={"Range": "bytes=0-9"})
+        assert response.status_code == 200 and response.data == markdown.encode("utf-8")
+        assert not {"ETag", "Accept-Ranges", "Content-Range"} & set(response.headers.keys())
+
+    def test_unknown_task(self, client):
+        assert client.get("/download/https://nowhere.example.com/markdown").status_code == 404
+
+
+class TestResultCache:
+
+    def test_url_variants_share_a_task(self, app_module):
+        variants = ["https://docs.example.com/guides", "https://docs.example.com/guides/",
+                    "https://WWW.Docs.Example.com/guides/", "HTTPS://www.docs.example.com:443/guides#install",
+                    "docs.example.com/guides"]
+        assert {app_module.result_key(url) for url in variants} == {"https://docs.example.com/guides"}
+
+    def test_options_get_their_own_task(self, app_module):
+        url = "https://www.docs.example.com/guides/"
+        assert app_module.result_key(url, native_md=True) == "https://docs.example.com/guides;native_md"
+        assert app_module.result_key(url, section_only=True) == "https://docs.example.com/guides;section_only"
+        assert (app_module.result_key(url, native_md=True, section_only=True)
+                == "https://docs.example.com/guides;native_md;section_only")
+
+    def test_repeat_request_is_served_from_the_store(self, app_module, client, sites):
+        task_id = crawl(app_module, client)["task_id"]
+        fetches = len(sites.fetches)
+
+        data = client.post("/download", json={"url": "https://WWW.docs.example.com"}).get_json()
+        assert data["task_id"] == task_id
+        assert data["cached"] is True and data["status"] == "completed" and data["finished_at"]
+        assert task_id not in app_module.active_downloads  # No download was started
+        assert len(sites.fetches) == fetches
+        assert client.get(f"/download/{task_id}/markdown").status_code == 200
+
+        # Different options are a different result
+        data = crawl(app_module, client, "https://www.docs.example.com/", section_only=True)
+        assert data["task_id"] == f"{task_id};section_only" and "cached" not in data
+
+    def test_expired_result_is_crawled_again(self, app_module, client, sites, monkeypatch):
+        task_id = crawl(app_module, client)["task_id"]
+        finished_at = app_module.job_store.get(task_id).finished_at
+        fetches = len(sites.fetches)
+        monkeypatch.setattr(app_module, "result_ttl", -1)
+
+        data = crawl(app_module, client)
+        assert "cached" not in data and data["message"] == "Download queued"
+        assert len(sites.fetches) > fetches
+        assert app_module.job_store.get(task_id).finished_at > finished_at
+
+    def test_force_refresh_bypasses_a_fresh_result(self, app_module, client, sites):
+        task_id = crawl(app_module, client)["task_id"]
+        fetches = len(sites.fetches)
+
+        data = crawl(app_module, client, force_refresh=True)
+        assert data["task_id"] == task_id
+        assert "cached" not in data and data["message"] == "Download queued"
+        assert len(sites.fetches) > fetches
+
+
+def read_metrics(client):
+    """GET /metrics and parse the text format into ({(name, labels): value}, {name: type})."""
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    samples, types = {}, {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line[len("# TYPE "):].split()
+            types[name] = kind
+        elif line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            name, _, labels = series.partition("{")
+            samples[name, labels.rstrip("}")] = float(value)
+    return samples, types
+
+
+class TestMetrics:
+
+    def check_histograms(self, samples, types):
+        for phase, (buckets, _) in CRAWL_PHASES.items():
+            name = f"gitbook_{phase}"
+            assert types[name] == "histogram"
+            bounds = [key[1] for key in samples if key[0] == f"{name}_bucket"]
+            assert bounds == [f'le="{bound}"' for bound in buckets] + ['le="+Inf"']
+            counts = [samples[f"{name}_bucket", bound] for bound in bounds]
+            assert counts == sorted(counts)  # Cumulative
+            assert counts[-1] == samples[f"{name}_count", ""]
+            assert samples[f"{name}_sum", ""] >= 0
+            if not counts[-1]:
+                assert samples[f"{name}_sum", ""] == 0
+
+    def test_histograms_after_crawls(self, app_module, client):
+        samples, types = read_metrics(client)
+        self.check_histograms(samples, types)
+        assert samples["gitbook_parse_seconds_count", ""] == 0
+
+        crawl(app_module, client)
+        samples, types = read_metrics(client)
+        self.check_histograms(samples, types)
+        parsed = samples["gitbook_parse_seconds_count", ""]
+        assert parsed >= 12 and samples["gitbook_parse_seconds_sum", ""] > 0
+        assert samples["gitbook_render_seconds_count", ""] > 0
+        assert read_metrics(client)[0] == samples  # A finished crawl is counted once
+
+        crawl(app_module, client, force_refresh=True)
+        samples, types = read_metrics(client)
+        self.check_histograms(samples, types)
+        assert samples["gitbook_parse_seconds_count", ""] == 2 * parsed
+
+    def test_gauges(self, app_module, client, sites, monkeypatch):
+        monkeypatch.setattr(app_module.scheduler, "max_concurrent", 1)
+        samples, types = read_metrics(client)
+        gauges = ["gitbook_active_downloads", "gitbook_download_queue_depth", "gitbook_crawl_queue_depth"]
+        assert all(types[name] == "gauge" and samples[name, ""] == 0 for name in gauges)
+
+        # A sidebar longer than the frontier's prefetch buffer, so a stalled crawl has links queued
+        menu = [(f"wide/page-{i}", f"Page {i}", []) for i in range(40)]
+        sites.html = {f"{BASE_URL}{slug}": f'<nav class="menu">{_render_menu(menu, slug)}</nav><h1>{title}</h1>'
+                      for slug, title, _ in [("", "Welcome", [])] + menu}
+        sites.blocked.update(f"https://a.example.com/{slug}" for slug, _, _ in menu)
+        sites.blocked.add("b.example.com")
+        for url in ["https://a.example.com/", "https://b.example.com/"]:
+            client.post("/download", json={"url": url})
+        downloader = app_module.active_downloads["https://a.example.com/"]
+        wait_for(lambda: downloader.frontier is not None and downloader.frontier.queue_depth
+                 and app_module.scheduler.queue_depth == 1)
+        samples, _ = read_metrics(client)
+        assert samples["gitbook_active_downloads", ""] == 1
+        assert samples["gitbook_download_queue_depth", ""] == 1
+        assert samples["gitbook_crawl_queue_depth", ""] == downloader.frontier.queue_depth > 0
+
+
+class TestParsePool:
+
+    def test_downloads_share_one_pool(self, app_module, client, monkeypatch):
+        monkeypatch.setattr(app_module, "parse_pool", None)
+        monkeypatch.setattr(app_module.os, "cpu_count", lambda: 2)
+        pools = []
+
+        def make_pool(workers):
+            pools.append(make_parse_pool(workers))
+            return pools[-1]
+
+        monkeypatch.setattr(app_module, "make_parse_pool", make_pool)
+        try:
+            crawl(app_module, client, "https://a.example.com/")
+            crawl(app_module, client, "https://b.example.com/")
+            assert len(pools) == 1
+            assert pools[0]._processes  # Pages were parsed in it
+            assert pools[0].submit(len, "pool").result() == 4  # Still running for the next download
+        finally:
+            for pool in pools:
+                pool.shutdown()
@@ -0,0 +1,112 @@
+"""Page cleanup must match the original multi-pass implementation on the tests-21 corpus."""
+import os
+import re
+import sys
+
+import pytest
+from bs4 import BeautifulSoup
+
+from gitbook_downloader import clean_markdown, html_to_markdown, make_soup, strip_page_chrome
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+import corpus  # noqa: E402
+
+
+def reference_clean_markdown(md):
+    """The original cleanup: one re.sub per rule, patterns compiled on every call."""
+    md = re.sub(r"\n{3,}", "\n\n", md)
+    md = re.sub(r"#{3,}", "##", md)
+    md = re.sub(r'\[[\s\u200b]*\]\(#[^)]+\)\s*', '', md)
+    md = re.sub(r'\[([^\]]+)\]\(/[^)]*\)\[([^\]]+)\]\(/[^)]*\)\s*$', '', md, flags=re.MULTILINE)
+    md = re.sub(r'[⌘⌃⌥⇧]+[A-Za-z]\s*', '', md)
+    return md
+
+
+def reference_strip_page_chrome(main_content):
+    """The original chrome removal: a full find_all walk per kind of element."""
+    for nav in main_content.find_all(["nav", "aside", "header", "footer"]):
+        nav.decompose()
+    for sidebar in main_content.find_all(id=re.compile(r"sidebar|nav|menu", re.I)):
+        sidebar.decompose()
+    for tag in main_content.find_all(["script", "style"]):
+        tag.decompose()
+    for link in main_content.find_all("a", string=re.compile(r"Previous|Next")):
+        link.decompose()
+
+
+# Pages per site rendered to HTML; every page's sidebar lists the whole site, so parsing is slow
+MAX_PAGES = 12
+
+
+def corpus_pages():
+    for filename in corpus.SITES:
+        for url, html in corpus.iter_site_pages(filename, MAX_PAGES):
+            yield filename, url, html
+
+
+@pytest.fixture(scope="module")
+def converted_pages():
+    """(url, raw converted markdown) for tests-21 pages rendered back to HTML."""
+    pages = []
+    for _, url, html in corpus_pages():
+        soup = make_soup(html)
+        pages.append((url, html_to_markdown(soup.find("article"))))
+    return pages
+
+
+class TestCleanMarkdown:
+
+    def test_matches_reference_on_corpus(self, converted_pages):
+        for url, md in converted_pages:
+            assert clean_markdown(md) == reference_clean_markdown(md), url
+
+    def test_matches_reference_on_stored_output(self):
+        for filename in corpus.SITES:
+            _, pages = corpus.load_site(filename)
+            for url, _, content in pages:
+                assert clean_markdown(content) == reference_clean_markdown(content), url
+
+    @pytest.mark.parametrize("md", [
+        "Intro\n\n\n\n\n## Setup\n\n\nText",
+        "#### Deep heading\n\n###### Deeper\n\nC# and F##",
+        "## Install[\u200b](#install)\n\nRun it.[ ](#run)\n",
+        "Done.\n\n[Previous](/intro)[Next](/setup)\n\n\n",
+        "[Back](/a)[\u200b](#x)[Forward](/b)",  # Removing the anchor leaves adjacent links
+        "Search ⌘K \n\nCopy ⌃C⌥Vmore\n⌘\n",
+        "⌘[](#x)K",
+    ])
+    def test_matches_reference_on_edge_cases(self, md):
+        assert clean_markdown(md) == reference_clean_markdown(md)
+
+
+class TestStripPageChrome:
+
+    def test_matches_reference_on_corpus(self):
+        for filename, url, html in corpus_pages():
+            for container in ("article", "body"):
+                expected, actual = make_soup(html), make_soup(html)
+                reference_strip_page_chrome(expected.find(container))
+                strip_page_chrome(actual.find(container))
+                assert str(actual) == str(expected), f"{filename} {url} <{container}>"
+
+    def test_matches_reference_on_test_pages(self):
+        pages_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-pages")
+        for filename in sorted(os.listdir(pages_dir)):
+            with open(os.path.join(pages_dir, filename), encoding="utf-8") as f:
+                html = f.read()
+            expected, actual = make_soup(html), make_soup(html)
+            reference_strip_page_chrome(expected)
+            strip_page_chrome(actual)
+            assert str(actual) == str(expected), filename
+
+    @pytest.mark.parametrize("html", [
+        '<div><a href="/b"><script>track()</script>Next</a><a href="/c">Nextcloud docs</a></div>',
+        '<div><a href="/a"><a href="/b">Previous</a></a><p id="main-nav">x</p></div>',
+        '<div id="menu-root"><a href="/n">Next</a></div><p id="Sidebar-note">y</p><p>kept</p>',
+        '<main><header><a href="/p">Previous</a></header><a href="/q"><b>Next</b></a></main>',
+    ])
+    def test_matches_reference_on_edge_cases(self, html):
+        expected, actual = BeautifulSoup(html, "html.parser"), BeautifulSoup(html, "html.parser")
+        reference_strip_page_chrome(expected)
+        strip_page_chrome(actual)
+        assert str(actual) == str(expected)
@@ -0,0 +1,106 @@
+"""Tests for the download-many batch command, crawling in-memory sites."""
+import asyncio
+import json
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+import cli
+from gitbook_downloader import GitbookDownloader
+from test_crawl import BASE_URL, build_site
+
+OTHER_URL = "https://docs.other.com/"
+
+
+@pytest.fixture
+def fake_sites(monkeypatch):
+    html = build_site()
+    html.update({url.replace(BASE_URL, OTHER_URL): page for url, page in build_site().items()})
+    running = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    async def fake_fetch(self, url, markdown=False):
+        await asyncio.sleep(0.001)
+        return html.get(url, html.get(url.rstrip("/")))
+
+    download_to_file = GitbookDownloader.download_to_file
+
+    async def counting_download(self, output_path):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        try:
+            return await download_to_file(self, output_path)
+        finally:
+            with lock:
+                running["now"] -= 1
+
+    monkeypatch.setattr(GitbookDownloader, "_fetch_page", fake_fetch)
+    monkeypatch.setattr(GitbookDownloader, "download_to_file", counting_download)
+    return running
+
+
+class TestLoadBatch:
+
+    def test_json_pairs_and_lines(self):
+        pairs = [["https://a.example.com/", "a.md"], ["https://b.example.com/docs", "b.md"]]
+        assert cli.load_batch(json.dumps(pairs)) == [tuple(pair) for pair in pairs]
+        lines = "# docs to fetch\nhttps://a.example.com/ a.md\n\nhttps://b.example.com/docs   b.md\n"
+        assert cli.load_batch(lines) == [tuple(pair) for pair in pairs]
+
+    def test_malformed_input_is_rejected(self):
+        with pytest.raises(Exception, match="url, output"):
+            cli.load_batch("https://a.example.com/\n")
+
+
+class TestDownloadMany:
+
+    def test_sites_are_downloaded_with_a_summary(self, fake_sites, tmp_path):
+        docs = [[BASE_URL, "example.md"], [OTHER_URL, "other.md"], [BASE_URL + "guides", "guides.md"]]
+        result = CliRunner().invoke(
+            cli.cli, ["download-many", "-", "-d", str(tmp_path), "--max-sites", "3", "--parse-workers", "0"],
+            input=json.dumps(docs),
+        )
+        assert result.exit_code == 0, result.output
+        for _, output in docs:
+            assert "- [Advanced](#advanced)" in (tmp_path / output).read_text(encoding="utf-8")
+        rows = {line.split()[0]: line.split() for line in result.output.splitlines() if line.startswith(("http", "Total"))}
+        assert rows[OTHER_URL][1] == "12" and rows[OTHER_URL][-1] == "ok"
+        assert int(rows["Total"][1]) == sum(int(row[1]) for site, row in rows.items() if site != "Total")
+        # Two hosts, one crawl per host at a time
+        assert fake_sites["peak"] == 2
+
+    def test_failed_site_is_reported(self, fake_sites, tmp_path):
+        docs = f"{BASE_URL} example.md\nhttps://missing.example.com/ missing.md\n"
+        result = CliRunner().invoke(cli.cli, ["download-many", "-", "-d", str(tmp_path), "--parse-workers", "0"],
+                                    input=docs)
+        assert result.exit_code == 1
+        assert (tmp_path / "example.md").exists()
+        assert "error:" in [line for line in result.output.splitlines() if line.startswith("https://missing")][0]
+
+    def test_sites_share_one_parse_pool(self, fake_sites, tmp_path, monkeypatch):
+        pools, used = [], []
+        make_parse_pool, download_to_file = cli.make_parse_pool, GitbookDownloader.download_to_file
+
+        def make_pool(workers):
+            pools.append(make_parse_pool(workers))
+            return pools[-1]
+
+        async def recording_download(self, output_path):
+            used.append(self.parse_pool)
+            return await download_to_file(self, output_path)
+
+        monkeypatch.setattr(cli, "make_parse_pool", make_pool)
+        monkeypatch.setattr(GitbookDownloader, "download_to_file", recording_download)
+        docs = [[BASE_URL, "example.md"], [OTHER_URL, "other.md"], [BASE_URL + "guides", "guides.md"]]
+        result = CliRunner().invoke(
+            cli.cli, ["download-many", "-", "-d", str(tmp_path), "--max-sites", "3", "--parse-workers", "2"],
+            input=json.dumps(docs),
+        )
+        assert result.exit_code == 0, result.output
+        assert len(pools) == 1 and used == pools * len(docs)
+        assert "- [Advanced](#advanced)" in (tmp_path / "other.md").read_text(encoding="utf-8")
+        # Shut down once every site is done
+        with pytest.raises(RuntimeError):
+            pools[0].submit(len, "pool")
@@ -0,0 +1,342 @@
+"""Offline crawl tests using a synthetic Docusaurus site served from memory."""
+import asyncio
+import random
+import sys
+import threading
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+import gitbook_downloader
+from gitbook_downloader import (
+    DocusaurusExtractor, GitbookDownloader, MintlifyExtractor, PageStore, ParsedPage, SidebarCache, make_parse_pool,
+)
+
+BASE_URL = "https://docs.example.com/"
+
+# (slug, title, children) - categories only expand on pages inside them, like Docusaurus
+SITE = [
+    ("intro", "Introduction", []),
+    ("guides", "Guides", [
+        ("guides/install", "Install", []),
+        ("guides/configure", "Configure", [
+            ("guides/configure/basics", "Basics", []),
+            ("guides/configure/advanced", "Advanced", []),
+        ]),
+        ("guides/deploy", "Deploy", []),
+    ]),
+    ("concepts", "Concepts", [
+        ("concepts/architecture", "Architecture", []),
+        ("concepts/storage", "Storage", []),
+    ]),
+    ("faq", "FAQ", []),
+]
+
+
+def _render_menu(items, current):
+    parts = ['<ul class="menu__list">']
+    for slug, title, children in items:
+        if children:
+            parts.append('<li class="theme-doc-sidebar-item-category menu__list-item">')
+            parts.append(f'<a class="menu__link menu__link--sublist" href="/{slug}">{title}</a>')
+            if current == slug or current.startswith(slug + "/"):
+                parts.append(_render_menu(children, current))
+            parts.append("</li>")
+        else:
+            parts.append(f'<li class="menu__list-item"><a class="menu__link" href="/{slug}">{title}</a></li>')
+    parts.append("</ul>")
+    return "".join(parts)
+
+
+def _all_pages(items):
+    for slug, title, children in items:
+        yield slug, title
+        yield from _all_pages(children)
+
+
+def build_site():
+    pages = {BASE_URL: ("", "Welcome")}
+    pages.update({f"{BASE_URL}{slug}": (slug, title) for slug, title in _all_pages(SITE)})
+    html = {}
+    for url, (slug, title) in pages.items():
+        html[url] = (
+            f"<html><head><title>{title} | Example</title></head><body>"
+            f'<nav class="menu">{_render_menu(SITE, slug)}</nav>'
+            f"<article><h1>{title}</h1><p>This page documents {title.lower()} ({slug or 'home'}).</p>"
+            f"<h2>Details</h2><p>More about {title}.</p></article></body></html>"
+        )
+    return html
+
+
+def run_download(html, output_path=None, listener=None, **kwargs):
+    """Crawl the in-memory site; with output_path, stream the markdown there and return its text."""
+    downloader = GitbookDownloader(BASE_URL, native_md=False, **kwargs)
+    if listener is not None:
+        downloader.status.listeners.append(listener)
+    rng = random.Random(len(html))
+
+    async def fake_fetch(url, markdown=False):
+        # Random latency so concurrent fetches complete out of order
+        await asyncio.sleep(rng.random() / 200)
+        return html.get(url)
+
+    downloader._fetch_page = fake_fetch
+    if output_path is None:
+        return downloader, asyncio.run(downloader.download())
+    asyncio.run(downloader.download_to_file(str(output_path)))
+    with open(output_path, encoding="utf-8", newline="") as f:
+        return downloader, f.read()
+
+
+@asynccontextmanager
+async def local_server(handler):
+    """Serve handler(request) on an ephemeral localhost port; yields the server's base URL."""
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture(scope="module")
+def site_html():
+    return build_site()
+
+
+class TestConcurrentCrawl:
+    """The concurrent frontier must not change page ordering or output."""
+
+    def test_sequential_crawl_visits_every_page(self, site_html):
+        downloader, markdown = run_download(site_html, max_concurrency=1)
+        titles = [page["title"] for page in sorted(downloader.pages.values(), key=lambda p: p["index"])]
+        assert titles == [
+            "Welcome", "Introduction", "Guides", "Install", "Configure", "Basics",
+            "Advanced", "Deploy", "Concepts", "Architecture", "Storage", "FAQ",
+        ]
+        assert "- [Advanced](#advanced)" in markdown
+
+    @pytest.mark.parametrize("concurrency", [2, 4, 16])
+    def test_concurrent_output_is_identical(self, site_html, concurrency):
+        sequential, expected = run_download(site_html, max_concurrency=1)
+        concurrent, markdown = run_download(site_html, max_concurrency=concurrency)
+        assert markdown == expected
+        assert [(p["index"], p["depth"], p["url"]) for p in concurrent.pages.values()] == \
+            [(p["index"], p["depth"], p["url"]) for p in sequential.pages.values()]
+
+    def test_process_pool_output_is_identical(self, site_html):
+        _, expected = run_download(site_html, max_concurrency=1, parse_workers=0)
+        downloader, markdown = run_download(site_html, max_concurrency=4, parse_workers=2)
+        assert downloader.parse_executor is None  # Shut down after the crawl
+        assert markdown == expected
+
+    def test_shared_parse_pool_is_used_and_left_running(self, site_html):
+        _, expected = run_download(site_html, max_concurrency=1, parse_workers=0)
+        pool = make_parse_pool(2)
+        try:
+            assert pool._mp_context.get_start_method() != "fork"  # Safe from a multithreaded process
+            for _ in range(2):
+                downloader, markdown = run_download(site_html, max_concurrency=4, parse_pool=pool)
+                assert markdown == expected
+                assert pool._processes  # Workers start on demand, so pages were parsed in the pool
+            assert pool.submit(len, "pool").result() == 4  # Not shut down by the downloads
+        finally:
+            pool.shutdown()
+
+    def test_large_sidebar_walk_does_not_recurse_per_page(self):
+        # Each page's sidebar lists every category not yet visited, so the walk nests
+        # once per page - far past the recursion limit on a site this size
+        categories = [f"{BASE_URL}category-{i}" for i in range(400)]
+        top = [(url, url.rsplit("/", 1)[1], 0) for url in categories]
+        navs = {}
+        for position, category in enumerate(categories):
+            children = [(f"{category}/page-{i}", f"page-{i}", 1) for i in range(3)]
+            navs[category] = top[:position + 1] + children + top[position + 1:]
+            navs.update({url: navs[category] for url, _, _ in children})
+
+        downloader = GitbookDownloader(BASE_URL, native_md=False, parse_workers=0)
+
+        async def fetch_nav_page(link):
+            page = {"title": link.rsplit("/", 1)[1], "content": f"About {link}.", "url": link}
+            return "<html></html>", None, ParsedPage(page, navs[link], {})
+
+        downloader._fetch_nav_page = fetch_nav_page
+        asyncio.run(downloader._follow_nav_links(top, page_index=1))
+        urls = [page["url"] for page in downloader.pages.values()]
+        assert len(urls) == 1600
+        assert urls[:5] == [categories[0]] + [f"{categories[0]}/page-{i}" for i in range(3)] + [categories[1]]
+
+    def test_platform_is_detected_once(self, site_html, monkeypatch):
+        checks = []
+        can_handle = MintlifyExtractor.can_handle
+        monkeypatch.setattr(MintlifyExtractor, "can_handle", lambda self, soup: checks.append(1) or can_handle(self, soup))
+        downloader, markdown = run_download(site_html, max_concurrency=4)
+        assert len(checks) == 1  # Landing page only; later pages go straight to the pinned extractor
+        assert isinstance(downloader.platform.extractor, DocusaurusExtractor)
+        assert downloader.status.platform == "Docusaurus"
+        assert len(downloader.status.pages_scraped) == 12
+
+    def test_shared_sidebars_are_extracted_once(self, site_html, monkeypatch):
+        monkeypatch.setattr(gitbook_downloader, "SIDEBAR_CACHE", SidebarCache(max_entries=0))
+        _, expected = run_download(site_html, max_concurrency=1)
+        monkeypatch.setattr(gitbook_downloader, "SIDEBAR_CACHE", SidebarCache())
+        downloader, markdown = run_download(site_html, max_concurrency=1)
+        assert markdown == expected
+        # Four distinct sidebars (top level, guides, guides/configure, concepts) on the 11
+        # pages after the landing page, which ran detection and so didn't fill the cache
+        assert downloader.status.nav_extractions_saved == 7
+
+    def test_missing_pages_are_skipped(self, site_html):
+        html = dict(site_html)
+        del html[f"{BASE_URL}guides/install"]
+        downloader, markdown = run_download(html, max_concurrency=4)
+        assert "Install" not in downloader.status.pages_scraped
+        assert "Deploy" in downloader.status.pages_scraped
+
+
+class TestPageStore:
+
+    def test_update_depth_only_moves_pages_deeper(self):
+        pages = PageStore({1: {"url": "a", "depth": 0}, 2: {"url": "b", "depth": 2}})
+        assert pages.update_depth("a", 1) and pages[1]["depth"] == 1
+        assert not pages.update_depth("b", 1) and pages[2]["depth"] == 2
+        assert not pages.update_depth("missing", 3)
+
+    def test_url_index_follows_reassignment(self):
+        pages = PageStore()
+        pages[1] = {"url": "a", "depth": 0}
+        pages[2] = {"url": "a", "depth": 0}  # Duplicate URL: the first page keeps it
+        assert pages.find("a") == 1
+        pages[1] = {"url": "b", "depth": 0}
+        assert pages.find("b") == 1 and pages.find("a") is None
+        del pages[1]
+        assert pages.find("b") is None
+
+
+class TestStreamingOutput:
+    """download_to_file must write exactly what download() returns."""
+
+    @pytest.mark.parametrize("concurrency", [1, 4])
+    def test_streamed_file_matches_in_memory_markdown(self, site_html, tmp_path, concurrency):
+        _, expected = run_download(site_html, max_concurrency=1)
+        downloader, markdown = run_download(site_html, tmp_path / "docs.md", max_concurrency=concurrency)
+        assert markdown == expected
+        # Page bodies stay on disk, not in the page records
+        assert not any(isinstance(page["content"], str) and page["content"] for page in downloader.pages.values())
+        assert downloader.status.output_file == str(tmp_path / "docs.md")
+
+    def test_markdown_bytes_match_generated_markdown(self, site_html):
+        downloader, markdown = run_download(site_html)
+        expected = markdown.encode("utf-8")
+        assert b"".join(downloader.iter_markdown_bytes()) == expected
+        assert downloader.markdown_size() == len(expected)
+        for start, end in [(0, 1), (5, 400), (len(expected) - 10, len(expected)), (123, None)]:
+            assert b"".join(downloader.iter_markdown_bytes(start, end)) == expected[start:end]
+
+
+class TestStatusEvents:
+
+    def test_events_follow_the_crawl(self, site_html):
+        events = []
+        downloader, _ = run_download(site_html, listener=lambda event, data: events.append((event, data)))
+        assert [data["status"] for event, data in events if event == "status"] == ["downloading", "completed"]
+        assert events[0][0] == "status" and events[-1][0] == "status"
+        pages = [data for event, data in events if event == "page"]
+        assert [data["title"] for data in pages] == downloader.status.pages_scraped
+        assert [data["count"] for data in pages] == list(range(1, len(pages) + 1))
+
+    def test_failing_listener_does_not_stop_the_crawl(self, site_html):
+        def listener(event, data):
+            raise RuntimeError("listener failed")
+
+        downloader, markdown = run_download(site_html, listener=listener)
+        assert downloader.status.status == "completed"
+        assert "- [Advanced](#advanced)" in markdown
+
+
+class TestMarkdownSnapshot:
+
+    def test_snapshot_renders_only_new_pages(self, site_html, monkeypatch):
+        downloader, markdown = run_download(site_html)
+        reads = []
+        read = downloader._page_content
+        monkeypatch.setattr(downloader, "_page_content", lambda page: reads.append(page["title"]) or read(page))
+        assert downloader.markdown_snapshot() == markdown
+        assert downloader.markdown_snapshot() == markdown
+        assert len(reads) == 12  # Rendered once
+
+        downloader.pages[len(downloader.pages)] = {
+            "index": len(downloader.pages), "depth": 0, "title": "Changelog",
+            "content": "Latest changes.", "url": f"{BASE_URL}changelog",
+        }
+        downloader.pages_version += 1
+        snapshot = downloader.markdown_snapshot()
+        assert "- [Changelog](#changelog)" in snapshot
+        assert reads[12:] == ["Changelog"]
+        assert snapshot == downloader._generate_markdown()
+
+    def test_snapshots_during_crawl_match_full_render(self, site_html, monkeypatch):
+        mismatches = []
+        record_page = GitbookDownloader._record_page
+
+        def check_snapshot(self, *args):
+            record_page(self, *args)
+            if self.markdown_snapshot() != self._generate_markdown():
+                mismatches.append(len(self.pages))
+
+        monkeypatch.setattr(GitbookDownloader, "_record_page", check_snapshot)
+        downloader, markdown = run_download(site_html, max_concurrency=4)
+        assert not mismatches
+        assert downloader.markdown_snapshot() == markdown
+
+    def test_pages_out_of_url_order_are_rendered_from_scratch(self):
+        downloader = GitbookDownloader(BASE_URL, native_md=False)
+        assert downloader.markdown_snapshot() == ""
+        # URL-sorted site: later pages can land anywhere in the document
+        for slug in ["", "zeta", "guides", "guides/install", "alpha", "guides/advanced"]:
+            index = len(downloader.pages)
+            downloader.pages[index] = {
+                "index": index, "depth": slug.count("/"), "title": slug or "Home",
+                "content": f"About {slug or 'home'}.", "url": BASE_URL + slug,
+            }
+            downloader.pages_version += 1
+            assert downloader.markdown_snapshot() == downloader._generate_markdown()
+        assert downloader.pages.update_depth(BASE_URL + "alpha", 2)
+        downloader.pages_version += 1
+        assert downloader.markdown_snapshot() == downloader._generate_markdown()
+        assert "    - [alpha](#alpha)" in downloader.markdown_snapshot()
+
+    def test_concurrent_snapshots_while_pages_are_added(self):
+        # The web app polls from several request threads at once while the crawl adds pages
+        downloader = GitbookDownloader(BASE_URL, native_md=False)
+        downloader.nav_preserves_order = True
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # Switch threads often, so polls interleave mid-render
+        try:
+            for batch in range(8):
+                for i in range(batch * 50, batch * 50 + 50):
+                    downloader.pages[i] = {"index": i, "depth": i % 3, "title": f"Page {i}",
+                                           "content": f"About page {i}. " * 20, "url": f"{BASE_URL}page-{i}"}
+                downloader.pages_version += 1
+                polls = threading.Barrier(8)
+                snapshots = []
+
+                def poll():
+                    polls.wait()
+                    snapshots.append(downloader.markdown_snapshot())
+
+                readers = [threading.Thread(target=poll) for _ in range(8)]
+                for reader in readers:
+                    reader.start()
+                for reader in readers:
+                    reader.join()
+                expected = downloader._generate_markdown()
+                assert snapshots == [expected] * 8
+                assert downloader.markdown_snapshot() == expected
+        finally:
+            sys.setswitchinterval(interval)
@@ -0,0 +1,189 @@
+"""Conformance tests: every extractor returns the same nav links on every parser backend."""
+import os
+
+import pytest
+
+import gitbook_downloader
+from gitbook_downloader import (
+    PARSER_BACKENDS,
+    DocusaurusExtractor,
+    FallbackExtractor,
+    GitBookExtractor,
+    GitbookDownloader,
+    MintlifyExtractor,
+    ModernGitBookExtractor,
+    SidebarCache,
+    VocsExtractor,
+    check_parser_backend,
+    extract_nav_links,
+    make_soup,
+    process_page_content,
+    sidebar_fingerprint,
+)
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "test-pages")
+
+# fixture page, base URL, extractor expected to handle it
+FIXTURES = [
+    ("mintlify.html", "https://docs.acme.dev/", MintlifyExtractor),
+    ("vocs.html", "https://metalex-docs.vercel.app/", VocsExtractor),
+    ("docusaurus.html", "https://docs.aztec.network/", DocusaurusExtractor),
+    ("modern_gitbook.html", "https://gmtribe.gitbook.io/gmtribe/", ModernGitBookExtractor),
+    ("gitbook.html", "https://handbook.example.com/book/", GitBookExtractor),
+    ("fallback.html", "https://plain.example.com/", FallbackExtractor),
+]
+
+INSTALLED_BACKENDS = []
+for backend in PARSER_BACKENDS:
+    try:
+        check_parser_backend(backend)
+        INSTALLED_BACKENDS.append(backend)
+    except ValueError:
+        pass
+
+
+def load_page(filename):
+    with open(os.path.join(PAGES_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def extract(html, base_url, extractor_cls, backend):
+    soup = make_soup(html, backend)
+    extractor = extractor_cls()
+    assert extractor.can_handle(soup)
+    return extractor.extract(soup, base_url, set())
+
+
+@pytest.mark.parametrize("filename,base_url,extractor_cls", FIXTURES, ids=[f[0] for f in FIXTURES])
+class TestExtractorConformance:
+
+    def test_expected_extractor_is_selected(self, filename, base_url, extractor_cls):
+        soup = make_soup(load_page(filename))
+        extractors = GitbookDownloader(base_url, native_md=False).extractors
+        selected = next(e for e in extractors if e.can_handle(soup))
+        assert type(selected) is extractor_cls
+
+    def test_extractor_finds_links(self, filename, base_url, extractor_cls):
+        nav_links = extract(load_page(filename), base_url, extractor_cls, "html.parser")
+        assert len([link for link in nav_links if link[0] is not None]) >= 3
+
+    @pytest.mark.parametrize("backend", INSTALLED_BACKENDS)
+    def test_same_links_on_every_backend(self, filename, base_url, extractor_cls, backend):
+        html = load_page(filename)
+        expected = extract(html, base_url, extractor_cls, "html.parser")
+        assert extract(html, base_url, extractor_cls, backend) == expected
+
+    @pytest.mark.parametrize("backend", INSTALLED_BACKENDS)
+    def test_same_page_content_on_every_backend(self, filename, base_url, extractor_cls, backend):
+        html = load_page(filename)
+        expected = process_page_content(base_url, html, "html.parser")
+        assert process_page_content(base_url, html, backend) == expected
+
+
+class TestExtractorOutput:
+    """Spot checks of the (url, title, depth) tuples on the fixture pages."""
+
+    def test_docusaurus_hierarchy(self):
+        nav_links = extract(load_page("docusaurus.html"), "https://docs.aztec.network/", DocusaurusExtractor, "html.parser")
+        assert nav_links == [
+            ("https://docs.aztec.network/developers/overview", "Overview", 0),
+            (None, "Docs", 0),
+            ("https://docs.aztec.network/developers/getting-started", "Getting Started", 1),
+            ("https://docs.aztec.network/developers/getting-started/install", "Install", 2),
+            (None, "Tutorials", 2),
+            ("https://docs.aztec.network/developers/tutorials/token", "Token Contract", 3),
+            ("https://docs.aztec.network/developers/glossary", "Glossary", 1),
+        ]
+
+    def test_vocs_sections(self):
+        nav_links = extract(load_page("vocs.html"), "https://metalex-docs.vercel.app/", VocsExtractor, "html.parser")
+        assert (None, "🤖 BORGs", 0) in nav_links
+        assert ("https://metalex-docs.vercel.app/borgs/modes/full", "Full BORG", 2) in nav_links
+        assert ("https://metalex-docs.vercel.app/borgs/types/dev", "Dev BORG", 2) in nav_links
+
+
+class TestPlatformDecision:
+
+    @pytest.mark.parametrize("filename,base_url,extractor_cls", FIXTURES, ids=[f[0] for f in FIXTURES])
+    def test_detection_pins_only_specific_platforms(self, filename, base_url, extractor_cls):
+        extractors = GitbookDownloader(base_url, native_md=False).extractors
+        nav = extract_nav_links(load_page(filename), base_url, extractors)
+        assert nav.nav_links
+        if extractor_cls in (GitBookExtractor, FallbackExtractor):
+            assert nav.platform is None
+        else:
+            assert type(nav.platform.extractor) is extractor_cls
+            assert nav.platform.nav_preserves_order == nav.nav_flags.get("nav_preserves_order", False)
+
+    @pytest.mark.parametrize("filename,base_url,extractor_cls", FIXTURES[:4], ids=[f[0] for f in FIXTURES[:4]])
+    def test_pinned_extraction_matches_detection(self, filename, base_url, extractor_cls):
+        html = load_page(filename)
+        extractors = GitbookDownloader(base_url, native_md=False).extractors
+        detected = extract_nav_links(html, base_url, extractors)
+        pinned = extract_nav_links(html, base_url, extractors, platform=detected.platform)
+        assert (pinned.nav_links, pinned.nav_flags, pinned.platform) == (detected.nav_links, detected.nav_flags, None)
+
+    def test_redetects_when_pinned_extractor_finds_nothing(self):
+        extractors = GitbookDownloader("https://docs.aztec.network/", native_md=False).extractors
+        docusaurus = extract_nav_links(load_page("docusaurus.html"), "https://docs.aztec.network/", extractors).platform
+        html = load_page("mintlify.html")
+        expected = extract_nav_links(html, "https://docs.acme.dev/", extractors)
+        assert type(expected.platform.extractor) is MintlifyExtractor
+        assert extract_nav_links(html, "https://docs.acme.dev/", extractors, platform=docusaurus) == expected
+
+
+class TestSidebarCache:
+
+    BASE_URL = "https://docs.aztec.network/"
+
+    def pinned(self):
+        extractors = GitbookDownloader(self.BASE_URL, native_md=False).extractors
+        return extractors, extract_nav_links(load_page("docusaurus.html"), self.BASE_URL, extractors).platform
+
+    def test_same_sidebar_is_extracted_once(self, monkeypatch):
+        monkeypatch.setattr(gitbook_downloader, "SIDEBAR_CACHE", SidebarCache())
+        extractors, platform = self.pinned()
+        html = load_page("docusaurus.html")
+        first = extract_nav_links(html, self.BASE_URL, extractors, platform=platform)
+        # Same sidebar, different article
+        other = html.replace("<article", "<article data-page=\"other\"", 1)
+        second = extract_nav_links(other, self.BASE_URL, extractors, platform=platform)
+        assert not first.cached and second.cached
+        assert second.fingerprint == first.fingerprint
+        assert (second.nav_links, second.nav_flags) == (first.nav_links, first.nav_flags)
+
+    def test_changed_sidebar_is_extracted_again(self, monkeypatch):
+        monkeypatch.setattr(gitbook_downloader, "SIDEBAR_CACHE", SidebarCache())
+        extractors, platform = self.pinned()
+        html = load_page("docusaurus.html")
+        first = extract_nav_links(html, self.BASE_URL, extractors, platform=platform)
+        expanded = html.replace("menu__list-item--collapsed", "", 1)
+        assert expanded != html
+        second = extract_nav_links(expanded, self.BASE_URL, extractors, platform=platform)
+        assert not second.cached and second.fingerprint != first.fingerprint
+
+    def test_fingerprint_without_source_positions(self):
+        html = load_page("docusaurus.html")
+        extractor = DocusaurusExtractor()
+        sliced = sidebar_fingerprint(extractor.nav_container(make_soup(html)), html)
+        serialized = sidebar_fingerprint(extractor.nav_container(make_soup(html, "lxml")), html)
+        assert sliced == sidebar_fingerprint(extractor.nav_container(make_soup(html)), html)
+        assert serialized == sidebar_fingerprint(extractor.nav_container(make_soup(html, "lxml")))
+
+    def test_lru_eviction(self):
+        cache = SidebarCache(max_entries=2)
+        for key in "abc":
+            cache.put(key, [(key, key, 0)], {})
+        assert cache.get("a") is None
+        assert cache.get("c") == ([("c", "c", 0)], {})
+
+
+class TestParserBackendValidation:
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            check_parser_backend("html5lib")
+
+    def test_downloader_rejects_unknown_backend(self):
+        with pytest.raises(ValueError):
+            GitbookDownloader("https://docs.example.com/", native_md=False, parser_backend="nope")
@@ -0,0 +1,84 @@
+"""Tests for the on-disk HTTP cache and conditional re-crawls."""
+import asyncio
+import hashlib
+import os
+
+from aiohttp import web
+
+from gitbook_downloader import GitbookDownloader, HttpCache, RateLimiter
+from test_crawl import BASE_URL, build_site, local_server
+
+
+class TestHttpCache:
+
+    def test_cache_key_normalization(self):
+        assert HttpCache.cache_key("HTTPS://Docs.Example.com:443/guide/#intro") == "https://docs.example.com/guide"
+        assert HttpCache.cache_key("http://docs.example.com:8080/") == "http://docs.example.com:8080/"
+        assert HttpCache.cache_key("https://docs.example.com/search?q=x") == "https://docs.example.com/search?q=x"
+
+    def test_store_and_get(self, tmp_path):
+        cache = HttpCache(str(tmp_path))
+        cache.store("https://docs.example.com/a", "<p>é</p>", '"v1"', None)
+        cached = cache.get("https://docs.example.com/a/")
+        assert cached.body == "<p>é</p>"
+        assert HttpCache.conditional_headers(cached) == {"If-None-Match": '"v1"'}
+
+    def test_responses_without_validators_are_not_stored(self, tmp_path):
+        cache = HttpCache(str(tmp_path))
+        cache.store("https://docs.example.com/a", "body", None, None)
+        assert cache.get("https://docs.example.com/a") is None
+
+    def test_lru_eviction(self, tmp_path):
+        cache = HttpCache(str(tmp_path))
+        for name in "abc":
+            cache.store(f"https://docs.example.com/{name}", "x" * 80, '"v"', None)
+        cache.max_bytes = cache.total_bytes  # Room for exactly three entries
+        cache.touch("https://docs.example.com/a")
+        cache.store("https://docs.example.com/d", "x" * 80, '"v"', None)
+        assert cache.get("https://docs.example.com/b") is None
+        assert cache.get("https://docs.example.com/a") is not None
+        assert cache.total_bytes <= cache.max_bytes
+        assert len(os.listdir(tmp_path)) == 3
+
+    def test_index_survives_restart(self, tmp_path):
+        HttpCache(str(tmp_path)).store("https://docs.example.com/a", "body", None, "Wed, 21 Oct 2015 07:28:00 GMT")
+        cached = HttpCache(str(tmp_path)).get("https://docs.example.com/a")
+        assert cached.last_modified == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+async def crawl_twice(site_html, cache):
+    """Serve the synthetic site (root-relative links) with ETags on localhost and crawl it twice."""
+    responses = []
+
+    async def handle(request):
+        html = site_html.get(BASE_URL + request.path.lstrip("/"))
+        if html is None:
+            return web.Response(status=404)
+        etag = '"%s"' % hashlib.sha256(html.encode()).hexdigest()[:16]
+        if request.headers.get("If-None-Match") == etag:
+            responses[-1].append(304)
+            return web.Response(status=304, headers={"ETag": etag})
+        responses[-1].append(200)
+        return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+    results = []
+    async with local_server(handle) as base_url:
+        for _ in range(2):
+            responses.append([])
+            downloader = GitbookDownloader(
+                base_url, native_md=False, http_cache=cache, parse_workers=0,
+                rate_limiter=RateLimiter(rate=1000.0, max_rate=1000.0),
+            )
+            results.append((downloader, await downloader.download(), responses[-1]))
+    return results
+
+
+class TestConditionalRecrawl:
+
+    def test_recrawl_revalidates_every_page(self, tmp_path):
+        first, second = asyncio.run(crawl_twice(build_site(), HttpCache(str(tmp_path))))
+        assert set(first[2]) == {200}
+        assert set(second[2]) == {304}
+        assert len(second[2]) == len(first[2])
+        assert second[0].status.cache_hits == len(second[2])
+        assert second[1] == first[1]
@@ -0,0 +1,87 @@
+"""Tests for the web app's SQLite job store."""
+import time
+
+import pytest
+
+import job_store
+from job_store import JobStore
+
+PAGES = [
+    {"index": 0, "title": "Welcome", "url": "https://docs.example.com/", "depth": 0, "content": "Hi."},
+    {"index": 1, "title": "Guides", "url": None, "depth": 0, "content": None},
+    {"index": 2, "title": "Install", "url": "https://docs.example.com/install", "depth": 1, "content": "Run it."},
+]
+MARKDOWN = "# Table of Contents\n\n- [Welcome](#welcome)\n\nÜnïcode body\n" * 50
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def save(store, task_id, markdown=MARKDOWN, status="completed"):
+    store.save(task_id, task_id, {"status": status, "pages_scraped": ["Welcome", "Install"]}, PAGES, markdown)
+
+
+class TestJobStore:
+
+    def test_round_trip(self, store):
+        save(store, "https://docs.example.com/")
+        job = store.get("https://docs.example.com/")
+        assert job.status["status"] == "completed"
+        assert job.size == len(MARKDOWN.encode("utf-8"))
+        assert store.read_output(job.task_id) == MARKDOWN
+        assert store.pages(job.task_id) == [
+            {"title": page["title"], "url": page["url"], "depth": page["depth"]} for page in PAGES
+        ]
+        assert store.get("https://other.example.com/") is None
+
+    def test_output_ranges_are_read_in_chunks(self, store, monkeypatch):
+        monkeypatch.setattr(job_store, "CHUNK_SIZE", 100)
+        save(store, "a")
+        data = MARKDOWN.encode("utf-8")
+        chunks = list(store.iter_output("a"))
+        assert b"".join(chunks) == data
+        assert max(len(chunk) for chunk in chunks) == 100
+        for start, end in [(0, 1), (250, 1234), (len(data) - 7, None), (10, len(data) + 50)]:
+            assert b"".join(store.iter_output("a", start, end)) == data[start:end]
+
+    def test_save_replaces_job_and_etag(self, store):
+        save(store, "a")
+        first = store.get("a")
+        save(store, "a", markdown="changed", status="error")
+        second = store.get("a")
+        assert second.status["status"] == "error"
+        assert second.etag != first.etag
+        assert store.read_output("a") == "changed"
+        assert len(store) == 1
+
+    def test_jobs_persist_across_instances(self, store):
+        save(store, "a")
+        reopened = JobStore(store.path)
+        try:
+            assert reopened.read_output("a") == MARKDOWN
+        finally:
+            reopened.close()
+
+    def test_least_recently_read_jobs_are_evicted(self, store):
+        store.max_jobs = 2
+        save(store, "a")
+        save(store, "b")
+        time.sleep(0.01)
+        store.get("a")  # b is now the least recently read
+        save(store, "c")
+        assert store.get("b") is None
+        assert store.get("a") is not None and store.get("c") is not None
+        assert list(store.iter_output("b")) == []
+        assert store.pages("b") == []
+
+    def test_expired_jobs_are_evicted(self, store):
+        save(store, "a")
+        store.ttl_seconds = 0.01
+        time.sleep(0.02)
+        assert store.get("a") is None
+        assert store.evict() == 1
+        assert len(store) == 0
@@ -0,0 +1,163 @@
+"""Tests for the llms.txt / llms-full.txt fast path."""
+import asyncio
+
+from aiohttp import web
+
+from gitbook_downloader import GitbookDownloader, RateLimiter, parse_llms_index, split_llms_full
+from test_crawl import local_server
+from test_native_md import build_mintlify_site
+
+BASE_URL = "https://docs.example.com/"
+
+LLMS_FULL = """\
+This preamble describes the site.
+
+# Introduction
+Source: https://docs.example.com/intro
+
+Welcome to the docs.
+
+# Quickstart
+Source: https://docs.example.com/quickstart
+
+```bash
+# Install the CLI
+pip install example
+```
+
+## Next steps
+Read the guides.
+
+# Changelog
+
+Latest changes.
+"""
+
+# A whole-site llms-full.txt served under /developers/, whose download keeps only its section
+LLMS_FULL_SECTIONS = """\
+# Developer guide
+Source: https://docs.example.com/developers/guide
+
+Build on Example.
+
+# Running a node
+Source: https://docs.example.com/operators/node
+
+Operate a node.
+
+# Nightly API
+Source: https://docs.example.com/developers/nightly/api
+
+Unreleased API.
+
+# Developer FAQ
+Source: https://docs.example.com/developers/faq
+
+Common questions.
+"""
+
+LLMS_INDEX = """\
+# Example
+
+> Example docs for LLMs.
+
+- [Introduction](https://docs.example.com/intro.md): What Example is
+- [Quickstart](/quickstart.md)
+
+## Guides
+
+- [Auth](https://docs.example.com/guides/auth.md): Signing requests
+- [Elsewhere](https://other.example.org/page.md)
+- [Webhooks](https://docs.example.com/guides/webhooks)
+"""
+
+
+class TestLlmsTxtParsing:
+
+    def test_split_llms_full(self):
+        pages = split_llms_full(LLMS_FULL, f"{BASE_URL}llms-full.txt")
+        assert [(page["title"], page["url"]) for page in pages] == [
+            ("Introduction", "https://docs.example.com/intro"),
+            ("Quickstart", "https://docs.example.com/quickstart"),
+            ("Changelog", "https://docs.example.com/llms-full.txt#changelog"),
+        ]
+        assert pages[0]["content"] == "Welcome to the docs."
+        assert "# Install the CLI" in pages[1]["content"]  # Not split inside a code block
+
+    def test_parse_llms_index(self):
+        assert parse_llms_index(LLMS_INDEX, BASE_URL) == [
+            ("https://docs.example.com/intro", "Introduction", 0),
+            ("https://docs.example.com/quickstart", "Quickstart", 0),
+            (None, "Guides", 0),
+            ("https://docs.example.com/guides/auth", "Auth", 1),
+            ("https://docs.example.com/guides/webhooks", "Webhooks", 1),
+        ]
+
+
+async def crawl(files, path="", **kwargs):
+    """Serve llms files (by path) plus the Mintlify site and its .md pages; download base URL + path once."""
+    site_html = build_mintlify_site()
+    requested = []
+
+    async def handle(request):
+        requested.append(request.path)
+        base = f"http://{request.host}/"
+        path = request.path.lstrip("/")
+        if path in files:
+            return web.Response(text=files[path].replace(BASE_URL, base), content_type="text/plain")
+        if path.endswith(".md") and BASE_URL + path[:-3] in site_html:
+            return web.Response(text=f"# {path[:-3]}\n\nNative body of {path[:-3]}.", content_type="text/markdown")
+        html = site_html.get(BASE_URL + path)
+        if html is None:
+            return web.Response(status=404)
+        return web.Response(text=html, content_type="text/html")
+
+    async with local_server(handle) as base_url:
+        downloader = GitbookDownloader(
+            base_url + path, native_md=False, max_concurrency=4, parse_workers=0,
+            rate_limiter=RateLimiter(rate=1000.0, max_rate=1000.0), **kwargs,
+        )
+        markdown = await downloader.download()
+    return downloader, markdown, requested
+
+
+class TestLlmsTxtFastPath:
+
+    def test_llms_full_txt_is_a_single_request(self):
+        downloader, markdown, requested = asyncio.run(crawl({"llms-full.txt": LLMS_FULL, "llms.txt": LLMS_INDEX}))
+        assert requested == ["/llms-full.txt"]
+        assert downloader.status.llms_txt.endswith("/llms-full.txt")
+        toc = markdown.split("\n---\n", 1)[0]
+        assert toc.splitlines()[2:] == [
+            "- [Introduction](#introduction)", "- [Quickstart](#quickstart)", "- [Changelog](#changelog)",
+        ]
+        assert "Source: http://127.0.0.1" in markdown and "Welcome to the docs." in markdown
+
+    def test_llms_full_txt_pages_outside_the_section_are_dropped(self):
+        files = {"developers/llms-full.txt": LLMS_FULL_SECTIONS}
+        downloader, markdown, requested = asyncio.run(crawl(files, path="developers/"))
+        assert requested == ["/developers/llms-full.txt"]
+        toc = markdown.split("\n---\n", 1)[0]
+        assert toc.splitlines()[2:] == ["- [Developer guide](#developer-guide)", "- [Developer FAQ](#developer-faq)"]
+        assert "Operate a node." not in markdown and "Unreleased API." not in markdown
+        assert downloader.status.top_level_pages == 2
+
+    def test_llms_txt_index_fetches_markdown_pages(self):
+        downloader, markdown, requested = asyncio.run(crawl({"llms.txt": LLMS_INDEX}))
+        assert sorted(requested) == [
+            "/guides/auth.md", "/guides/webhooks.md", "/intro.md", "/llms-full.txt", "/llms.txt", "/quickstart.md",
+        ]
+        toc = markdown.split("\n---\n", 1)[0]
+        assert toc.splitlines()[2:] == [
+            "- [Introduction](#introduction)", "- [Quickstart](#quickstart)", "**Guides**",
+            "  - [Auth](#auth)", "  - [Webhooks](#webhooks)",
+        ]
+        assert "Native body of guides/webhooks." in markdown
+
+    def test_force_crawl_skips_llms_files(self):
+        downloader, markdown, requested = asyncio.run(
+            crawl({"llms-full.txt": LLMS_FULL}, force_crawl=True)
+        )
+        assert not any(path.startswith("/llms") for path in requested)
+        assert downloader.status.llms_txt is None
+        assert "HTML body of Auth." in markdown
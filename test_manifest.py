@@ -0,0 +1,59 @@
+"""Tests for incremental re-downloads driven by the page manifest."""
+import pytest
+
+from gitbook_downloader import DownloadManifest
+from test_crawl import BASE_URL, build_site, run_download
+
+
+def download_to(path, html, previous_manifest=None, **kwargs):
+    downloader, markdown = run_download(
+        html, path, record_manifest=True, previous_manifest=previous_manifest, parse_workers=0, **kwargs
+    )
+    downloader.build_manifest(str(path)).save()
+    return downloader, markdown
+
+
+@pytest.fixture
+def first_download(tmp_path):
+    output = tmp_path / "docs.md"
+    downloader, markdown = download_to(output, build_site())
+    return output, downloader, markdown
+
+
+class TestIncrementalDownload:
+
+    def test_manifest_offsets_point_at_page_bodies(self, first_download):
+        output, _, _ = first_download
+        in_memory, _ = run_download(build_site())
+        manifest = DownloadManifest.load(str(output))
+        assert len(manifest.pages) == len(in_memory.pages)
+        data = output.read_bytes()
+        for entry in manifest.pages:
+            offset, length = manifest.contents[entry["content_sha256"]]
+            body = data[offset:offset + length].decode("utf-8")
+            assert body == in_memory.pages[entry["index"]]["content"].strip()
+
+    def test_unchanged_site_reuses_every_page(self, first_download):
+        output, downloader, markdown = first_download
+        again, second = download_to(output, build_site(), DownloadManifest.load(str(output)))
+        assert second == markdown
+        assert again.status.pages_reused == len(downloader.pages)
+
+    @pytest.mark.parametrize("concurrency", [1, 4])
+    def test_changed_page_is_reprocessed(self, first_download, concurrency):
+        output, downloader, _ = first_download
+        html = build_site()
+        url = f"{BASE_URL}guides/deploy"
+        html[url] = html[url].replace("More about Deploy.", "Deploy now supports rollbacks.")
+        _, expected = run_download(html)
+        again, markdown = download_to(
+            output, html, DownloadManifest.load(str(output)), max_concurrency=concurrency
+        )
+        assert markdown == expected
+        assert "Deploy now supports rollbacks." in markdown
+        assert again.status.pages_reused == len(downloader.pages) - 1
+
+    def test_edited_output_invalidates_manifest(self, first_download):
+        output, _, _ = first_download
+        output.write_text("edited by hand", encoding="utf-8")
+        assert DownloadManifest.load(str(output)) is None
@@ -0,0 +1,91 @@
+"""Tests for the per-phase crawl histograms."""
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from gitbook_downloader import (
+    CRAWL_PHASES, CrawlMetrics, DocusaurusExtractor, GitbookDownloader, Histogram, RateLimiter, parse_page,
+)
+from test_crawl import BASE_URL, build_site, local_server
+
+
+class TestHistogram:
+
+    def test_buckets_are_cumulative_and_inclusive(self):
+        histogram = Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 5, 7, 50):
+            histogram.observe(value)
+        data = histogram.to_dict()
+        assert data["buckets"] == {"1": 2, "5": 4, "10": 5, "+Inf": 6}
+        assert data["count"] == 6
+        assert data["sum"] == 66.5
+
+    def test_merge(self):
+        first, second = Histogram((1, 5)), Histogram((1, 5))
+        first.observe(0.5)
+        second.observe(3)
+        second.observe(9)
+        first.merge(second)
+        assert first.to_dict() == {"count": 3, "sum": 12.5, "buckets": {"1": 1, "5": 2, "+Inf": 3}}
+
+    def test_merge_rejects_different_buckets(self):
+        with pytest.raises(ValueError):
+            Histogram((1, 5)).merge(Histogram((1, 10)))
+
+    def test_crawl_metrics_has_every_phase(self):
+        metrics = CrawlMetrics()
+        metrics.observe_timings({"parse_seconds": 0.002, "convert_seconds": 0.004})
+        data = metrics.to_dict()
+        assert set(data) == set(CRAWL_PHASES)
+        assert data["parse_seconds"]["count"] == 1
+        assert data["fetch_seconds"]["count"] == 0
+
+
+class TestParseTimings:
+
+    def test_parse_page_reports_each_phase(self):
+        html = build_site()[BASE_URL + "guides/install"]
+        parsed = parse_page(BASE_URL + "guides/install", html, BASE_URL, [DocusaurusExtractor()])
+        assert set(parsed.timings) == {"parse_seconds", "nav_extract_seconds", "convert_seconds", "cleanup_seconds"}
+        assert all(seconds >= 0 for seconds in parsed.timings.values())
+
+    def test_content_only_parse_skips_nav_extract(self):
+        html = build_site()[BASE_URL + "faq"]
+        parsed = parse_page(BASE_URL + "faq", html, BASE_URL, [], extract_nav=False)
+        assert "nav_extract_seconds" not in parsed.timings
+        assert "convert_seconds" in parsed.timings
+
+
+async def crawl(site_html):
+    """Crawl the synthetic site from localhost; returns (downloader, response body sizes)."""
+    sizes = []
+
+    async def handle(request):
+        html = site_html.get(BASE_URL + request.path.lstrip("/"))
+        if html is None:
+            return web.Response(status=404)
+        sizes.append(len(html.encode("utf-8")))
+        return web.Response(text=html, content_type="text/html")
+
+    async with local_server(handle) as base_url:
+        downloader = GitbookDownloader(
+            base_url, native_md=False, parse_workers=0, force_crawl=True,
+            rate_limiter=RateLimiter(rate=1000.0, max_rate=1000.0),
+        )
+        await downloader.download()
+    return downloader, sizes
+
+
+class TestCrawlPhases:
+
+    def test_crawl_records_every_phase(self):
+        downloader, sizes = asyncio.run(crawl(build_site()))
+        phases = downloader.status.to_dict()["phases"]
+        assert phases["fetch_seconds"]["count"] == len(sizes)
+        assert phases["fetch_bytes"]["count"] == len(sizes)
+        assert phases["fetch_bytes"]["sum"] == sum(sizes)
+        pages = len(downloader.pages)
+        for phase in ("parse_seconds", "nav_extract_seconds", "convert_seconds", "cleanup_seconds"):
+            assert phases[phase]["count"] == pages, phase
+        assert phases["render_seconds"]["count"] == 1
@@ -0,0 +1,79 @@
+"""Tests for the native markdown (--native) fetch pipeline."""
+import asyncio
+
+from aiohttp import web
+
+from gitbook_downloader import GitbookDownloader, RateLimiter
+from test_crawl import BASE_URL, build_site, local_server
+
+MINTLIFY_NAV = (
+    '<div id="navigation-items">'
+    '<ul><li><a href="/intro">Introduction</a></li><li><a href="/quickstart">Quickstart</a></li></ul>'
+    '<div><div class="sidebar-group-header"><h5>Guides</h5></div><ul class="sidebar-group">'
+    '<li><a href="/guides/auth">Auth</a></li><li><a href="/guides/webhooks">Webhooks</a></li></ul></div>'
+    "</div>"
+)
+
+
+def build_mintlify_site():
+    """A Mintlify-style site: the same global sidebar on every page."""
+    pages = {"": "Welcome", "intro": "Introduction", "quickstart": "Quickstart",
+             "guides/auth": "Auth", "guides/webhooks": "Webhooks"}
+    return {
+        BASE_URL + slug: f"<html><head><title>{title}</title></head><body>{MINTLIFY_NAV}"
+                         f"<article><h1>{title}</h1><p>HTML body of {title}.</p></article></body></html>"
+        for slug, title in pages.items()
+    }
+
+
+async def crawl(site_html, serve_markdown, *native_modes, concurrency=1):
+    """Crawl once per mode on one server; returns (downloader, markdown, paths requested) per run."""
+    requested = []
+
+    async def handle(request):
+        requested[-1].append(request.path)
+        path = request.path.lstrip("/")
+        if path.endswith(".md"):
+            if not serve_markdown or BASE_URL + path[:-3] not in site_html:
+                return web.Response(status=404)
+            return web.Response(text=f"# {path[:-3]}\n\nNative body of {path[:-3]}.", content_type="text/markdown")
+        html = site_html.get(BASE_URL + path)
+        if html is None:
+            return web.Response(status=404)
+        return web.Response(text=html, content_type="text/html")
+
+    results = []
+    async with local_server(handle) as base_url:
+        for native in native_modes:
+            requested.append([])
+            downloader = GitbookDownloader(
+                base_url, native_md=native, max_concurrency=concurrency, parse_workers=0, force_crawl=True,
+                rate_limiter=RateLimiter(rate=1000.0, max_rate=1000.0),
+            )
+            results.append((downloader, await downloader.download(), requested[-1]))
+    return results
+
+
+class TestNativeMarkdown:
+
+    def test_global_nav_site_fetches_only_markdown(self):
+        site_html = build_mintlify_site()
+        [(downloader, markdown, requested)] = asyncio.run(crawl(site_html, True, True, concurrency=4))
+        assert downloader.native_md_supported is True
+        assert "Native body of guides/auth." in markdown
+        # The landing page's HTML for the sidebar, then one .md request per page
+        assert sorted(requested) == ["/", "/guides/auth.md", "/guides/webhooks.md", "/intro.md", "/quickstart.md"]
+
+    def test_sub_nav_site_fetches_html_and_markdown(self):
+        site_html = build_site()
+        [(downloader, markdown, requested)] = asyncio.run(crawl(site_html, True, True, concurrency=4))
+        assert "Native body of guides/configure/advanced." in markdown
+        assert "- [Advanced](#advanced)" in markdown  # Found through the Configure page's sub-nav
+        assert len([path for path in requested if path.endswith(".md")]) == len(site_html) - 1
+
+    def test_unsupported_site_stops_requesting_markdown(self):
+        site_html = build_mintlify_site()
+        (_, expected, _), (downloader, markdown, requested) = asyncio.run(crawl(site_html, False, False, True))
+        assert downloader.native_md_supported is False
+        assert [path for path in requested if path.endswith(".md")] == ["/intro.md"]
+        assert markdown == expected
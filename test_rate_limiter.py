@@ -0,0 +1,69 @@
+"""Unit tests for the adaptive per-host rate limiter."""
+import asyncio
+
+from gitbook_downloader import HostRateLimiter, RateLimiter, parse_retry_after
+
+
+class TestParseRetryAfter:
+
+    def test_seconds(self):
+        assert parse_retry_after("30") == 30.0
+
+    def test_missing(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("") is None
+
+    def test_http_date_in_past_is_zero(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_garbage(self):
+        assert parse_retry_after("soon") is None
+
+
+class TestHostRateLimiter:
+
+    def test_healthy_responses_raise_rate_up_to_max(self):
+        bucket = HostRateLimiter(rate=2.0, max_rate=3.0)
+        for _ in range(100):
+            bucket.on_success()
+        assert bucket.rate == 3.0
+
+    def test_throttle_backs_off_down_to_min(self):
+        bucket = HostRateLimiter(rate=4.0, min_rate=1.0)
+        bucket.on_throttle()
+        assert bucket.rate == 2.0
+        for _ in range(10):
+            bucket.on_throttle()
+        assert bucket.rate == 1.0
+        assert bucket.throttle_events == 11
+
+    def test_acquire_paces_requests(self):
+        bucket = HostRateLimiter(rate=50.0, max_rate=50.0)
+
+        async def run():
+            waits = [await bucket.acquire() for _ in range(11)]
+            return sum(waits)
+
+        # The first request goes straight through, the next 10 wait ~0.2s in total
+        assert 0.15 < asyncio.run(run()) < 0.5
+
+    def test_retry_after_blocks_next_request(self):
+        bucket = HostRateLimiter(rate=100.0)
+        bucket.on_throttle(retry_after=0.2)
+        assert asyncio.run(bucket.acquire()) >= 0.15
+
+
+class TestRateLimiter:
+
+    def test_buckets_are_per_host(self):
+        limiter = RateLimiter()
+        assert limiter.for_url("https://a.example.com/x") is limiter.for_url("https://A.example.com/y")
+        assert limiter.for_url("https://a.example.com/") is not limiter.for_url("https://b.example.com/")
+
+    def test_record_classifies_responses(self):
+        limiter = RateLimiter(rate=2.0)
+        assert limiter.record("https://a.example.com/", 200) is False
+        assert limiter.record("https://a.example.com/", 429) is True
+        assert limiter.record("https://a.example.com/", 503) is True
+        assert limiter.record("https://a.example.com/", 200, retry_after=1) is True
+        assert limiter.for_url("https://a.example.com/").throttle_events == 3
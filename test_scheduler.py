@@ -0,0 +1,92 @@
+"""Tests for the web app's download scheduler."""
+import asyncio
+import threading
+
+import pytest
+
+from scheduler import DownloadScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = DownloadScheduler(max_concurrent=2, max_per_host=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+class Gate:
+    """Job body that records when it starts and finishes only once released."""
+
+    def __init__(self, scheduler, name, log):
+        self.name = name
+        self.log = log
+        self.started = threading.Event()
+        self.release = asyncio.Event()
+        self.scheduler = scheduler
+
+    async def __call__(self):
+        self.log.append(self.name)
+        self.started.set()
+        await self.release.wait()
+
+    def open(self):
+        self.scheduler.loop.call_soon_threadsafe(self.release.set)
+
+
+def submit(scheduler, name, url, log):
+    gate = Gate(scheduler, name, log)
+    return scheduler.submit(name, url, gate), gate
+
+
+class TestDownloadScheduler:
+
+    def test_global_limit_and_fifo_positions(self, scheduler):
+        log = []
+        jobs = [submit(scheduler, f"job-{i}", f"https://site-{i}.example/", log) for i in range(4)]
+        for _, gate in jobs[:2]:
+            assert gate.started.wait(5)
+        assert scheduler.running == 2
+        assert scheduler.queue_position("job-2") == 1
+        assert scheduler.queue_position("job-3") == 2
+        assert scheduler.queue_position("job-0") is None
+
+        jobs[0][1].open()
+        assert jobs[2][1].started.wait(5)
+        assert scheduler.queue_position("job-3") == 1
+        for job, gate in jobs:
+            gate.open()
+        for job, _ in jobs:
+            assert job.done.wait(5)
+        assert log == ["job-0", "job-1", "job-2", "job-3"]
+        assert scheduler.running == 0 and scheduler.queue_depth == 0
+
+    def test_busy_host_does_not_block_other_hosts(self, scheduler):
+        log = []
+        big, big_gate = submit(scheduler, "big-1", "https://docs.big.example/", log)
+        assert big_gate.started.wait(5)
+        second, second_gate = submit(scheduler, "big-2", "https://docs.big.example/guide", log)
+        other, other_gate = submit(scheduler, "other", "https://docs.other.example/", log)
+        # big-2 is first in line but its host is at the per-host limit
+        assert other_gate.started.wait(5)
+        assert second.state == "queued"
+        assert scheduler.queue_position("big-2") == 1
+
+        big_gate.open()
+        assert second_gate.started.wait(5)
+        for gate in (second_gate, other_gate):
+            gate.open()
+        assert second.done.wait(5) and other.done.wait(5)
+        assert log == ["big-1", "other", "big-2"]
+
+    def test_failed_job_frees_its_slot(self, scheduler):
+        async def fail():
+            raise RuntimeError("boom")
+
+        failed = scheduler.submit("fail", "https://docs.example/", fail)
+        assert failed.done.wait(5)
+        assert failed.error == "boom"
+        log = []
+        job, gate = submit(scheduler, "next", "https://docs.example/", log)
+        assert gate.started.wait(5)
+        gate.open()
+        assert job.done.wait(5)
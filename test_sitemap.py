@@ -0,0 +1,124 @@
+"""Tests for sitemap discovery and sitemap-driven prefetching."""
+import asyncio
+import gzip
+
+from aiohttp import web
+
+from gitbook_downloader import CrawlFrontier, GitbookDownloader, RateLimiter, SitemapParser
+from test_crawl import BASE_URL, build_site, local_server
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(urls):
+    entries = "".join(f"<url><loc>{url}</loc><lastmod>2024-01-01</lastmod></url>" for url in urls)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'.encode()
+
+
+def sitemap_index(urls):
+    entries = "".join(f"<sitemap><loc>{url}</loc></sitemap>" for url in urls)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NS}>{entries}</sitemapindex>'.encode()
+
+
+def feed_in_chunks(parser, data, size=7):
+    entries = []
+    for start in range(0, len(data), size):
+        entries += parser.feed(data[start:start + size])
+    return entries + parser.close()
+
+
+class TestSitemapParser:
+
+    def test_urlset_streamed_in_small_chunks(self):
+        urls = [f"https://docs.example.com/page-{i}" for i in range(50)]
+        assert feed_in_chunks(SitemapParser(), urlset(urls)) == [("url", url) for url in urls]
+
+    def test_sitemap_index(self):
+        data = sitemap_index(["https://docs.example.com/a.xml", "https://docs.example.com/b.xml.gz"])
+        assert feed_in_chunks(SitemapParser(), data) == [
+            ("sitemap", "https://docs.example.com/a.xml"), ("sitemap", "https://docs.example.com/b.xml.gz"),
+        ]
+
+    def test_gzipped_sitemap(self):
+        data = gzip.compress(urlset(["https://docs.example.com/intro"]))
+        assert feed_in_chunks(SitemapParser(gzipped=True), data) == [("url", "https://docs.example.com/intro")]
+
+
+async def crawl(site_html, *sitemap_modes):
+    """Crawl the site once per mode on one server; returns (downloader, markdown, paths requested)."""
+    requested = []
+
+    async def handle(request):
+        requested[-1].append(request.path)
+        base = f"http://{request.host}/"
+        if request.path == "/robots.txt":
+            return web.Response(text=f"User-agent: *\nAllow: /\nSitemap: {base}sitemap_index.xml\n")
+        if request.path == "/sitemap_index.xml":
+            body = sitemap_index([f"{base}sitemap-pages.xml.gz", "https://cdn.example.net/sitemap.xml"])
+            return web.Response(body=body, content_type="application/xml")
+        if request.path == "/sitemap-pages.xml.gz":
+            urls = [url.replace(BASE_URL, base) for url in site_html]
+            urls += [f"{base}v2/intro", "https://elsewhere.example.org/intro"]  # Out of scope
+            return web.Response(body=gzip.compress(urlset(urls)), content_type="application/gzip")
+        html = site_html.get(BASE_URL + request.path.lstrip("/"))
+        if html is None:
+            return web.Response(status=404)
+        await asyncio.sleep(0.002)
+        return web.Response(text=html, content_type="text/html")
+
+    results = []
+    async with local_server(handle) as base_url:
+        for use_sitemap in sitemap_modes:
+            requested.append([])
+            downloader = GitbookDownloader(
+                base_url, native_md=False, max_concurrency=4, parse_workers=0, use_sitemap=use_sitemap,
+                force_crawl=True,
+                rate_limiter=RateLimiter(rate=1000.0, max_rate=1000.0),
+            )
+            results.append((downloader, await downloader.download(), requested[-1]))
+    return results
+
+
+class TestSitemapDiscovery:
+
+    def test_sitemap_prefetch_keeps_nav_output(self):
+        site_html = build_site()
+        (_, expected, _), (downloader, markdown, requested) = asyncio.run(crawl(site_html, False, True))
+        assert markdown == expected
+        assert {"/robots.txt", "/sitemap_index.xml", "/sitemap-pages.xml.gz"} <= set(requested)
+        assert downloader.status.sitemap_urls == len(site_html)
+        # Every page is still fetched exactly once
+        pages = [path for path in requested if not path.startswith(("/robots", "/sitemap"))]
+        assert len(pages) == len(set(pages)) == len(site_html)
+
+
+class TestBackgroundPrefetch:
+
+    def test_unconsumed_sitemap_urls_do_not_stall_prefetch(self):
+        # Sitemap-only pages (tags, blog posts) the walk never asks for
+        urls = [f"{BASE_URL}tags/{i}" for i in range(20)]
+        fetched = []
+
+        async def fetch(url):
+            fetched.append(url)
+            await asyncio.sleep(0.001)
+            return url.upper()
+
+        async def run():
+            frontier = CrawlFrontier(fetch, max_concurrency=2)
+            frontier.prefetch(urls, background=True)
+            for _ in range(200):
+                if len(fetched) == len(urls) and not frontier._background_running:
+                    break
+                await asyncio.sleep(0.005)
+            held = len(frontier._tasks)
+            # A dropped result is fetched again when the walk does reach it; a held one isn't
+            assert await frontier.get(urls[0]) == urls[0].upper()
+            assert await frontier.get(urls[-1]) == urls[-1].upper()
+            await frontier.close()
+            return held
+
+        held = asyncio.run(run())
+        assert fetched[:len(urls)] == urls
+        assert held == 2  # Only max_concurrency unconsumed results are kept
+        assert fetched[len(urls):] == [urls[0]]
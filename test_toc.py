@@ -0,0 +1,89 @@
+"""TOC generation must match the original look-ahead algorithm on arbitrary navs."""
+import random
+
+import pytest
+from slugify import slugify
+
+from gitbook_downloader import GitbookDownloader
+
+BASE_URL = "https://docs.example.com/"
+
+
+def reference_toc(sorted_pages, strict):
+    """The original quadratic TOC builder: scan ahead from each header to decide if it is empty."""
+    empty = set()
+    for i, page in enumerate(sorted_pages):
+        if page.get("url") is None:
+            header_depth = page.get("depth", 0)
+            has_children = False
+            next_is_header = True
+            for next_page in sorted_pages[i + 1:]:
+                next_depth = next_page.get("depth", 0)
+                if next_page.get("url") is None:
+                    if next_depth <= header_depth:
+                        break
+                    continue
+                next_is_header = False
+                has_children = next_depth > header_depth if strict else True
+                break
+            if not has_children and (next_is_header or strict):
+                empty.add(i)
+
+    lines, seen_urls, seen_headers = [], set(), set()
+    for i, page in enumerate(sorted_pages):
+        if not page.get("title") or i in empty:
+            continue
+        title, url = page["title"].strip(), page.get("url")
+        seen = seen_headers if url is None else seen_urls
+        if (title if url is None else url) in seen:
+            continue
+        seen.add(title if url is None else url)
+        indent = "  " * page.get("depth", 0)
+        lines.append(f"{indent}**{title}**" if url is None else f"{indent}- [{title}](#{slugify(title)})")
+    return lines
+
+
+def random_pages(rng, count):
+    pages, depth = {}, 0
+    for index in range(count):
+        depth = max(0, min(depth + rng.choice([-2, -1, 0, 0, 1]), 4))
+        is_header = rng.random() < 0.35
+        title = rng.choice(["", "Overview", "Setup", f"Topic {rng.randint(0, count // 3)}"])
+        url = None if is_header else f"{BASE_URL}{rng.choice(['guides', 'api', 'faq'])}/{rng.randint(0, count)}"
+        pages[index] = {"index": index, "depth": depth, "title": title, "url": url,
+                        "content": None if is_header else f"Body {index}"}
+    return pages
+
+
+def toc_lines(markdown):
+    toc = markdown.split("\n---\n", 1)[0]
+    return toc.split("\n")[2:-1]  # Drop the heading and the blank lines around the entries
+
+
+class TestTocGeneration:
+
+    @pytest.mark.parametrize("strict", [True, False])
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_reference_algorithm(self, seed, strict):
+        downloader = GitbookDownloader(BASE_URL, native_md=False)
+        downloader.nav_preserves_order = strict
+        downloader.pages = random_pages(random.Random(seed), 60)
+        if strict:
+            sorted_pages = sorted(downloader.pages.values(), key=lambda p: p["index"])
+        else:
+            sorted_pages = sorted(downloader.pages.values(), key=downloader._get_page_sort_key)
+        assert toc_lines(downloader._generate_markdown()) == reference_toc(sorted_pages, strict)
+
+    def test_trailing_and_nested_empty_headers_are_dropped(self):
+        downloader = GitbookDownloader(BASE_URL, native_md=False)
+        downloader.nav_preserves_order = True
+        entries = [("Guides", None, 0), ("Install", "install", 1), ("Empty", None, 0),
+                   ("Nested", None, 1), ("Reference", None, 0), ("Sibling", "sibling", 0), ("Tail", None, 0)]
+        downloader.pages = {
+            i: {"index": i, "depth": depth, "title": title, "url": slug and BASE_URL + slug,
+                "content": slug and f"About {title}"}
+            for i, (title, slug, depth) in enumerate(entries)
+        }
+        assert toc_lines(downloader._generate_markdown()) == [
+            "**Guides**", "  - [Install](#install)", "- [Sibling](#sibling)",
+        ]